@@ -0,0 +1,204 @@
+"""Mentor availability, conflict-free booking and free-slot search.
+
+Mentors publish weekly availability windows (UTC). Booked sessions are
+indexed as fixed 15-minute granules in ``mentor_slot_locks`` with a unique
+``(mentor_id, slot)`` index: reserving a session inserts every granule it
+overlaps, so two overlapping bookings can never both succeed. The same
+granules serve as the interval index for slot search, where a candidate slot
+is free when none of its granules is taken. Sessions booked before locking
+existed get their locks from ``migrations.backfill_slot_locks``. A mentor
+without windows is open around the clock, both for booking and in search.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, field_validator
+from pymongo.errors import BulkWriteError
+
+from database import db
+
+LOCKS_COLLECTION = "mentor_slot_locks"
+SLOT_MINUTES = 15
+SESSION_MINUTES = {"30min": 30, "1hr": 60}
+SEARCH_STEP_MINUTES = 30
+MAX_SEARCH_DAYS = 14
+MINUTES_PER_DAY = 24 * 60
+DUPLICATE_KEY = 11000
+
+
+class SlotConflict(Exception):
+    pass
+
+
+class AvailabilityWindow(BaseModel):
+    weekday: int  # 0 = Monday ... 6 = Sunday, UTC
+    start: str  # "HH:MM"
+    end: str  # "HH:MM", exclusive; "24:00" allowed
+
+    @field_validator("weekday")
+    @classmethod
+    def check_weekday(cls, v):
+        if not 0 <= v <= 6:
+            raise ValueError("weekday must be 0 (Monday) to 6 (Sunday)")
+        return v
+
+    @field_validator("start", "end")
+    @classmethod
+    def check_time(cls, v):
+        minutes = parse_minutes(v)
+        if minutes % SLOT_MINUTES:
+            raise ValueError(f"times must be multiples of {SLOT_MINUTES} minutes")
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"  # stored zero-padded, e.g. "9:00" -> "09:00"
+
+
+def parse_minutes(value: str) -> int:
+    try:
+        hours, minutes = value.split(":")
+        total = int(hours) * 60 + int(minutes)
+    except ValueError:
+        raise ValueError("time must look like HH:MM")
+    if not 0 <= total <= 24 * 60 or not 0 <= int(minutes) < 60:
+        raise ValueError("time out of range")
+    return total
+
+
+def floor_slot(value: datetime) -> datetime:
+    value = value.replace(second=0, microsecond=0)
+    return value - timedelta(minutes=value.minute % SLOT_MINUTES)
+
+
+def granules(start: datetime, minutes: int) -> List[datetime]:
+    """Every slot granule overlapped by [start, start + minutes)."""
+    end = start + timedelta(minutes=minutes)
+    slot = floor_slot(start)
+    result = []
+    while slot < end:
+        result.append(slot)
+        slot += timedelta(minutes=SLOT_MINUTES)
+    return result
+
+
+def within_windows(windows: List[dict], start: datetime, minutes: int) -> bool:
+    """True if the mentor has no windows (always bookable) or one covers the session."""
+    if not windows:
+        return True
+    end = start + timedelta(minutes=minutes)
+    day_start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    for window in windows:
+        if window["weekday"] != start.weekday():
+            continue
+        w_start = day_start + timedelta(minutes=parse_minutes(window["start"]))
+        w_end = day_start + timedelta(minutes=parse_minutes(window["end"]))
+        if w_start <= start and end <= w_end:
+            return True
+    return False
+
+# ==================== BOOKING ====================
+
+async def reserve(mentor_id: str, session_id: str, start: datetime, minutes: int) -> None:
+    """Atomically claim the session's granules or raise SlotConflict."""
+    locks = [{"mentor_id": mentor_id, "slot": slot, "session_id": session_id} for slot in granules(start, minutes)]
+    try:
+        await db[LOCKS_COLLECTION].insert_many(locks, ordered=True)
+    except BulkWriteError as e:
+        # ordered insert stops at the first taken granule; drop the ones we got
+        await release(session_id)
+        if any(err["code"] == DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise SlotConflict("Mentor is already booked at that time")
+        raise
+
+
+async def release(session_id: str) -> None:
+    await db[LOCKS_COLLECTION].delete_many({"session_id": session_id})
+
+# ==================== SEARCH ====================
+
+async def busy_granules(mentor_ids: List[str], start: datetime, end: datetime) -> Dict[str, Set[datetime]]:
+    busy: Dict[str, Set[datetime]] = {mentor_id: set() for mentor_id in mentor_ids}
+    cursor = db[LOCKS_COLLECTION].find(
+        {"mentor_id": {"$in": mentor_ids}, "slot": {"$gte": floor_slot(start), "$lt": end}},
+        {"_id": 0, "mentor_id": 1, "slot": 1},
+    )
+    async for lock in cursor:
+        busy[lock["mentor_id"]].add(lock["slot"])
+    return busy
+
+
+Weekly = Dict[int, List[Tuple[int, int]]]  # weekday -> sorted (start, end) minutes
+ALWAYS_OPEN: Weekly = {weekday: [(0, MINUTES_PER_DAY)] for weekday in range(7)}
+
+
+def compile_windows(windows: List[dict]) -> Weekly:
+    weekly: Weekly = {}
+    for w in windows:
+        weekly.setdefault(w["weekday"], []).append((parse_minutes(w["start"]), parse_minutes(w["end"])))
+    for spans in weekly.values():
+        spans.sort()
+    return weekly
+
+
+def prepare_candidates(mentors: List[dict]) -> List[dict]:
+    """Mentors with their windows pre-parsed, ready to cache for repeated searches.
+
+    Mentors without windows get ``ALWAYS_OPEN``, matching ``within_windows``.
+    """
+    return [{**m, "weekly": compile_windows(m.get("availability") or []) or ALWAYS_OPEN} for m in mentors]
+
+
+def candidate_starts(weekly: Weekly, start: datetime, end: datetime, minutes: int) -> Iterable[int]:
+    """Session starts inside the weekly windows within [start, end), as minutes
+    after midnight of ``start``'s day, in order. Integer math keeps the
+    per-mentor scan cheap when searching thousands of mentors."""
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    start_offset = (start - day) // timedelta(minutes=1)
+    end_offset = (end - day) // timedelta(minutes=1)
+    first_weekday = day.weekday()
+    for day_index in range(-(-end_offset // MINUTES_PER_DAY)):
+        base = day_index * MINUTES_PER_DAY
+        for w_start, w_end in weekly.get((first_weekday + day_index) % 7, ()):
+            for offset in range(base + w_start, base + w_end - minutes + 1, SEARCH_STEP_MINUTES):
+                if offset + minutes > end_offset:
+                    return
+                if offset >= start_offset:
+                    yield offset
+
+
+def free_slots(weekly: Weekly, busy: Set[datetime], start: datetime, end: datetime,
+               minutes: int, limit: int) -> List[datetime]:
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    taken = {(slot - day) // timedelta(minutes=1) for slot in busy}
+    slots = []
+    for offset in candidate_starts(weekly, start, end, minutes):
+        if taken and any(g in taken for g in range(offset, offset + minutes, SLOT_MINUTES)):
+            continue
+        slots.append(day + timedelta(minutes=offset))
+        if len(slots) >= limit:
+            break
+    return slots
+
+
+async def search_free_slots(candidates: List[dict], start: datetime, end: datetime, session_type: str,
+                            per_mentor: int = 10, now: Optional[datetime] = None) -> List[dict]:
+    """Free slots per mentor for ``prepare_candidates`` output, earliest mentor first.
+
+    Booked time for every candidate comes from one range query on the lock
+    index, so the database cost does not grow with the number of slots.
+    """
+    minutes = SESSION_MINUTES[session_type]
+    start = max(start, floor_slot(now or datetime.utcnow()) + timedelta(minutes=SLOT_MINUTES))
+    if not candidates or start >= end:
+        return []
+    busy = await busy_granules([m["id"] for m in candidates], start, end)
+    results = []
+    for mentor in candidates:
+        slots = free_slots(mentor["weekly"], busy[mentor["id"]], start, end, minutes, per_mentor)
+        if slots:
+            results.append({
+                "mentor_id": mentor["id"],
+                "mentor_name": mentor["name"],
+                "category": mentor.get("category"),
+                "price": mentor["session_30min_rate"] if session_type == "30min" else mentor["session_1hr_rate"],
+                "slots": slots,
+            })
+    results.sort(key=lambda r: r["slots"][0])
+    return results
@@ -0,0 +1,101 @@
+"""Declarative badge rules and the single-round-trip XP/badge update.
+
+Each rule is an aggregation expression evaluated against the user document
+*after* the progress update has been applied. ``apply_progress`` sends one
+``find_one_and_update`` with an update pipeline that bumps the counters,
+evaluates every rule and appends newly earned badges, so concurrent updates
+serialise on the document and a badge can never be awarded twice or skipped.
+
+The badges earned by an update are kept in ``LAST_AWARDED_FIELD`` so the
+returned document can report them. The field is internal: ``apply_progress``
+strips it from what it returns and ``PRIVATE_USER_FIELDS`` lists it for every
+other read that hands the user document to a client.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from database import db
+
+LAST_AWARDED_FIELD = "last_badges_awarded"
+PRIVATE_USER_FIELDS = ("_id", "password_hash", LAST_AWARDED_FIELD)  # never sent to clients
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    id: str
+    name: str
+    description: str
+    icon: str
+    condition: Dict[str, Any]  # aggregation expression over the updated user
+
+
+BADGE_RULES: List[BadgeRule] = [
+    BadgeRule("career_explorer", "Career Explorer", "Complete your first assessment", "compass",
+              {"$gte": [{"$ifNull": ["$tests_taken", 0]}, 1]}),
+    BadgeRule("top_learner", "Top Learner", "Complete 5 assessments", "star",
+              {"$gte": [{"$ifNull": ["$tests_taken", 0]}, 5]}),
+    BadgeRule("mentorship_pro", "Mentorship Pro", "Book 3 mentor sessions", "users",
+              {"$gte": [{"$ifNull": ["$mentor_sessions", 0]}, 3]}),
+    BadgeRule("skill_master", "Skill Master", "Score 90%+ on skill assessment", "award",
+              {"$gte": [{"$ifNull": ["$best_skill_score", 0]}, 90]}),
+    BadgeRule("goal_getter", "Goal Getter", "Reach 500 XP points", "target",
+              {"$gte": [{"$ifNull": ["$xp_points", 0]}, 500]}),
+    BadgeRule("community_star", "Community Star", "Refer 3 friends", "heart",
+              {"$gte": [{"$ifNull": ["$referrals", 0]}, 3]}),
+]
+
+
+def badge_catalog() -> List[Dict[str, str]]:
+    return [{"id": r.id, "name": r.name, "description": r.description, "icon": r.icon} for r in BADGE_RULES]
+
+
+def build_progress_pipeline(xp: int = 0, inc: Optional[Dict[str, int]] = None,
+                            maximum: Optional[Dict[str, float]] = None,
+                            rules: List[BadgeRule] = BADGE_RULES) -> List[Dict[str, Any]]:
+    counters = dict(inc or {})
+    if xp:
+        counters["xp_points"] = counters.get("xp_points", 0) + xp
+
+    progress: Dict[str, Any] = {
+        f: {"$add": [{"$ifNull": [f"${f}", 0]}, n]} for f, n in counters.items()
+    }
+    for f, value in (maximum or {}).items():
+        progress[f] = {"$max": [{"$ifNull": [f"${f}", 0]}, value]}
+
+    current_badges = {"$ifNull": ["$badges", []]}
+    earned = {"$concatArrays": [
+        {"$cond": [
+            {"$and": [rule.condition, {"$not": [{"$in": [{"$literal": rule.name}, current_badges]}]}]},
+            [{"$literal": rule.name}],
+            [],
+        ]}
+        for rule in rules
+    ]}
+
+    pipeline: List[Dict[str, Any]] = []
+    if progress:
+        pipeline.append({"$set": progress})
+    pipeline.append({"$set": {LAST_AWARDED_FIELD: earned}})
+    pipeline.append({"$set": {"badges": {"$concatArrays": [current_badges, f"${LAST_AWARDED_FIELD}"]}}})
+    return pipeline
+
+
+async def apply_progress(user_id: str, xp: int = 0, inc: Optional[Dict[str, int]] = None,
+                         maximum: Optional[Dict[str, float]] = None) -> Tuple[Optional[dict], List[str]]:
+    """Apply XP/counter changes and award badges in one round trip.
+
+    Returns the updated user (without ``_id``/``password_hash``) and the badges
+    earned by this update.
+    """
+    user = await db.users.find_one_and_update(
+        {"id": user_id},
+        build_progress_pipeline(xp, inc, maximum) + [{"$set": {"updated_at": datetime.utcnow()}}],
+        projection={"_id": 0, "password_hash": 0},
+        return_document=ReturnDocument.AFTER,
+    )
+    if user is None:
+        return None, []
+    return user, user.pop(LAST_AWARDED_FIELD, [])
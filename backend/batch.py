@@ -0,0 +1,141 @@
+"""Multiplexed sub-requests for ``POST /api/batch``.
+
+The mobile app opens with several GETs that each pay a round trip and a JWT
+decode plus user lookup. ``BatchDispatcher`` resolves each sub-request
+against the API router, validates its path and query parameters the way
+FastAPI would, and calls the endpoint directly with the user the batch
+request already authenticated. Sub-requests run concurrently; every item
+gets its own status and body.
+
+Loads that several handlers repeat (e.g. the latest assessment) go through
+``memoized`` and are fetched once per batch.
+"""
+import asyncio
+import json
+import logging
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException, Response
+from fastapi.dependencies.utils import request_params_to_args
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute, APIRouter
+from pydantic import BaseModel
+from starlette.datastructures import QueryParams
+from starlette.routing import Match
+
+from metrics import HTTP_REQUEST_DURATION
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_ITEMS = 20
+BATCH_METHOD_LABEL = "BATCH"
+
+_memo: ContextVar[Optional[Dict[Hashable, asyncio.Future]]] = ContextVar("batch_memo", default=None)
+
+
+async def memoized(key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+    """``await load()``, shared by all sub-requests of the current batch."""
+    memo = _memo.get()
+    if memo is None:
+        return await load()
+    future = memo.get(key)
+    if future is None:
+        future = memo[key] = asyncio.ensure_future(load())
+    return await future
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = None
+    method: str = "GET"
+    path: str  # e.g. "/api/opportunities?type=internship"
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+
+class BatchItemError(Exception):
+    def __init__(self, status: int, detail: Any):
+        self.status = status
+        self.detail = detail
+
+
+class BatchDispatcher:
+    """Runs sub-requests against ``router``'s GET routes that only depend on ``auth``."""
+
+    def __init__(self, router: APIRouter, auth: Callable):
+        self.router = router
+        self.auth = auth
+
+    def resolve(self, method: str, path: str) -> Tuple[APIRoute, Dict[str, Any]]:
+        scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+        partial = False
+        for route in self.router.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return route, child_scope["path_params"]
+            partial = partial or match == Match.PARTIAL
+        if partial:
+            raise BatchItemError(405, "Method Not Allowed")
+        raise BatchItemError(404, "Not Found")
+
+    def check_batchable(self, route: APIRoute) -> None:
+        dependant = route.dependant
+        others = [d for d in dependant.dependencies if d.call is not self.auth]
+        if (dependant.body_params or dependant.header_params or dependant.cookie_params or others
+                or dependant.request_param_name or dependant.response_param_name):
+            raise BatchItemError(400, f"{route.path} cannot be batched; request it directly")
+
+    async def call(self, sub: SubRequest, user: dict) -> Tuple[int, Any]:
+        method = sub.method.upper()
+        if method != "GET":
+            raise BatchItemError(405, "Only GET requests can be batched")
+        url = urlsplit(sub.path)
+        route, raw_path_params = self.resolve(method, url.path)
+        self.check_batchable(route)
+        dependant = route.dependant
+        path_values, path_errors = request_params_to_args(dependant.path_params, raw_path_params)
+        query_values, query_errors = request_params_to_args(dependant.query_params, QueryParams(url.query))
+        if path_errors or query_errors:
+            raise BatchItemError(422, jsonable_encoder(path_errors + query_errors))
+        kwargs = {**path_values, **query_values}
+        for dependency in dependant.dependencies:
+            if dependency.name:
+                kwargs[dependency.name] = user
+
+        started = time.perf_counter()
+        try:
+            result = await route.endpoint(**kwargs)
+        finally:
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, BATCH_METHOD_LABEL, route.path)
+        if isinstance(result, Response):
+            body = result.body.decode()
+            if result.media_type == "application/json":
+                body = json.loads(body)
+            return result.status_code, body
+        return route.status_code or 200, jsonable_encoder(result)
+
+    async def _item(self, sub: SubRequest, user: dict) -> dict:
+        try:
+            status, body = await self.call(sub, user)
+        except BatchItemError as e:
+            status, body = e.status, {"detail": e.detail}
+        except HTTPException as e:
+            status, body = e.status_code, {"detail": e.detail}
+        except Exception:
+            logger.exception(f"Batch sub-request {sub.method} {sub.path} failed")
+            status, body = 500, {"detail": "Internal Server Error"}
+        return {"id": sub.id, "status": status, "body": body}
+
+    async def run(self, requests: List[SubRequest], user: dict) -> List[dict]:
+        token = _memo.set({})
+        try:
+            # gather wraps each item in a task that inherits the memo above
+            return list(await asyncio.gather(*(self._item(sub, user) for sub in requests)))
+        finally:
+            _memo.reset(token)
@@ -0,0 +1,142 @@
+"""App-launch latency over an emulated high-RTT link: separate GETs vs /api/batch.
+
+Starts the API (and optionally a throwaway mongod) like the load test, signs
+up a user with one completed assessment and then times the launch screen
+three ways, each from a cold client: the GETs one after another, the GETs in
+parallel over a small connection pool, and a single ``POST /api/batch``.
+The link is emulated in the client transport: every request costs one RTT
+and every new connection ``--handshake-rtts`` more (TCP + TLS):
+
+    python -m benchmarks.bench_batch --mongod mongod --rtt-ms 300
+    python -m benchmarks.bench_batch --mongo-url mongodb://localhost:27017 --rtt-ms 600 --connections 2
+"""
+import argparse
+import asyncio
+import random
+import shutil
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.loadtest.__main__ import start_api, start_mongod, start_stub_llm
+from benchmarks.loadtest.scenarios import Recorder, VirtualUser
+
+LAUNCH_PATHS = [
+    "/api/auth/me",
+    "/api/dashboard",
+    "/api/mentors/recommended",
+    "/api/opportunities/recommended",
+    "/api/badges",
+    "/api/leaderboard",
+]
+
+
+class HighLatencyTransport(httpx.AsyncBaseTransport):
+    """Adds link latency to a real transport, with at most ``connections`` connections."""
+
+    def __init__(self, rtt: float, handshake_rtts: int, connections: int):
+        self.rtt = rtt
+        self.handshake_rtts = handshake_rtts
+        self.inner = httpx.AsyncHTTPTransport(limits=httpx.Limits(max_connections=connections))
+        self.idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(connections):
+            self.idle.put_nowait(False)  # False = not connected yet
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        connected = await self.idle.get()
+        try:
+            if not connected:
+                await asyncio.sleep(self.handshake_rtts * self.rtt)
+            await asyncio.sleep(self.rtt / 2)
+            response = await self.inner.handle_async_request(request)
+            await response.aread()
+            await asyncio.sleep(self.rtt / 2)
+            return response
+        finally:
+            self.idle.put_nowait(True)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+async def prepare_user(base_url: str) -> Dict[str, str]:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        await client.post("/api/seed")
+        user = VirtualUser(client, Recorder(), random.Random(7))
+        await user.sign_up()
+        await user.assessment()
+        return user.headers
+
+
+async def launch(base_url: str, headers: Dict[str, str], mode: str, args: argparse.Namespace) -> float:
+    transport = HighLatencyTransport(args.rtt_ms / 1000, args.handshake_rtts, args.connections)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, transport=transport, timeout=60.0) as client:
+        started = time.perf_counter()
+        if mode == "sequential":
+            responses = [await client.get(path) for path in LAUNCH_PATHS]
+        elif mode == "parallel":
+            responses = await asyncio.gather(*(client.get(path) for path in LAUNCH_PATHS))
+        else:
+            response = await client.post("/api/batch", json={"requests": [{"path": p} for p in LAUNCH_PATHS]})
+            response.raise_for_status()
+            responses = response.json()["responses"]
+        elapsed = time.perf_counter() - started
+    statuses = [r["status"] if isinstance(r, dict) else r.status_code for r in responses]
+    if any(status != 200 for status in statuses):
+        raise RuntimeError(f"{mode} launch failed: {dict(zip(LAUNCH_PATHS, statuses))}")
+    return elapsed
+
+
+async def run(base_url: str, args: argparse.Namespace) -> None:
+    headers = await prepare_user(base_url)
+    print(f"RTT {args.rtt_ms:.0f} ms, {args.handshake_rtts} handshake RTTs, "
+          f"{args.connections} connections, {len(LAUNCH_PATHS)} launch requests")
+    for mode in ("sequential", "parallel", "batch"):
+        samples: List[float] = [await launch(base_url, headers, mode, args) for _ in range(args.runs)]
+        print(f"{mode:<11} median {statistics.median(samples) * 1000:8.1f} ms"
+              f"  min {min(samples) * 1000:8.1f} ms  max {max(samples) * 1000:8.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="App-launch latency: separate requests vs /api/batch")
+    mongo = parser.add_mutually_exclusive_group(required=True)
+    mongo.add_argument("--mongod", help="mongod binary to start with a temporary dbpath")
+    mongo.add_argument("--mongo-url", help="existing MongoDB to use (a fresh database is created)")
+    parser.add_argument("--rtt-ms", type=float, default=300.0, help="emulated round-trip time")
+    parser.add_argument("--handshake-rtts", type=int, default=2, help="RTTs to open a connection")
+    parser.add_argument("--connections", type=int, default=4, help="client connection pool size")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    mongod = dbpath = api = llm = None
+    db_name = f"nexosr_batch_bench_{uuid.uuid4().hex[:8]}"
+    try:
+        if args.mongod:
+            mongod, mongo_url, dbpath = start_mongod(args.mongod)
+        else:
+            mongo_url = args.mongo_url
+        llm, llm_port = start_stub_llm(50.0, 0.0, 0.0, 1)
+        api, api_port = start_api(mongo_url, db_name, llm_port, 1)
+        asyncio.run(run(f"http://127.0.0.1:{api_port}", args))
+    finally:
+        if api:
+            api.terminate()
+            api.wait(timeout=15)
+        if llm:
+            llm.should_exit = True
+        if mongod:
+            mongod.terminate()
+            mongod.wait(timeout=15)
+            shutil.rmtree(dbpath, ignore_errors=True)
+        elif args.mongo_url:
+            from pymongo import MongoClient
+            MongoClient(args.mongo_url).drop_database(db_name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Index size and history-read latency: per-message documents vs buckets.
+
+Loads the same synthetic chat history in both layouts into a scratch database
+and compares storage/index size and the latency of reading the last 10 and
+100 messages. Needs a reachable MongoDB:
+
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_chat_storage --users 200 --messages 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+os.environ.setdefault("DB_NAME", f"nexosr_chat_bench_{uuid.uuid4().hex[:8]}")
+
+import chat_store  # noqa: E402
+from database import INDEXES, close_client, get_client, get_db  # noqa: E402
+from migrations.bucket_chat_messages import build_bucket  # noqa: E402
+
+
+def synthetic_messages(user_id: str, count: int, rng: random.Random) -> List[dict]:
+    start = datetime.utcnow() - timedelta(days=90)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": "x" * rng.randint(20, 400),
+            "timestamp": start + timedelta(minutes=i * 5),
+        }
+        for i in range(count)
+    ]
+
+
+async def load(users: int, per_user: int) -> List[str]:
+    database = get_db()
+    rng = random.Random(3)
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    for user_id in user_ids:
+        messages = synthetic_messages(user_id, per_user, rng)
+        await database.chat_messages.insert_many([dict(m) for m in messages])
+        buckets = [build_bucket(user_id, messages[i:i + chat_store.CHAT_BUCKET_SIZE])
+                   for i in range(0, len(messages), chat_store.CHAT_BUCKET_SIZE)]
+        await database[chat_store.BUCKETS_COLLECTION].insert_many(buckets)
+    for collection in ("chat_messages", chat_store.BUCKETS_COLLECTION):
+        for keys, options in INDEXES[collection]:
+            await database[collection].create_index(keys, **options)
+    return user_ids
+
+
+async def stats(collection: str) -> dict:
+    result = await get_db().command("collStats", collection)
+    return {"count": result["count"], "storage_mb": result["storageSize"] / 2**20,
+            "index_mb": result["totalIndexSize"] / 2**20}
+
+
+async def time_reads(label: str, read, user_ids: List[str], limit: int, samples: int) -> None:
+    rng = random.Random(5)
+    latencies = []
+    for _ in range(samples):
+        user_id = rng.choice(user_ids)
+        start = time.perf_counter()
+        await read(user_id, limit)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"  {label:<10} last {limit:>3}: p50 {statistics.median(latencies) * 1000:6.2f} ms"
+          f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.2f} ms")
+
+
+async def read_per_message(user_id: str, limit: int):
+    messages = await get_db().chat_messages.find({"user_id": user_id}).sort("timestamp", -1).to_list(limit)
+    messages.reverse()
+    return messages
+
+
+async def run(users: int, per_user: int, samples: int) -> None:
+    user_ids = await load(users, per_user)
+    for collection in ("chat_messages", chat_store.BUCKETS_COLLECTION):
+        s = await stats(collection)
+        print(f"{collection:<14} docs {s['count']:>9}  storage {s['storage_mb']:8.2f} MB  index {s['index_mb']:8.2f} MB")
+    for limit in (10, 100):
+        await time_reads("messages", read_per_message, user_ids, limit, samples)
+        await time_reads("buckets", chat_store.recent_messages, user_ids, limit, samples)
+    await get_client().drop_database(os.environ["DB_NAME"])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Chat storage layout benchmark")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=1000, help="messages per user")
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args.users, args.messages, args.samples))
+    finally:
+        close_client()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Free-slot search latency across many mentors, plus a double-booking check.
+
+Loads synthetic mentors with weekly availability into a scratch database,
+books a share of their time through ``availability.reserve`` and times
+``search_free_slots`` for a one-week range. It also races concurrent
+bookings for the same slot and fails unless exactly one wins. Needs a
+reachable MongoDB:
+
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_mentor_slots --mentors 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+os.environ.setdefault("DB_NAME", f"nexosr_slots_bench_{uuid.uuid4().hex[:8]}")
+
+import availability  # noqa: E402
+from database import INDEXES, close_client, get_client, get_db  # noqa: E402
+
+
+def synthetic_mentor(rng: random.Random) -> dict:
+    windows = []
+    for weekday in rng.sample(range(7), rng.randint(2, 5)):
+        start = rng.randrange(6, 16) * 60
+        end = min(start + rng.choice((120, 240, 480)), 24 * 60)
+        windows.append({"weekday": weekday, "start": f"{start // 60:02d}:00", "end": f"{end // 60:02d}:00"})
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Mentor {rng.randrange(10**6)}",
+        "category": rng.choice(["Technology", "Business", "Creative", "Healthcare"]),
+        "approved": True,
+        "availability": windows,
+        "session_30min_rate": 499.0,
+        "session_1hr_rate": 899.0,
+    }
+
+
+async def load(mentors: int, bookings: int, start: datetime) -> List[dict]:
+    database = get_db()
+    rng = random.Random(11)
+    docs = [synthetic_mentor(rng) for _ in range(mentors)]
+    await database.mentors.insert_many([dict(d) for d in docs])
+    for keys, options in INDEXES[availability.LOCKS_COLLECTION]:
+        await database[availability.LOCKS_COLLECTION].create_index(keys, **options)
+    candidates = availability.prepare_candidates(docs)
+    for _ in range(bookings):
+        mentor = rng.choice(candidates)
+        slots = availability.free_slots(mentor["weekly"], set(), start, start + timedelta(days=7), 60, 20)
+        if slots:
+            try:
+                await availability.reserve(mentor["id"], str(uuid.uuid4()), rng.choice(slots), 60)
+            except availability.SlotConflict:
+                pass
+    return candidates
+
+
+async def check_double_booking(mentor: dict, start: datetime, racers: int) -> bool:
+    slot = availability.free_slots(mentor["weekly"], set(), start + timedelta(days=7),
+                                   start + timedelta(days=14), 60, 1)[0]
+
+    async def attempt(offset: int):
+        # overlapping, not identical, sessions must conflict too
+        await availability.reserve(mentor["id"], str(uuid.uuid4()), slot + timedelta(minutes=offset), 30)
+
+    results = await asyncio.gather(*(attempt(15 * (i % 3)) for i in range(racers)), return_exceptions=True)
+    winners = [r for r in results if r is None]
+    others = [r for r in results if r is not None and not isinstance(r, availability.SlotConflict)]
+    print(f"double booking: {len(winners)} of {racers} overlapping reservations won, {len(others)} errors")
+    return len(winners) == 1 and not others
+
+
+async def run(mentors: int, bookings: int, samples: int, racers: int) -> bool:
+    start = (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    candidates = await load(mentors, bookings, start)
+    latencies = []
+    found = 0
+    for _ in range(samples):
+        began = time.perf_counter()
+        results = await availability.search_free_slots(candidates, start, start + timedelta(days=7), "1hr",
+                                                       per_mentor=5)
+        latencies.append(time.perf_counter() - began)
+        found = len(results)
+    latencies.sort()
+    print(f"{mentors} mentors, {bookings} bookings: {found} mentors with free slots")
+    print(f"search 7 days: p50 {statistics.median(latencies) * 1000:7.2f} ms"
+          f"  p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f} ms")
+    ok = await check_double_booking(candidates[0], start, racers)
+    await get_client().drop_database(os.environ["DB_NAME"])
+    return ok
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mentor slot search benchmark")
+    parser.add_argument("--mentors", type=int, default=5000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--racers", type=int, default=20)
+    args = parser.parse_args(argv)
+    try:
+        ok = asyncio.run(run(args.mentors, args.bookings, args.samples, args.racers))
+    finally:
+        close_client()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
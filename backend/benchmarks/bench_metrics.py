@@ -0,0 +1,86 @@
+"""Overhead benchmark for the always-on metrics layer.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_metrics
+
+Reports the cost of the raw metric primitives, of the Mongo command listener
+and of MetricsMiddleware on a trivial ASGI route (with vs without).
+"""
+import asyncio
+import time
+import timeit
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+
+from metrics import Counter, Histogram, MetricsMiddleware, MongoCommandListener
+
+N = 200_000
+REQUESTS = 5_000
+
+
+def bench_primitives():
+    histogram = Histogram("bench_histogram", "bench", ("route",))
+    counter = Counter("bench_counter", "bench", ("route", "status"))
+    h = timeit.timeit(lambda: histogram.observe(0.0123, "/api/dashboard"), number=N) / N
+    c = timeit.timeit(lambda: counter.inc("/api/dashboard", "200"), number=N) / N
+    print(f"Histogram.observe: {h * 1e9:8.0f} ns/op")
+    print(f"Counter.inc:       {c * 1e9:8.0f} ns/op")
+
+
+def bench_mongo_listener():
+    listener = MongoCommandListener()
+    started = SimpleNamespace(command={"find": "users", "filter": {}}, command_name="find",
+                              connection_id=("localhost", 27017), request_id=1, operation_id=1)
+    succeeded = SimpleNamespace(command_name="find", connection_id=("localhost", 27017),
+                                request_id=1, operation_id=1, duration_micros=850)
+
+    def roundtrip():
+        listener.started(started)
+        listener.succeeded(succeeded)
+
+    t = timeit.timeit(roundtrip, number=N) / N
+    print(f"Mongo listener:    {t * 1e9:8.0f} ns/command")
+
+
+def _make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+async def _drive(app: FastAPI) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):  # warm up
+            await client.get(f"/api/items/{i}")
+        start = time.perf_counter()
+        for i in range(REQUESTS):
+            await client.get(f"/api/items/{i}")
+        return (time.perf_counter() - start) / REQUESTS
+
+
+def bench_middleware(rounds: int = 3):
+    # Interleave rounds and keep the best of each so warm-up noise cancels out.
+    plain, instrumented = float("inf"), float("inf")
+    for _ in range(rounds):
+        plain = min(plain, asyncio.run(_drive(_make_app(False))))
+        instrumented = min(instrumented, asyncio.run(_drive(_make_app(True))))
+    overhead = instrumented - plain
+    print(f"Request (plain):        {plain * 1e6:8.1f} us")
+    print(f"Request (instrumented): {instrumented * 1e6:8.1f} us")
+    print(f"Middleware overhead:    {overhead * 1e6:8.1f} us ({overhead / plain * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    bench_primitives()
+    bench_mongo_listener()
+    bench_middleware()
@@ -0,0 +1,102 @@
+"""Startup benchmark: import time, time to first request and multi-worker boot.
+
+Run from the backend directory against a reachable MongoDB:
+
+    MONGO_URL=mongodb://localhost:27017 python -m benchmarks.bench_startup --workers 4
+
+``import`` is measured in a fresh interpreter; ``first request`` is the time
+from spawning the server until ``/api/health/ready`` answers; the gunicorn run
+also checks that requests are spread over distinct worker processes.
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import(runs: int) -> float:
+    code = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+    samples = [
+        float(subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR).decode().strip().splitlines()[-1])
+        for _ in range(runs)
+    ]
+    return min(samples)
+
+
+def wait_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=0.5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def measure_boot(cmd: List[str], port: int, timeout: float, probe: int = 0) -> Tuple[float, Set[int]]:
+    start = time.perf_counter()
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=dict(os.environ),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/api/health/ready"
+    try:
+        wait_ready(url, timeout)
+        elapsed = time.perf_counter() - start
+        pids = set()
+        for _ in range(probe):
+            # fresh connection each time so the kernel can hand it to any worker
+            pids.add(httpx.get(url, headers={"Connection": "close"}).json()["worker_pid"])
+        return elapsed, pids
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="NEXOSR startup benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh-interpreter imports to time")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker count")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    if "MONGO_URL" not in os.environ:
+        parser.error("MONGO_URL must point at a reachable MongoDB")
+
+    print(f"import server:                 {measure_import(args.runs) * 1000:8.1f} ms (best of {args.runs})")
+
+    port = free_port()
+    uvicorn_cmd = [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+                   "--log-level", "warning"]
+    elapsed, _ = measure_boot(uvicorn_cmd, port, args.timeout)
+    print(f"uvicorn time to first request: {elapsed * 1000:8.1f} ms")
+
+    if shutil.which("gunicorn") is None:
+        print("gunicorn not installed; skipping multi-worker run")
+        return 0
+    port = free_port()
+    gunicorn_cmd = ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+                    "--workers", str(args.workers), "server:app"]
+    elapsed, pids = measure_boot(gunicorn_cmd, port, args.timeout, probe=args.workers * 25)
+    print(f"gunicorn x{args.workers} first request:      {elapsed * 1000:8.1f} ms")
+    print(f"distinct workers answering:    {len(pids):8d} of {args.workers}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Payload size and latency of ``/api/sync`` deltas vs a full refresh.
+
+Starts the API (and optionally a throwaway mongod) like the load test and
+builds up a user with several assessments, chat turns, booked sessions and a
+payment. It then compares two ways of refreshing the app:
+
+- a full refresh: the profile, dashboard and list endpoints
+- ``GET /api/sync?since=<version>``, once with nothing changed and once after
+  a chat turn
+
+It reports response bytes and the median latency of each:
+
+    python -m benchmarks.bench_sync --mongod mongod
+    python -m benchmarks.bench_sync --mongo-url mongodb://localhost:27017 --chat-turns 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import statistics
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.loadtest.__main__ import start_api, start_mongod, start_stub_llm
+from benchmarks.loadtest.scenarios import Recorder, VirtualUser
+
+FULL_REFRESH_PATHS = [
+    "/api/auth/me",
+    "/api/dashboard",
+    "/api/assessments/history",
+    "/api/mentors/sessions",
+    "/api/chat/history",
+    "/api/payments/history",
+]
+OVERLAP_SECONDS = 0.5  # short sync overlap so "nothing changed" really returns nothing
+
+
+async def prepare_user(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, str]:
+    await client.post("/api/seed")
+    user = VirtualUser(client, Recorder(), random.Random(11))
+    await user.sign_up()
+    for _ in range(args.assessments):
+        await user.assessment()
+    for _ in range(args.chat_turns):
+        await user.chat()
+    for _ in range(args.sessions):
+        await user.mentor_book()
+    await client.post("/api/payments/subscribe", params={"plan": "monthly"}, headers=user.headers)
+    return user.headers
+
+
+async def timed(client: httpx.AsyncClient, paths: List[str], runs: int) -> Tuple[int, float]:
+    """Response bytes of one round of ``paths`` and its median latency over ``runs``."""
+    samples, size = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        responses = [await client.get(path) for path in paths]
+        samples.append(time.perf_counter() - started)
+        for response in responses:
+            response.raise_for_status()
+        size = sum(len(r.content) for r in responses)
+    return size, statistics.median(samples)
+
+
+async def run(base_url: str, args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        headers = await prepare_user(client, args)
+        client.headers.update(headers)
+
+        snapshot = (await client.get("/api/sync")).json()
+        counts = {k: len(v) for k, v in snapshot.items() if isinstance(v, list)}
+        print(f"user data: {counts}")
+        await asyncio.sleep(OVERLAP_SECONDS * 2)
+        version = (await client.get("/api/sync", params={"since": snapshot["version"]})).json()["version"]
+
+        rows = [("full refresh", *await timed(client, FULL_REFRESH_PATHS, args.runs)),
+                ("sync snapshot", *await timed(client, ["/api/sync"], args.runs))]
+        delta = f"/api/sync?since={version}"
+        rows.append(("sync, unchanged", *await timed(client, [delta], args.runs)))
+        await client.post("/api/chat", json={"message": "What tests do you offer?"})
+        rows.append(("sync, 1 chat turn", *await timed(client, [delta], args.runs)))
+
+    full_size = rows[0][1]
+    for name, size, latency in rows:
+        print(f"{name:<18} {size:>9,} bytes ({size / full_size:6.1%})  median {latency * 1000:7.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Delta sync vs full refresh")
+    mongo = parser.add_mutually_exclusive_group(required=True)
+    mongo.add_argument("--mongod", help="mongod binary to start with a temporary dbpath")
+    mongo.add_argument("--mongo-url", help="existing MongoDB to use (a fresh database is created)")
+    parser.add_argument("--assessments", type=int, default=10)
+    parser.add_argument("--chat-turns", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    os.environ["SYNC_OVERLAP_SECONDS"] = str(OVERLAP_SECONDS)  # inherited by the API process
+    mongod = dbpath = api = llm = None
+    db_name = f"nexosr_sync_bench_{uuid.uuid4().hex[:8]}"
+    try:
+        if args.mongod:
+            mongod, mongo_url, dbpath = start_mongod(args.mongod)
+        else:
+            mongo_url = args.mongo_url
+        llm, llm_port = start_stub_llm(50.0, 0.0, 0.0, 1)
+        api, api_port = start_api(mongo_url, db_name, llm_port, 1)
+        asyncio.run(run(f"http://127.0.0.1:{api_port}", args))
+    finally:
+        if api:
+            api.terminate()
+            api.wait(timeout=15)
+        if llm:
+            llm.should_exit = True
+        if mongod:
+            mongod.terminate()
+            mongod.wait(timeout=15)
+            shutil.rmtree(dbpath, ignore_errors=True)
+        elif args.mongo_url:
+            from pymongo import MongoClient
+            MongoClient(args.mongo_url).drop_database(db_name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
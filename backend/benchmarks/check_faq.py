@@ -0,0 +1,139 @@
+"""Accuracy and latency check for the local FAQ intent classifier.
+
+Classifies held-out chat messages that are not in the training examples:
+paraphrased FAQ questions labelled with their intent, and personal or
+open-ended questions that must still go to the LLM. Fails if an answered
+message gets the wrong intent (precision), if a must-reach-the-LLM message
+is answered, or if too few FAQ paraphrases are answered (recall). Also times
+``FaqIndex.answer``:
+
+    python -m benchmarks.check_faq
+    python -m benchmarks.check_faq --verbose   # print every decision
+"""
+import argparse
+import sys
+import timeit
+from typing import List, Optional, Tuple
+
+from faq import FaqIndex
+
+FACTS = {
+    "free_tests": 2, "trial_days": 15, "monthly_price": "₹299", "quarterly_price": "₹799",
+    "annual_price": "₹1999", "assessment_xp": 50, "mentor_session_xp": 25, "referral_xp": 30,
+    "badges": "Career Explorer, Top Learner",
+    "report_note": "Premium users also get an AI-enriched version of every report.",
+    "premium_report_note": "As a premium user, you also get an AI-enriched version that replaces it within a minute.",
+    "premium_features": "unlimited assessments, AI-enriched reports and AI-matched mentor recommendations",
+}
+
+USER = {"name": "Asha Rao", "segment": "student", "interests": ["Technology", "Science"]}
+
+# (message, expected intent or None when it must reach the LLM)
+HELD_OUT: List[Tuple[str, Optional[str]]] = [
+    ("What tests do you have?", "tests_offered"),
+    ("which tests are offered", "tests_offered"),
+    ("What kinds of assessments can I take?", "tests_offered"),
+    ("do you offer a career interest test", "tests_offered"),
+    ("How long do the tests take?", "test_process"),
+    ("how many questions does each test have", "test_process"),
+    ("How is the score calculated?", "test_process"),
+    ("Can I take a test again?", "test_process"),
+    ("How many free tests do I get?", "free_limit"),
+    ("why can't I start another test", "free_limit"),
+    ("are tests free", "free_limit"),
+    ("How much is premium?", "premium"),
+    ("What do I get with premium", "premium"),
+    ("what are the premium plans", "premium"),
+    ("How do I upgrade?", "premium"),
+    ("how long does the free trial last", "trial"),
+    ("When will my trial expire?", "trial"),
+    ("How can I find a mentor?", "find_mentor"),
+    ("recommend me a mentor", "find_mentor"),
+    ("I'd like to speak with a mentor", "find_mentor"),
+    ("How do I book a session with a mentor?", "book_session"),
+    ("what does a mentor session cost", "book_session"),
+    ("how to schedule a mentor session", "book_session"),
+    ("How do I become a mentor?", "become_mentor"),
+    ("can I apply to be a mentor", "become_mentor"),
+    ("Where can I find internships?", "opportunities"),
+    ("show me some jobs", "opportunities"),
+    ("any scholarships available?", "opportunities"),
+    ("How do I earn XP?", "xp_badges"),
+    ("what badges can I earn", "xp_badges"),
+    ("How does the leaderboard work?", "leaderboard"),
+    ("how can I climb the leaderboard", "leaderboard"),
+    ("How do I refer my friends?", "referral"),
+    ("where is my referral code", "referral"),
+    ("Where can I see my results?", "report"),
+    ("where do I find my report", "report"),
+    ("show me my assessment history", "report"),
+    ("Hello!", "greeting"),
+    ("hii", "greeting"),
+    ("Good morning", "greeting"),
+    ("Thanks!", "thanks"),
+    ("thank you very much", "thanks"),
+    ("What can you help me with?", "capabilities"),
+    ("who are you?", "capabilities"),
+    # must reach the LLM
+    ("I scored 40% in aptitude, what does that mean for engineering?", None),
+    ("Should I do an MBA or a masters in computer science?", None),
+    ("How do I become a doctor?", None),
+    ("I don't know what to do with my life", None),
+    ("what career is best for someone who likes drawing and maths", None),
+    ("can you help me write my resume", None),
+    ("What should I learn to become a UX designer?", None),
+    ("which mentor is better for AI, Priya or Arjun?", None),
+    ("Why did my personality test say I'm introverted?", None),
+    ("my payment failed but money was deducted", None),
+    ("I want to switch from sales to data analytics, where do I start?", None),
+    ("explain the difference between data science and data analytics", None),
+    ("Is it worth learning Python in 2026?", None),
+    ("how should I prepare for my board exams", None),
+]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="FAQ intent classifier check")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--min-recall", type=float, default=0.85, help="share of FAQ paraphrases answered")
+    args = parser.parse_args(argv)
+
+    index = FaqIndex(FACTS)
+    wrong, leaked, answered, faq_total = 0, 0, 0, 0
+    for message, expected in HELD_OUT:
+        matched = index.match(message)
+        got = matched[0] if matched else None
+        intent, score, margin = index.classify(message)
+        if args.verbose or (got is not None and got != expected):
+            print(f"{'OK ' if got == expected else 'BAD'} {message!r}: expected {expected}, got {got} "
+                  f"(nearest {intent} {score:.2f}, margin {margin:.2f})")
+        if expected is None:
+            leaked += got is not None
+            continue
+        faq_total += 1
+        if got is not None:
+            answered += 1
+            wrong += got != expected
+
+    recall = answered / faq_total
+    precision = (answered - wrong) / answered if answered else 1.0
+    message = HELD_OUT[0][0]
+    timer = timeit.Timer(lambda: index.answer(message, USER, False))
+    number, _ = timer.autorange()
+    per_call = min(timer.repeat(repeat=5, number=number)) / number
+    print(f"{faq_total} FAQ paraphrases: {answered} answered ({recall:.0%}), precision {precision:.0%}; "
+          f"{len(HELD_OUT) - faq_total} open questions: {leaked} answered locally; "
+          f"answer {per_call * 1e6:.0f} us")
+
+    ok = True
+    if wrong or leaked:
+        print("FAIL: a message got the wrong answer")
+        ok = False
+    if recall < args.min_recall:
+        print(f"FAIL: recall below {args.min_recall:.0%}")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
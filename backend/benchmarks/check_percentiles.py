@@ -0,0 +1,64 @@
+"""Check incremental score histograms against an exact pandas/NumPy recount.
+
+Feeds synthetic results through the same per-result updates ``record`` makes,
+recounts them with ``count_results`` (the code path of the periodic rebuild),
+fails on any mismatch and reports the cost of a percentile lookup:
+
+    python -m benchmarks.check_percentiles --results 200000
+"""
+import argparse
+import random
+import sys
+import timeit
+from typing import List, Optional
+
+import score_distribution as sd
+
+TEST_TYPES = {
+    "aptitude": ["numerical", "logical", "verbal", "spatial"],
+    "personality": ["openness", "conscientiousness", "extroversion", "agreeableness", "neuroticism"],
+    "career_interest": ["stem", "social", "creative", "business"],
+}
+SEGMENTS = ["student", "graduate", "professional", None]
+
+
+def synthetic_results(count: int, rng: random.Random) -> List[dict]:
+    results = []
+    for i in range(count):
+        test_type = rng.choice(list(TEST_TYPES))
+        result = {"test_type": test_type, "segment": rng.choice(SEGMENTS),
+                  "score": min(100.0, max(0.0, rng.gauss(62, 18)))}
+        if i % 3:  # older results have no subscores
+            result["subscores"] = {d: round(rng.uniform(0, 100), 1) for d in TEST_TYPES[test_type]}
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score histogram consistency check")
+    parser.add_argument("--results", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    results = synthetic_results(args.results, random.Random(4))
+    distributions = sd.ScoreDistributions()
+    for r in results:
+        for key, value in sd.keys_for(r["test_type"], r["segment"], r["score"], r.get("subscores")):
+            distributions.histograms.setdefault(key, sd.Histogram()).add(value)
+
+    exact = sd.count_results(results)
+    mismatched = [k for k in set(exact) | set(distributions.histograms)
+                  if k not in exact or k not in distributions.histograms
+                  or list(exact[k]) != distributions.histograms[k].counts]
+    print(f"{len(exact)} histograms from {args.results} results, {len(mismatched)} mismatched")
+
+    subscores = {"logical": 70.0, "verbal": 40.0}
+    distributions.lookup("aptitude", "student", 75.0, subscores)  # build prefix sums
+    timer = timeit.Timer(lambda: distributions.lookup("aptitude", "student", 75.0, subscores))
+    number, _ = timer.autorange()
+    per_call = min(timer.repeat(repeat=5, number=number)) / number
+    print(f"lookup: {per_call * 1e6:.2f} us  {distributions.lookup('aptitude', 'student', 75.0, subscores)}")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""End-to-end load test for the NEXOSR API.
+
+Starts (optionally) a throwaway mongod, the stub LLM server and the API under
+uvicorn, drives the virtual-user mix at a fixed concurrency and prints
+throughput plus p50/p95/p99 per route. Run from the backend directory:
+
+    python -m benchmarks.loadtest --mongod mongod --concurrency 50 --duration 60
+    python -m benchmarks.loadtest --mongo-url mongodb://localhost:27017 \
+        --baseline /tmp/loadtest-baseline.json
+
+``--save-baseline`` writes the current results; ``--baseline`` compares
+against a stored run and exits non-zero when a route's p95 regresses by more
+than ``--tolerance`` percent. The run also fails when more than
+``--max-error-rate`` percent of a route's requests error: a transport error,
+a 5xx or a 4xx the scenario does not expect (a 401 or 429 is a failure, the
+free-test 403 is not).
+
+No baseline is checked in: latencies only compare on the machine that
+recorded them. Record one on the reference machine with the default settings
+before a change and compare after it:
+
+    python -m benchmarks.loadtest --mongod mongod --save-baseline /tmp/loadtest-baseline.json
+    python -m benchmarks.loadtest --mongod mongod --baseline /tmp/loadtest-baseline.json
+
+A saved summary notes the command line and the machine it ran on; routes
+missing from the baseline are reported but not compared.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import uvicorn
+
+from benchmarks.loadtest.scenarios import Recorder, VirtualUser
+from benchmarks.loadtest.stub_llm import create_stub_app
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for port {port}")
+
+
+def start_mongod(binary: str) -> Tuple[subprocess.Popen, str, str]:
+    dbpath = tempfile.mkdtemp(prefix="nexosr-loadtest-")
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    wait_for_port(port)
+    return process, f"mongodb://127.0.0.1:{port}", dbpath
+
+
+def start_stub_llm(latency_ms: float, jitter_ms: float, failure_rate: float, seed: int) -> Tuple[uvicorn.Server, int]:
+    port = free_port()
+    config = uvicorn.Config(create_stub_app(latency_ms, jitter_ms, failure_rate, seed),
+                            host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_port(port)
+    return server, port
+
+
+def start_api(mongo_url: str, db_name: str, llm_port: int, workers: int) -> Tuple[subprocess.Popen, int]:
+    port = free_port()
+    env = dict(os.environ, MONGO_URL=mongo_url, DB_NAME=db_name,
+               LLM_BASE_URL=f"http://127.0.0.1:{llm_port}", EMERGENT_LLM_KEY="stub")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    wait_for_http(f"http://127.0.0.1:{port}/api/health")
+    return process, port
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict:
+    routes = {}
+    total = 0
+    for route, samples in sorted(recorder.samples.items()):
+        values = sorted(samples)
+        total += len(values)
+        routes[route] = {
+            "count": len(values),
+            "errors": recorder.errors.get(route, 0),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    return {"duration_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 2), "routes": routes}
+
+
+def print_report(summary: Dict) -> None:
+    print(f"\n{summary['requests']} requests in {summary['duration_s']}s ({summary['rps']} req/s)\n")
+    print(f"{'route':<36}{'count':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, row in summary["routes"].items():
+        print(f"{route:<36}{row['count']:>8}{row['errors']:>6}{row['rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+def error_failures(summary: Dict, max_error_rate: float) -> List[str]:
+    failures = []
+    for route, row in summary["routes"].items():
+        rate = row["errors"] / row["count"] * 100 if row["count"] else 0.0
+        if rate > max_error_rate:
+            failures.append(f"{route}: {row['errors']} of {row['count']} requests failed ({rate:.1f}%)")
+    return failures
+
+
+def compare_to_baseline(summary: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for route, row in summary["routes"].items():
+        base = baseline.get("routes", {}).get(route)
+        if not base or not base.get("p95_ms"):
+            print(f"  {route}: no baseline p95, not compared")
+            continue
+        change = (row["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+        if change > tolerance:
+            regressions.append(f"{route}: p95 {base['p95_ms']} -> {row['p95_ms']} ms (+{change:.1f}%)")
+    return regressions
+
+
+async def drive(base_url: str, concurrency: int, duration: float, seed: int) -> Dict:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        await client.post("/api/seed")
+        deadline = time.monotonic() + duration
+        start = time.perf_counter()
+
+        async def run_user(index: int):
+            user = VirtualUser(client, recorder, random.Random(seed + index))
+            await user.sign_up()
+            while time.monotonic() < deadline:
+                await user.step()
+
+        await asyncio.gather(*(run_user(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(recorder, elapsed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="NEXOSR end-to-end load test")
+    mongo = parser.add_mutually_exclusive_group(required=True)
+    mongo.add_argument("--mongod", help="mongod binary to start with a temporary dbpath")
+    mongo.add_argument("--mongo-url", help="existing MongoDB to use (a fresh database is created)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON summary to this file")
+    parser.add_argument("--baseline", help="compare against this JSON summary")
+    parser.add_argument("--save-baseline", help="write the JSON summary as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed p95 regression in percent")
+    parser.add_argument("--max-error-rate", type=float, default=1.0, help="allowed errors per route in percent")
+    args = parser.parse_args(argv)
+
+    mongod = dbpath = None
+    api = llm = None
+    db_name = f"nexosr_loadtest_{uuid.uuid4().hex[:8]}"
+    try:
+        if args.mongod:
+            mongod, mongo_url, dbpath = start_mongod(args.mongod)
+        else:
+            mongo_url = args.mongo_url
+        llm, llm_port = start_stub_llm(args.llm_latency_ms, args.llm_jitter_ms, args.llm_failure_rate, args.seed)
+        api, api_port = start_api(mongo_url, db_name, llm_port, args.workers)
+
+        summary = asyncio.run(drive(f"http://127.0.0.1:{api_port}", args.concurrency, args.duration, args.seed))
+        summary["config"] = {k: v for k, v in vars(args).items() if k not in ("baseline", "save_baseline", "output")}
+        summary["command"] = " ".join(["python -m benchmarks.loadtest", *(sys.argv[1:] if argv is None else argv)])
+        summary["machine"] = {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+                              "cpus": os.cpu_count(), "python": platform.python_version()}
+    finally:
+        if api:
+            api.terminate()
+            api.wait(timeout=15)
+        if llm:
+            llm.should_exit = True
+        if mongod:
+            mongod.terminate()
+            mongod.wait(timeout=15)
+            shutil.rmtree(dbpath, ignore_errors=True)
+        elif args.mongo_url:
+            from pymongo import MongoClient
+            MongoClient(args.mongo_url).drop_database(db_name)
+
+    print_report(summary)
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(summary, indent=2))
+
+    status = 0
+    failures = error_failures(summary, args.max_error_rate)
+    if failures:
+        print(f"\nRoutes above {args.max_error_rate}% errors:")
+        for line in failures:
+            print(f"  {line}")
+        status = 1
+    if args.baseline:
+        print()
+        regressions = compare_to_baseline(summary, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            status = 1
+        else:
+            print("No p95 regressions against baseline.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
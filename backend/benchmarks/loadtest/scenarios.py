@@ -0,0 +1,145 @@
+"""Virtual-user traffic mix for the load test.
+
+Each virtual user registers, logs in and then loops over weighted actions that
+mirror the mobile app: assessments, chat, dashboard, leaderboard and mentors.
+Every request is recorded under its route template so results line up with
+the ``/metrics`` route labels.
+"""
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# action name -> relative weight
+DEFAULT_MIX = {
+    "assessment": 10,
+    "chat": 15,
+    "dashboard": 25,
+    "leaderboard": 15,
+    "mentors_browse": 20,
+    "mentor_book": 5,
+    "opportunities": 10,
+}
+
+TEST_TYPES = ["aptitude", "personality", "career_interest", "skill_assessment"]
+INTERESTS = ["Technology", "Business", "Creative", "Healthcare", "Finance", "Science"]
+# 4xx answers that are part of normal traffic rather than failures
+FREE_LIMIT_STATUS = (403,)  # free users run out of tests
+BOOKING_STATUSES = (400, 409)  # outside the mentor's availability, or the slot is taken
+
+CHAT_PROMPTS = [
+    "What career suits me?",
+    "How do I find a mentor?",
+    "What tests do you offer?",
+    "Which skills should I learn next?",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def record(self, route: str, elapsed: float, ok: bool) -> None:
+        self.samples.setdefault(route, []).append(elapsed)
+        if not ok:
+            self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random,
+                 mix: Optional[Dict[str, int]] = None):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.mix = mix or DEFAULT_MIX
+        self.headers: Dict[str, str] = {}
+        self.actions: Dict[str, Callable] = {
+            "assessment": self.assessment,
+            "chat": self.chat,
+            "dashboard": self.dashboard,
+            "leaderboard": self.leaderboard,
+            "mentors_browse": self.mentors_browse,
+            "mentor_book": self.mentor_book,
+            "opportunities": self.opportunities,
+        }
+
+    async def request(self, method: str, route: str, url: str, expected: Tuple[int, ...] = (),
+                      **kwargs) -> Optional[httpx.Response]:
+        """Send a request; anything but a 2xx or one of ``expected`` counts as an error."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(route, time.perf_counter() - start, False)
+            return None
+        ok = response.is_success or response.status_code in expected
+        self.recorder.record(route, time.perf_counter() - start, ok)
+        return response
+
+    async def sign_up(self) -> None:
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        password = "load-test-pass"
+        await self.request("POST", "/api/auth/register", "/api/auth/register", json={
+            "email": email,
+            "password": password,
+            "name": "Load Tester",
+            "age": self.rng.randint(15, 35),
+            "interests": self.rng.sample(INTERESTS, 2),
+            "goals": "Find a great career",
+        })
+        response = await self.request("POST", "/api/auth/login", "/api/auth/login",
+                                      json={"email": email, "password": password})
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    async def step(self) -> None:
+        names = list(self.mix)
+        action = self.rng.choices(names, weights=[self.mix[n] for n in names])[0]
+        await self.actions[action]()
+
+    async def assessment(self) -> None:
+        test_type = self.rng.choice(TEST_TYPES)
+        response = await self.request("POST", "/api/assessments/start", "/api/assessments/start",
+                                      expected=FREE_LIMIT_STATUS, params={"test_type": test_type})
+        if response is None or response.status_code != 200:
+            return
+        assessment = response.json()
+        answers = [
+            {"question_id": q["id"], "selected": self.rng.randrange(len(q["options"]))}
+            for q in assessment["questions"]
+        ]
+        await self.request("POST", "/api/assessments/submit", "/api/assessments/submit",
+                           json={"assessment_id": assessment["id"], "answers": answers})
+        await self.request("GET", "/api/assessments/{assessment_id}", f"/api/assessments/{assessment['id']}")
+
+    async def chat(self) -> None:
+        await self.request("POST", "/api/chat", "/api/chat", json={"message": self.rng.choice(CHAT_PROMPTS)})
+
+    async def dashboard(self) -> None:
+        await self.request("GET", "/api/dashboard", "/api/dashboard")
+
+    async def leaderboard(self) -> None:
+        await self.request("GET", "/api/leaderboard", "/api/leaderboard")
+
+    async def mentors_browse(self) -> None:
+        await self.request("GET", "/api/mentors", "/api/mentors")
+        await self.request("GET", "/api/mentors/recommended", "/api/mentors/recommended")
+
+    async def mentor_book(self) -> None:
+        response = await self.request("GET", "/api/mentors", "/api/mentors")
+        if response is None or response.status_code != 200 or not response.json():
+            return
+        mentor = self.rng.choice(response.json())
+        scheduled_at = datetime.utcnow() + timedelta(days=self.rng.randint(1, 30), hours=self.rng.randint(0, 23))
+        await self.request("POST", "/api/mentors/book", "/api/mentors/book", expected=BOOKING_STATUSES, json={
+            "mentor_id": mentor["id"],
+            "session_type": self.rng.choice(["30min", "1hr"]),
+            "scheduled_at": scheduled_at.isoformat(),
+        })
+
+    async def opportunities(self) -> None:
+        await self.request("GET", "/api/opportunities/recommended", "/api/opportunities/recommended")
@@ -0,0 +1,70 @@
+"""Local OpenAI-compatible stub used by the load test.
+
+Serves ``POST /chat/completions`` with a configurable latency distribution and
+failure rate so runs are reproducible and never touch the real LLM.
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+STUB_REPORT = {
+    "strengths": ["Logical reasoning", "Curiosity", "Persistence"],
+    "weaknesses": ["Public speaking", "Delegation"],
+    "interests": ["Technology", "Science"],
+    "predicted_learning_path": "Build fundamentals, then specialise through projects",
+    "subject_recommendations": ["Programming", "Statistics", "Communication"],
+    "skill_gaps": ["Networking", "Leadership"],
+    "career_paths": [
+        {"title": "Software Developer", "match_score": 88, "description": "Build software"},
+        {"title": "Data Analyst", "match_score": 82, "description": "Turn data into insight"},
+        {"title": "Research Scientist", "match_score": 76, "description": "Run experiments"},
+        {"title": "Product Manager", "match_score": 70, "description": "Lead products"},
+        {"title": "Technical Writer", "match_score": 64, "description": "Explain technology"},
+    ],
+    "mentor_categories": ["Technology", "Career Coaching"],
+    "summary": "Stub report generated by the load-test LLM server.",
+}
+
+
+def create_stub_app(latency_ms: float = 800.0, jitter_ms: float = 200.0,
+                    failure_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+    rng = random.Random(seed)
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        delay = max(0.0, rng.gauss(latency_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        if rng.random() < failure_rate:
+            return JSONResponse(status_code=500, content={"error": {"message": "stub failure"}})
+
+        if (body.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps(STUB_REPORT)
+        else:
+            content = "Stub answer: keep exploring, take an assessment and talk to a mentor."
+        prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
@@ -0,0 +1,178 @@
+"""Microbenchmarks for the per-request helpers in server.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --save-baseline benchmarks/microbench_baseline.json
+    python -m benchmarks.microbench --baseline benchmarks/microbench_baseline.json
+
+Each case reports the best per-call time over several repeats (GC disabled by
+timeit) and the peak bytes allocated by a single call as seen by tracemalloc.
+With ``--baseline`` the run fails when a case is slower than ``--tolerance``
+percent or allocates more than before.
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import server
+from suggest import SuggestIndex
+
+
+def _sample_user(trial_start) -> dict:
+    return {
+        "_id": "65a1f0c2e4b0a1b2c3d4e5f6",
+        "id": "3f1c2d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f",
+        "email": "bench@example.com",
+        "name": "Bench User",
+        "age": 21,
+        "segment": "graduate",
+        "interests": ["Technology", "Science"],
+        "goals": "Become a data scientist",
+        "language": "en",
+        "is_premium": False,
+        "trial_start": trial_start,
+        "xp_points": 275,
+        "badges": ["Career Explorer"],
+        "created_at": datetime.utcnow(),
+        "tests_taken": 3,
+        "mentor_sessions": 1,
+        "password_hash": "$2b$12$abcdefghijklmnopqrstuuD7bM8a6z3xk0nJfC2tQeQe1uJ6m9W",
+    }
+
+
+def _sample_suggest_index(rng: random.Random) -> SuggestIndex:
+    words = ("data science engineer product design marketing finance python java cloud ai machine "
+             "learning web mobile analyst intern research health sales").split()
+    companies = ["Google", "Microsoft", "Infosys", "TCS", "Flipkart", "Zomato", "Swiggy", "Razorpay"]
+    tags = ["Python", "Technology", "Business", "AI", "Design", "Finance", "Science"]
+    opportunities = [{"id": str(i), "title": " ".join(rng.sample(words, 3)).title(),
+                      "company": rng.choice(companies), "tags": rng.sample(tags, 2)} for i in range(2000)]
+    mentors = [{"id": f"m{i}", "name": f"{rng.choice(['Priya', 'Rahul', 'Anita', 'Vikram'])} {rng.choice(['Sharma', 'Iyer', 'Khan'])}",
+                "expertise": rng.sample(["Python", "Product Management", "Data Science", "UX Design"], 2),
+                "total_sessions": rng.randrange(100), "rating": 4.5, "approved": True} for i in range(500)]
+    index = SuggestIndex()
+    index.rebuild(opportunities, mentors, {"Technology": 300, "Science": 120})
+    return index
+
+
+def _cold_suggest(index: SuggestIndex, prefix: str):
+    index._cache.clear()
+    return index.suggest(prefix)
+
+
+def build_cases() -> List[Tuple[str, Callable[[], object]]]:
+    rng = random.Random(7)
+    user_dt = _sample_user(datetime.utcnow() - timedelta(days=3))
+    user_iso = _sample_user((datetime.utcnow() - timedelta(days=3)).isoformat())
+    token = server.create_token(user_dt["id"], user_dt["email"])
+
+    questions = server.APTITUDE_QUESTIONS[:]
+    answers = [{"question_id": q["id"], "selected": rng.randrange(4)} for q in questions]
+    likert_answers = [{"question_id": q["id"], "selected": rng.randrange(5)} for q in server.PERSONALITY_QUESTIONS]
+
+    assessment_doc = server.Assessment(user_id=user_dt["id"], test_type="aptitude", questions=questions).dict()
+    assessment_doc["_id"] = "65a1f0c2e4b0a1b2c3d4e5f7"
+    history = [dict(assessment_doc) for _ in range(20)]
+
+    user_kwargs = {k: v for k, v in user_dt.items() if k not in ("_id", "password_hash")}
+    suggest_index = _sample_suggest_index(rng)
+
+    return [
+        ("create_token", lambda: server.create_token(user_dt["id"], user_dt["email"])),
+        ("decode_token", lambda: server.decode_token(token)),
+        ("has_premium_access[datetime]", lambda: server.has_premium_access(user_dt)),
+        ("has_premium_access[iso]", lambda: server.has_premium_access(user_iso)),
+        ("get_trial_days_remaining[iso]", lambda: server.get_trial_days_remaining(user_iso)),
+        ("score_assessment[aptitude]", lambda: server.score_assessment("aptitude", questions, answers)),
+        ("score_assessment[likert]", lambda: server.score_assessment("personality", server.PERSONALITY_QUESTIONS,
+                                                                     likert_answers)),
+        ("public_user", lambda: server.public_user(user_dt)),
+        ("strip_id[x20]", lambda: [server.strip_id(a) for a in history]),
+        ("User()", lambda: server.User(**user_kwargs)),
+        ("User().dict()", lambda: server.User(**user_kwargs).dict()),
+        ("Assessment()", lambda: server.Assessment(user_id=user_dt["id"], test_type="aptitude", questions=questions)),
+        ("Assessment().dict()", lambda: server.Assessment(user_id=user_dt["id"], test_type="aptitude",
+                                                          questions=questions).dict()),
+        ("fallback_chat_response[career]", lambda: server.fallback_chat_response(user_dt, "Which career fits me?")),
+        ("fallback_chat_response[default]", lambda: server.fallback_chat_response(user_dt, "hello there")),
+        ("suggest[cold,'p']", lambda: _cold_suggest(suggest_index, "p")),
+        ("suggest[cold,'data sc']", lambda: _cold_suggest(suggest_index, "data sc")),
+        ("suggest[memoised]", lambda: suggest_index.suggest("pro")),
+    ]
+
+
+def time_case(func: Callable[[], object], repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def alloc_case(func: Callable[[], object]) -> int:
+    func()  # warm caches so one-off allocations are not counted
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(0, peak - before)
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, func in build_cases():
+        results[name] = {"ns_per_call": round(time_case(func, repeat) * 1e9, 1), "peak_alloc_bytes": alloc_case(func)}
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name, row in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        slower = (row["ns_per_call"] - base["ns_per_call"]) / base["ns_per_call"] * 100
+        if slower > tolerance:
+            regressions.append(f"{name}: {base['ns_per_call']} -> {row['ns_per_call']} ns (+{slower:.1f}%)")
+        if row["peak_alloc_bytes"] > base["peak_alloc_bytes"] * (1 + tolerance / 100):
+            regressions.append(f"{name}: {base['peak_alloc_bytes']} -> {row['peak_alloc_bytes']} bytes allocated")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="server.py helper microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", help="compare against this JSON file")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=15.0, help="allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    results = run(args.repeat)
+    print(f"{'case':<36}{'ns/call':>12}{'peak bytes':>12}")
+    for name, row in results.items():
+        print(f"{name:<36}{row['ns_per_call']:>12}{row['peak_alloc_bytes']:>12}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Bucketed chat history storage.
+
+Messages of one user are packed into ``chat_buckets`` documents holding up to
+``CHAT_BUCKET_SIZE`` messages each, appended with ``$push``. Each user has at
+most one open bucket (``open: true``, enforced by a unique partial index);
+a full one is closed and the next append opens a new one. Reading the last N
+turns touches the newest one or two buckets instead of N tiny documents.
+Buckets older than ``CHAT_ARCHIVE_AFTER_DAYS`` are closed and compressed in
+place by ``archive_old_buckets``; they stay readable.
+"""
+import asyncio
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import bson
+from bson.binary import Binary
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_COLLECTION = "chat_buckets"
+CHAT_BUCKET_SIZE = int(os.environ.get("CHAT_BUCKET_SIZE", "100"))
+CHAT_ARCHIVE_AFTER_DAYS = int(os.environ.get("CHAT_ARCHIVE_AFTER_DAYS", "30"))
+CHAT_ARCHIVE_INTERVAL = float(os.environ.get("CHAT_ARCHIVE_INTERVAL", "3600"))
+
+
+def _to_bucket_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    # user_id lives on the bucket, no need to repeat it per message
+    return {k: v for k, v in message.items() if k not in ("user_id", "_id")}
+
+
+def bucket_messages(bucket: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Messages of a bucket (decompressing archived ones), with user_id restored."""
+    if bucket.get("archived"):
+        messages = bson.decode(zlib.decompress(bucket["archive"]))["messages"]
+    else:
+        messages = bucket.get("messages", [])
+    user_id = bucket["user_id"]
+    return [{**m, "user_id": user_id} for m in messages]
+
+
+async def append_messages(user_id: str, messages: List[Dict[str, Any]]) -> None:
+    """Append messages to the user's open bucket, opening a new one when it is full."""
+    if not messages:
+        return
+    count = len(messages)
+    timestamps = [m["timestamp"] for m in messages]
+    room = max(CHAT_BUCKET_SIZE - count, 0)
+    for _ in range(5):
+        try:
+            await db[BUCKETS_COLLECTION].update_one(
+                {"user_id": user_id, "open": True, "archived": False, "count": {"$lte": room}},
+                {
+                    "$push": {"messages": {"$each": [_to_bucket_message(m) for m in messages]}},
+                    "$inc": {"count": count},
+                    "$min": {"start": min(timestamps)},
+                    "$max": {"end": max(timestamps)},
+                },
+                upsert=True,
+            )
+            return
+        except DuplicateKeyError:
+            # The open bucket is full, or a concurrent turn opened one first:
+            # close it if it has no room and try again.
+            await db[BUCKETS_COLLECTION].update_one(
+                {"user_id": user_id, "open": True, "count": {"$gt": room}}, {"$unset": {"open": ""}}
+            )
+    raise RuntimeError(f"Could not append chat messages for {user_id}")
+
+
+async def recent_messages(user_id: str, limit: int) -> List[Dict[str, Any]]:
+    """The user's last ``limit`` messages in chronological order."""
+    collected: List[Dict[str, Any]] = []
+    # $slice keeps full buckets from being shipped when only a few turns are needed
+    projection = {"messages": {"$slice": -limit}} if limit else None
+    cursor = db[BUCKETS_COLLECTION].find({"user_id": user_id}, projection).sort("end", -1).batch_size(2)
+    async for bucket in cursor:
+        # Time ranges of buckets can overlap (migrated history next to live
+        # buckets), so stop only once a bucket ends before everything kept.
+        if limit and len(collected) >= limit and bucket["end"] < collected[-limit]["timestamp"]:
+            break
+        collected.extend(bucket_messages(bucket))
+        collected.sort(key=lambda m: m["timestamp"])
+    return collected[-limit:] if limit else collected
+
+
+async def archive_old_buckets(older_than: timedelta = timedelta(days=CHAT_ARCHIVE_AFTER_DAYS)) -> int:
+    """Compress buckets whose newest message is older than ``older_than``."""
+    cutoff = datetime.utcnow() - older_than
+    archived = 0
+    cursor = db[BUCKETS_COLLECTION].find({"archived": False, "end": {"$lt": cutoff}})
+    async for bucket in cursor:
+        payload = zlib.compress(bson.encode({"messages": bucket.get("messages", [])}), 6)
+        result = await db[BUCKETS_COLLECTION].update_one(
+            # only archive if nothing was appended meanwhile
+            {"_id": bucket["_id"], "archived": False, "count": bucket["count"]},
+            {"$set": {"archived": True, "archive": Binary(payload)}, "$unset": {"messages": "", "open": ""}},
+        )
+        archived += result.modified_count
+    return archived
+
+
+async def run_archiver(interval: float = CHAT_ARCHIVE_INTERVAL) -> None:
+    while True:
+        try:
+            archived = await archive_old_buckets()
+            if archived:
+                logger.info(f"Archived {archived} chat buckets")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Chat archival failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,149 @@
+"""MongoDB access for the NEXOSR API.
+
+The Motor client is created lazily on first use and is owned by the process
+that created it: after a fork (gunicorn pre-fork workers) the child builds its
+own client instead of reusing the parent's sockets. Route code keeps using
+``db.<collection>`` through a small proxy.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from metrics import MongoCommandListener
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[AsyncIOMotorClient] = None
+_client_pid: Optional[int] = None
+
+# collection -> list of (keys, options)
+INDEXES = {
+    "users": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+        ([("xp_points", DESCENDING)], {}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "assessments": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING), ("completed", ASCENDING), ("completed_at", DESCENDING)], {}),
+        ([("user_id", ASCENDING), ("updated_at", ASCENDING)], {}),
+        ([("completed_at", ASCENDING)], {"partialFilterExpression": {"report_pending": True}}),
+    ],
+    "chat_messages": [
+        ([("user_id", ASCENDING), ("timestamp", ASCENDING)], {}),
+    ],
+    "chat_buckets": [
+        ([("user_id", ASCENDING), ("end", DESCENDING)], {}),
+        ([("user_id", ASCENDING)], {"unique": True, "partialFilterExpression": {"open": True}}),
+        ([("archived", ASCENDING), ("end", ASCENDING)], {}),
+    ],
+    "mentors": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("user_id", ASCENDING)], {}),
+        ([("approved", ASCENDING), ("category", ASCENDING)], {}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "mentor_sessions": [
+        ([("id", ASCENDING)], {"unique": True}),
+        ([("mentee_id", ASCENDING), ("scheduled_at", DESCENDING)], {}),
+        ([("mentor_id", ASCENDING), ("scheduled_at", DESCENDING)], {}),
+        ([("mentee_id", ASCENDING), ("updated_at", ASCENDING)], {}),
+        ([("mentor_id", ASCENDING), ("updated_at", ASCENDING)], {}),
+    ],
+    "mentor_slot_locks": [
+        ([("mentor_id", ASCENDING), ("slot", ASCENDING)], {"unique": True}),
+        ([("session_id", ASCENDING)], {}),
+    ],
+    "opportunities": [
+        ([("created_at", DESCENDING)], {}),
+        ([("tags", ASCENDING)], {}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "idempotency_keys": [
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+    "payments": [
+        ([("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+        ([("status", ASCENDING)], {}),
+        ([("user_id", ASCENDING), ("updated_at", ASCENDING)], {}),
+        ([("updated_at", DESCENDING)], {}),
+    ],
+    "sync_tombstones": [
+        ([("user_ids", ASCENDING), ("deleted_at", ASCENDING)], {}),
+        ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+    ],
+}
+
+
+def get_client() -> AsyncIOMotorClient:
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        _client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'],
+            minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+            maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+            event_listeners=[MongoCommandListener()],
+        )
+        _client_pid = os.getpid()
+    return _client
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    return get_client()[os.environ.get('DB_NAME', 'nexosr_db')]
+
+
+def close_client() -> None:
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        _client.close()
+    _client = None
+    _client_pid = None
+
+
+class _LazyDatabase:
+    """Forwards ``db.users`` / ``db["users"]`` to the current process's database."""
+
+    def __getattr__(self, name):
+        return getattr(get_db(), name)
+
+    def __getitem__(self, name):
+        return get_db()[name]
+
+
+db = _LazyDatabase()
+
+
+async def wait_until_connected(timeout: float = 30.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        try:
+            await get_db().command("ping")
+            return
+        except Exception as e:
+            if asyncio.get_running_loop().time() >= deadline:
+                raise
+            logger.warning(f"MongoDB not reachable yet: {e}")
+            await asyncio.sleep(1.0)
+
+
+async def warm_pool(connections: int) -> None:
+    """Open ``connections`` sockets up front so the first requests don't pay for the handshake."""
+    database = get_db()
+    await asyncio.gather(*(database.command("ping") for _ in range(connections)))
+
+
+async def ensure_indexes() -> None:
+    database = get_db()
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await database[collection].create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. duplicate legacy data blocking a unique index; serve anyway.
+                logger.warning(f"Could not create index {keys} on {collection}: {e}")
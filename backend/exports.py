@@ -0,0 +1,271 @@
+"""Streaming exports of admin data as NDJSON, CSV or Parquet.
+
+Rows are read from a Mongo cursor in batches and encoded chunk by chunk, so
+memory stays flat no matter how large the collection is: at most one batch
+of documents (one row group for Parquet) and one encoded chunk are alive at
+a time. The same generators
+back ``GET /api/admin/exports/{dataset}`` and the CLI:
+
+    python -m exports payments --format csv --since 2025-01-01 --out payments.csv
+
+Parquet needs ``pyarrow`` and is flushed one row group at a time.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from database import close_client, db
+from timeutil import to_utc_naive
+
+EXPORT_BATCH_SIZE = 1000
+# Rows per Parquet row group; bounds what is buffered between yields
+PARQUET_ROW_GROUP_SIZE = 50_000
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+@dataclass(frozen=True)
+class ExportSpec:
+    collection: str
+    date_field: str
+    fields: Dict[str, str]  # exportable field -> type: string, int, float, bool, datetime, list, json
+    default_fields: List[str]
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "users": ExportSpec(
+        "users", "created_at",
+        {"id": "string", "email": "string", "name": "string", "age": "int", "segment": "string",
+         "interests": "list", "goals": "string", "language": "string", "is_premium": "bool",
+         "trial_start": "datetime", "xp_points": "int", "badges": "list", "tests_taken": "int",
+         "mentor_sessions": "int", "referrals": "int", "referred_by": "string", "created_at": "datetime"},
+        ["id", "email", "name", "age", "segment", "interests", "is_premium", "xp_points",
+         "tests_taken", "mentor_sessions", "referrals", "created_at"],
+    ),
+    "payments": ExportSpec(
+        "payments", "created_at",
+        {"id": "string", "user_id": "string", "amount": "float", "currency": "string", "type": "string",
+         "status": "string", "description": "string", "created_at": "datetime"},
+        ["id", "user_id", "amount", "currency", "type", "status", "description", "created_at"],
+    ),
+    "assessments": ExportSpec(
+        "assessments", "created_at",
+        {"id": "string", "user_id": "string", "test_type": "string", "segment": "string", "score": "float",
+         "subscores": "json", "completed": "bool", "answers": "json", "ai_report": "json",
+         "created_at": "datetime", "completed_at": "datetime"},
+        ["id", "user_id", "test_type", "segment", "score", "completed", "created_at", "completed_at"],
+    ),
+    "sessions": ExportSpec(
+        "mentor_sessions", "scheduled_at",
+        {"id": "string", "mentor_id": "string", "mentee_id": "string", "mentor_name": "string",
+         "mentee_name": "string", "session_type": "string", "scheduled_at": "datetime", "ends_at": "datetime",
+         "status": "string", "price": "float", "notes": "string", "created_at": "datetime"},
+        ["id", "mentor_id", "mentee_id", "session_type", "scheduled_at", "status", "price", "created_at"],
+    ),
+}
+
+
+def resolve_fields(spec: ExportSpec, fields: Optional[Iterable[str]]) -> List[str]:
+    """Requested fields in order, validated against the spec; ValueError on unknown ones."""
+    if not fields:
+        return list(spec.default_fields)
+    fields = list(dict.fromkeys(f.strip() for f in fields if f.strip()))
+    unknown = [f for f in fields if f not in spec.fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def build_filter(spec: ExportSpec, since: Optional[datetime], until: Optional[datetime]) -> Dict[str, Any]:
+    window = {}
+    if since is not None:
+        window["$gte"] = to_utc_naive(since)
+    if until is not None:
+        window["$lt"] = to_utc_naive(until)
+    return {spec.date_field: window} if window else {}
+
+
+async def iter_batches(spec: ExportSpec, fields: List[str], query: Dict[str, Any],
+                       batch_size: int = EXPORT_BATCH_SIZE, database=None) -> AsyncIterator[List[dict]]:
+    database = database if database is not None else db
+    projection = {"_id": 0, **{f: 1 for f in fields}}
+    cursor = database[spec.collection].find(query, projection, batch_size=batch_size).sort("_id", 1)
+    batch: List[dict] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ==================== ENCODERS ====================
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _cell(value, kind: str):
+    if value is None:
+        return ""
+    if kind == "datetime" and isinstance(value, datetime):
+        return value.isoformat()
+    if kind in ("list", "json"):
+        return json.dumps(value, default=_json_default)
+    return value
+
+
+async def encode_ndjson(batches: AsyncIterator[List[dict]], spec: ExportSpec, fields: List[str]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(
+            json.dumps({f: doc.get(f) for f in fields}, default=_json_default) + "\n" for doc in batch
+        ).encode()
+
+
+async def encode_csv(batches: AsyncIterator[List[dict]], spec: ExportSpec, fields: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    kinds = [spec.fields[f] for f in fields]
+    async for batch in batches:
+        writer.writerows([_cell(doc.get(f), k) for f, k in zip(fields, kinds)] for doc in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_schema(spec: ExportSpec, fields: List[str]):
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+        "datetime": pa.timestamp("ms"), "list": pa.list_(pa.string()), "json": pa.string(),
+    }
+    return pa.schema([(f, types[spec.fields[f]]) for f in fields])
+
+
+async def encode_parquet(batches: AsyncIterator[List[dict]], spec: ExportSpec, fields: List[str]) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(spec, fields)
+    json_fields = {f for f in fields if spec.fields[f] == "json"}
+    sink = _DrainableSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    pending: List = []  # record batches of the row group being filled
+    pending_rows = 0
+    try:
+        async for batch in batches:
+            columns = {
+                f: [json.dumps(doc[f], default=_json_default) if f in json_fields and doc.get(f) is not None
+                    else doc.get(f) for doc in batch]
+                for f in fields
+            }
+            pending.append(pa.RecordBatch.from_pydict(columns, schema=schema))
+            pending_rows += len(batch)
+            if pending_rows >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.Table.from_batches(pending, schema=schema), row_group_size=pending_rows)
+                pending, pending_rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema), row_group_size=pending_rows)
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv, "parquet": encode_parquet}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_stream(dataset: str, format: str = "ndjson", fields: Optional[Iterable[str]] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None,
+                  batch_size: int = EXPORT_BATCH_SIZE, database=None) -> AsyncIterator[bytes]:
+    """Encoded chunks of ``dataset``; raises ValueError for bad arguments before any I/O."""
+    if dataset not in EXPORTS:
+        raise ValueError(f"Unknown dataset {dataset}; expected one of {', '.join(EXPORTS)}")
+    if format not in ENCODERS:
+        raise ValueError(f"Unknown format {format}; expected one of {', '.join(ENCODERS)}")
+    if format == "parquet" and not parquet_available():
+        raise ValueError("Parquet export needs pyarrow installed")
+    spec = EXPORTS[dataset]
+    columns = resolve_fields(spec, fields)
+    batches = iter_batches(spec, columns, build_filter(spec, since, until), batch_size, database)
+    return ENCODERS[format](batches, spec, columns)
+
+# ==================== CLI ====================
+
+async def _export_to(out, dataset: str, format: str, fields, since, until) -> None:
+    async for chunk in export_stream(dataset, format, fields, since, until):
+        out.write(chunk)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Stream an admin export to a file")
+    parser.add_argument("dataset", choices=sorted(EXPORTS))
+    parser.add_argument("--format", choices=sorted(ENCODERS), default="ndjson")
+    parser.add_argument("--fields", help="comma-separated field list")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date/time, inclusive")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO date/time, exclusive")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    fields = args.fields.split(",") if args.fields else None
+    try:
+        if args.out:
+            with open(args.out, "wb") as out:
+                asyncio.run(_export_to(out, args.dataset, args.format, fields, args.since, args.until))
+        else:
+            asyncio.run(_export_to(sys.stdout.buffer, args.dataset, args.format, fields, args.since, args.until))
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        close_client()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""Local intent classifier and FAQ answers for the chat assistant.
+
+Many chat messages are the same handful of product questions ("what tests do
+you offer", "how do I find a mentor"). ``FaqIndex`` answers those locally,
+before any LLM call. It is trained at import time from the labelled examples
+in ``INTENTS``. Messages and examples become TF-IDF vectors of words, word
+bigrams and character trigrams; a message takes the intent of its nearest
+examples (cosine similarity, looked up through an inverted index). It is
+answered only when the best intent is clearly ahead of the runner-up. The
+``out_of_scope`` examples pull personal or open-ended questions away from the
+FAQ intents, so those still reach the LLM.
+
+Answers are ``str.format`` templates. They are filled with product facts
+passed in by the server and personalised with the user's name, segment and
+interests.
+"""
+import math
+import os
+import re
+import time
+from collections import Counter as TermCounter
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import LLM_REQUEST_DURATION, REGISTRY, Counter
+
+FAQ_ENABLED = os.environ.get("FAQ_ENABLED", "true").lower() == "true"
+FAQ_MIN_SCORE = float(os.environ.get("FAQ_MIN_SCORE", "0.5"))
+FAQ_MIN_MARGIN = float(os.environ.get("FAQ_MIN_MARGIN", "0.1"))
+FAQ_MAX_WORDS = int(os.environ.get("FAQ_MAX_WORDS", "20"))  # longer messages are rarely plain FAQs
+# Assumed LLM chat latency until this worker has timed a real call
+FAQ_ASSUMED_LLM_SECONDS = float(os.environ.get("FAQ_ASSUMED_LLM_SECONDS", "2.0"))
+OUT_OF_SCOPE = "out_of_scope"
+
+CHAT_ANSWERS = REGISTRY.register(Counter(
+    "nexosr_chat_answers_total", "Chat replies by source: faq, llm or fallback.", ("source",)))
+CHAT_FAQ_INTENTS = REGISTRY.register(Counter(
+    "nexosr_chat_faq_intents_total", "Chat messages answered locally by FAQ intent.", ("intent",)))
+CHAT_LLM_SECONDS_SAVED = REGISTRY.register(Counter(
+    "nexosr_chat_llm_seconds_saved_total", "Estimated LLM latency avoided by FAQ answers."))
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def record_chat_answer(source: str) -> None:
+    """Count a chat reply that did not come from the FAQ (llm or fallback)."""
+    CHAT_ANSWERS.inc(source)
+
+
+@dataclass
+class Intent:
+    name: str
+    examples: List[str]
+    answer: str = ""  # empty for out_of_scope
+    premium_answer: Optional[str] = None  # used instead of answer for premium and trial users
+    segment_tips: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class FaqAnswer:
+    intent: str
+    message: str
+    score: float
+    seconds: float
+
+
+INTERESTS_DEFAULT = "the fields you care about"
+
+# ==================== DATASET ====================
+
+INTENTS: List[Intent] = [
+    Intent(
+        "tests_offered",
+        ["what tests do you offer", "which assessments are available", "what kind of tests can i take",
+         "list all the tests", "what types of assessments do you have", "tell me about your tests",
+         "which test should i take", "what psychometric tests are there", "do you have a personality test",
+         "is there an aptitude test", "what assessments can i do here", "show me the available tests",
+         "what tests are there", "what assessments are offered"],
+        "We offer 4 assessments: 1) Aptitude Test - numerical, logical, verbal and spatial reasoning, "
+        "2) Personality Assessment - your work style and traits, 3) Career Interest Test - the fields that "
+        "suit your passions, 4) Skill Assessment - your current abilities. Each has 15 questions and takes "
+        "about 10-15 minutes. {tip}",
+        segment_tips={
+            "student": "As a student, the Career Interest Test is a great place to start.",
+            "graduate": "As a graduate, start with the Aptitude Test and follow up with the Career Interest Test.",
+            "professional": "As a professional, the Skill Assessment shows where to grow next.",
+        },
+    ),
+    Intent(
+        "test_process",
+        ["how long does a test take", "how many questions are in a test", "how are the tests scored",
+         "how does the assessment work", "how much time do i need for the test", "can i retake a test",
+         "how is my score calculated", "how long is the aptitude test", "what happens after i finish a test",
+         "is the test timed", "can i do the test again", "how do assessments work"],
+        "Every assessment has 15 questions and takes about 10-15 minutes. You get your score and a report "
+        "with strengths, skill gaps and matching careers as soon as you submit, plus {assessment_xp} XP. "
+        "You can take a test again later to track your progress.",
+    ),
+    Intent(
+        "free_limit",
+        ["how many tests can i take for free", "why can't i take another test", "is there a limit on tests",
+         "it says free users can only take 2 tests", "can i take more tests without paying",
+         "are the assessments free", "do i have to pay for tests", "test limit reached", "is it free to take tests",
+         "can i start a new test"],
+        "Free accounts can complete {free_tests} assessments. Premium and trial users can take unlimited "
+        "tests, starting from {monthly_price} per month.",
+        premium_answer="You have premium access, so you can take as many assessments as you like, {name}.",
+    ),
+    Intent(
+        "premium",
+        ["what does premium include", "how much does premium cost", "what are the subscription plans",
+         "benefits of premium", "is premium worth it", "premium price", "how do i upgrade to premium",
+         "what do i get with a subscription", "subscription plans and pricing", "how do i subscribe"],
+        "Nexosr Premium gives you {premium_features}. Plans: {monthly_price} per month, {quarterly_price} per quarter or {annual_price} "
+        "per year. You can upgrade from the Premium page.",
+        premium_answer="You already have premium access, {name}: {premium_features}. Plans are {monthly_price} per month, "
+                       "{quarterly_price} per quarter or {annual_price} per year.",
+    ),
+    Intent(
+        "trial",
+        ["how long is the free trial", "when does my trial end", "is there a free trial",
+         "how many trial days do i have left", "what happens when my trial expires", "trial period length",
+         "when will my trial run out"],
+        "Every new account gets a {trial_days}-day free premium trial from sign-up. The days left are shown on "
+        "your dashboard. After the trial you keep your reports and can upgrade any time.",
+    ),
+    Intent(
+        "find_mentor",
+        ["how do i find a mentor", "can you recommend a mentor", "i want to talk to a mentor",
+         "how do i connect with mentors", "where are the mentors", "find me a mentor",
+         "who can mentor me", "suggest some mentors for me", "are there mentors in my field",
+         "how does mentorship work", "i need a mentor", "can i speak to a mentor"],
+        "Open the Mentors section to browse approved mentors by category and expertise. Look for mentors in "
+        "{interests}. {tip} Premium users also get AI-matched mentor recommendations based on their latest "
+        "assessment.",
+        segment_tips={
+            "student": "Mentors who help students pick subjects and colleges are a good first step.",
+            "graduate": "Mentors working in the roles you are applying for can help with your first job.",
+            "professional": "Senior mentors in your target role can help you plan a switch or promotion.",
+        },
+    ),
+    Intent(
+        "book_session",
+        ["how do i book a mentor session", "how much does a mentor session cost", "book a session",
+         "how do i schedule a call with a mentor", "what session lengths are there", "how to book a mentor",
+         "can i book a 30 minute session", "where do i see my booked sessions", "session price"],
+        "Pick a mentor in the Mentors section, choose a free slot and a 30-minute or 1-hour session. The "
+        "mentor sets the price for each. Your booked sessions appear under My Sessions, and each booking "
+        "earns you {mentor_session_xp} XP.",
+    ),
+    Intent(
+        "become_mentor",
+        ["how can i become a mentor", "i want to be a mentor", "how do i apply as a mentor",
+         "can i mentor others", "mentor application", "how do i register as a mentor"],
+        "Apply from the Become a Mentor page with your expertise, experience, category and session rates. "
+        "Our team reviews every application, and your profile goes live once it is approved.",
+    ),
+    Intent(
+        "opportunities",
+        ["where can i find internships", "show me job opportunities", "are there any courses for me",
+         "how do i find scholarships", "where are the jobs", "find internships for me",
+         "what opportunities are available", "recommend some courses", "any jobs for freshers", "show me jobs",
+         "jobs for me", "list internships"],
+        "The Opportunities section lists internships, jobs, courses and scholarships, and you can filter them "
+        "by type. Recommended opportunities are matched to {interests} and your latest assessment. {tip}",
+        segment_tips={
+            "student": "Courses and scholarships are a good fit while you are studying.",
+            "graduate": "Internships and entry-level jobs are a good place to start.",
+            "professional": "Courses are a quick way to pick up skills for your next role.",
+        },
+    ),
+    Intent(
+        "xp_badges",
+        ["how do i earn xp", "what badges are there", "how do i get badges", "what are xp points",
+         "how do i get more points", "what is the career explorer badge", "how do badges work",
+         "how many xp for a test", "which badges can i get", "list of badges"],
+        "You earn {assessment_xp} XP for each assessment, {mentor_session_xp} XP for each mentor session and "
+        "{referral_xp} XP for each friend you refer. Badges: {badges}.",
+    ),
+    Intent(
+        "leaderboard",
+        ["how does the leaderboard work", "how do i rank higher", "how do i get on the leaderboard",
+         "what is my rank", "who is top of the leaderboard", "how is the leaderboard calculated"],
+        "The leaderboard shows the top 20 users by XP. To climb it, take assessments ({assessment_xp} XP), "
+        "book mentor sessions ({mentor_session_xp} XP) and refer friends ({referral_xp} XP).",
+    ),
+    Intent(
+        "referral",
+        ["how do referrals work", "how do i invite friends", "what is my referral code",
+         "do i get anything for referring friends", "refer a friend", "how do i share my referral code"],
+        "Share your referral code from your profile with friends. When a friend signs up with it, you earn "
+        "{referral_xp} XP, and the Community Star badge after 3 referrals.",
+    ),
+    Intent(
+        "report",
+        ["where can i see my report", "when will my report be ready", "how do i view my results",
+         "where are my past assessments", "show my assessment history", "where is my career report",
+         "how do i read my report", "can i see my old results"],
+        "Your report is ready as soon as you submit a test and stays under Assessment History, together with "
+        "your dimension scores and percentiles. {report_note}",
+        premium_answer="Your report is ready as soon as you submit a test and stays under Assessment History, "
+                       "together with your dimension scores and percentiles. {premium_report_note}",
+    ),
+    Intent(
+        "greeting",
+        ["hi", "hello", "hey", "hey there", "good morning", "good evening", "hello nexosr", "hi there",
+         "namaste", "yo", "hii", "helo", "hiii"],
+        "Hi {name}! I'm Nexosr AI, your future companion. I can help with career guidance, skills, mentors and "
+        "opportunities. What would you like to explore today?",
+    ),
+    Intent(
+        "thanks",
+        ["thank you", "thanks", "thanks a lot", "thank you so much", "great thanks", "ok thanks",
+         "that helps thanks", "appreciate it"],
+        "You're welcome, {name}! Ask me anything else about your career journey whenever you like.",
+    ),
+    Intent(
+        "capabilities",
+        ["what can you do", "who are you", "how can you help me", "what is nexosr", "what are you",
+         "what is this app", "what can i ask you", "are you a bot"],
+        "I'm Nexosr AI, your future companion. I can suggest careers from your assessments, advise on skills "
+        "to learn, help you find mentors and point you to opportunities in {interests}. {tip}",
+        segment_tips={
+            "student": "Ask me about subjects, streams or colleges too.",
+            "graduate": "Ask me about first jobs, internships or higher studies too.",
+            "professional": "Ask me about career switches, promotions or upskilling too.",
+        },
+    ),
+    Intent(
+        OUT_OF_SCOPE,
+        ["should i choose engineering or medicine", "what career suits me based on my report",
+         "explain my aptitude results", "why is my personality score low", "can you review my resume",
+         "how do i prepare for a job interview", "i am confused about my future", "which college is best for me",
+         "i failed my exams what should i do", "how do i become a data scientist",
+         "what should i study after 12th", "is it too late to switch careers at 30",
+         "write a cover letter for me", "can you help me with my cv", "how do i ask for a raise",
+         "how do i become a software engineer", "how can i become a teacher", "how to become a lawyer",
+         "how do i become a pilot", "how do i become an architect", "i feel stressed about exams",
+         "what skills do i need for product management", "tell me a joke",
+         "my mentor did not show up for my session", "i was charged twice for premium",
+         "what is the salary of a software engineer", "help me plan my week"],
+    ),
+]
+
+# ==================== CLASSIFIER ====================
+
+def tokenize(text: str) -> List[str]:
+    return _NON_WORD.sub(" ", text.casefold()).split()
+
+
+def features(words: List[str]) -> TermCounter:
+    """Words, word bigrams and character trigrams (with word boundaries)."""
+    terms = TermCounter(f"w:{w}" for w in words)
+    terms.update(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        terms.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return terms
+
+
+def _join(items: List[str]) -> str:
+    return items[0] if len(items) == 1 else f"{', '.join(items[:-1])} and {items[-1]}"
+
+
+class FaqIndex:
+    """TF-IDF nearest-example classifier over ``INTENTS`` plus answer rendering.
+
+    ``facts`` fills product details (prices, limits, XP) into the answers.
+    """
+
+    def __init__(self, facts: Dict[str, Any], intents: List[Intent] = INTENTS):
+        self.facts = facts
+        self.intents = {intent.name: intent for intent in intents}
+        examples = [(intent.name, features(tokenize(text))) for intent in intents for text in intent.examples]
+        document_frequency = TermCounter(term for _, terms in examples for term in terms)
+        self.idf = {term: math.log((1 + len(examples)) / (1 + df)) + 1 for term, df in document_frequency.items()}
+        self.unseen_idf = math.log(1 + len(examples)) + 1
+        self.labels = [name for name, _ in examples]
+        # term -> [(example index, weight)], so scoring only touches examples sharing a term
+        self.postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for index, (_, terms) in enumerate(examples):
+            for term, weight in self._vector(terms).items():
+                self.postings[term].append((index, weight))
+
+    def _vector(self, terms: TermCounter) -> Dict[str, float]:
+        # unseen terms keep their weight in the norm: words the dataset never
+        # mentions ("doctor", "resume") mean the message is about something else
+        weights = {t: (1 + math.log(n)) * self.idf.get(t, self.unseen_idf) for t, n in terms.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {t: w / norm for t, w in weights.items()}
+
+    def classify(self, message: str) -> Tuple[Optional[str], float, float]:
+        """(best intent, its similarity, margin over the next intent)."""
+        similarity: Dict[int, float] = defaultdict(float)
+        for term, weight in self._vector(features(tokenize(message))).items():
+            for index, example_weight in self.postings.get(term, ()):
+                similarity[index] += weight * example_weight
+        best: Dict[str, float] = {}
+        for index, score in similarity.items():
+            label = self.labels[index]
+            if score > best.get(label, 0.0):
+                best[label] = score
+        if not best:
+            return None, 0.0, 0.0
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        return ranked[0][0], ranked[0][1], ranked[0][1] - runner_up
+
+    def match(self, message: str) -> Optional[Tuple[str, float]]:
+        """The FAQ intent ``message`` asks for, if the classifier is confident."""
+        if not FAQ_ENABLED or len(tokenize(message)) > FAQ_MAX_WORDS:
+            return None
+        intent, score, margin = self.classify(message)
+        if intent is None or intent == OUT_OF_SCOPE or score < FAQ_MIN_SCORE or margin < FAQ_MIN_MARGIN:
+            return None
+        return intent, score
+
+    def render(self, intent_name: str, user: dict, premium: bool) -> str:
+        intent = self.intents[intent_name]
+        interests = user.get("interests") or []
+        segment = user.get("segment", "student")
+        context = {
+            **self.facts,
+            "name": (user.get("name") or "there").split()[0],
+            "segment": segment,
+            "interests": _join(interests) if interests else INTERESTS_DEFAULT,
+            "tip": intent.segment_tips.get(segment, ""),
+        }
+        template = intent.premium_answer if premium and intent.premium_answer else intent.answer
+        return " ".join(template.format(**context).split())
+
+    def answer(self, message: str, user: dict, premium: bool) -> Optional[FaqAnswer]:
+        """A local answer for a confident FAQ match, else None (ask the LLM)."""
+        started = time.perf_counter()
+        matched = self.match(message)
+        if matched is None:
+            return None
+        intent, score = matched
+        reply = FaqAnswer(intent, self.render(intent, user, premium), score, time.perf_counter() - started)
+        CHAT_ANSWERS.inc("faq")
+        CHAT_FAQ_INTENTS.inc(intent)
+        CHAT_LLM_SECONDS_SAVED.inc(amount=max(0.0, self.llm_seconds() - reply.seconds))
+        return reply
+
+    @staticmethod
+    def llm_seconds() -> float:
+        """Mean latency of successful LLM chat calls on this worker."""
+        return LLM_REQUEST_DURATION.mean("chat", "success") or FAQ_ASSUMED_LLM_SECONDS
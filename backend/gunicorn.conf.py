@@ -0,0 +1,20 @@
+# Gunicorn settings for running the API with several uvicorn workers:
+#
+#     gunicorn -c gunicorn.conf.py server:app
+#
+# The app is imported once in the master (preload) and forked; Mongo and LLM
+# clients are created lazily inside each worker's lifespan, so no sockets are
+# shared across the fork.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+# How long a worker may keep serving open requests after SIGTERM before it is
+# killed; its lifespan shutdown (and DRAIN_TIMEOUT) only starts afterwards.
+# Running uvicorn alone, pass --timeout-graceful-shutdown for the same bound.
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
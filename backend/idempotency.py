@@ -0,0 +1,259 @@
+"""``Idempotency-Key`` support for POST routes.
+
+A POST carrying an ``Idempotency-Key`` header claims a record in
+``idempotency_keys`` (scoped to the caller's user id) before it runs. The
+record stores a fingerprint of the request and, once the handler finishes,
+its serialized response; a retry with the same key gets that response
+replayed (``Idempotent-Replayed: true``) instead of running the handler
+again. A duplicate that arrives while the first request is still running
+waits for it. Records expire through a TTL index.
+
+Server errors (5xx) are not stored: the record is released so a retry runs
+the handler again. A running request keeps extending its lock; if its
+worker dies, the lock expires and a waiting duplicate takes over.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from bson import Binary
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from starlette.responses import JSONResponse
+
+from database import db
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "30"))
+MAX_KEY_LENGTH = 255
+MAX_STORED_BODY = 1 * 2**20
+POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 1.0
+
+IDEMPOTENT_REQUESTS = REGISTRY.register(Counter(
+    "nexosr_idempotent_requests_total", "POST requests with an Idempotency-Key by outcome.", ("outcome",)))
+
+
+def fingerprint(method: str, path: str, query: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def record_id(principal: str, key: str) -> str:
+    return hashlib.sha256(f"{principal}\0{key}".encode()).hexdigest()
+
+
+def _header(scope: dict, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware; ``identify`` maps a bearer token to a user id or None."""
+
+    def __init__(self, app, identify: Callable[[str], Optional[str]]):
+        self.app = app
+        self.identify = identify
+        self._done: Dict[str, asyncio.Event] = {}  # same-worker waiters wake up without polling
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        key = _header(scope, IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await JSONResponse({"detail": "Invalid Idempotency-Key"}, status_code=400)(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        request_fingerprint = fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+        rid = record_id(self._principal(scope), key)
+        try:
+            response = await self._claim_or_wait(rid, request_fingerprint)
+        except PyMongoError as e:
+            # the key store is down; running without protection beats failing every POST
+            logger.error(f"Idempotency store unavailable, running request unprotected: {e}")
+            await self.app(scope, self._replay_body(body, receive), send)
+            return
+        if response is not None:
+            await response(scope, receive, send)
+            return
+        await self._execute(rid, scope, self._replay_body(body, receive), send)
+
+    def _principal(self, scope: dict) -> str:
+        scheme, _, token = (_header(scope, b"authorization") or "").partition(" ")
+        user_id = self.identify(token) if scheme.lower() == "bearer" and token else None
+        return user_id or "anonymous"
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _replay_body(body: bytes, receive):
+        sent = False
+
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()  # only http.disconnect is left
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return replay
+
+    # ---- claiming ----
+
+    async def _claim_or_wait(self, rid: str, request_fingerprint: str):
+        """None once this request owns the key, else the response to send."""
+        collection = db[IDEMPOTENCY_COLLECTION]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+        delay = POLL_INTERVAL
+        waited = False
+        while True:
+            now = datetime.utcnow()
+            try:
+                await collection.insert_one({
+                    "_id": rid,
+                    "fingerprint": request_fingerprint,
+                    "state": "running",
+                    "locked_until": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                    "expires_at": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+                })
+                self._done[rid] = asyncio.Event()
+                return None
+            except DuplicateKeyError:
+                record = await collection.find_one({"_id": rid})
+            if record is None:
+                continue  # released between our insert and find; try again
+            if record["fingerprint"] != request_fingerprint:
+                IDEMPOTENT_REQUESTS.inc("mismatch")
+                return JSONResponse(
+                    {"detail": "Idempotency-Key was already used for a different request"}, status_code=422)
+            if record["state"] == "completed":
+                IDEMPOTENT_REQUESTS.inc("waited" if waited else "replayed")
+                return self._stored_response(record["response"])
+            if record["locked_until"] < now and await self._take_over(rid, record["locked_until"]):
+                return None
+            if loop.time() >= deadline:
+                IDEMPOTENT_REQUESTS.inc("timeout")
+                return JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"}, status_code=409)
+            waited = True
+            event = self._done.get(rid)
+            try:
+                await asyncio.wait_for(event.wait() if event else asyncio.sleep(delay), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, MAX_POLL_INTERVAL)
+
+    async def _take_over(self, rid: str, expired: datetime) -> bool:
+        record = await db[IDEMPOTENCY_COLLECTION].find_one_and_update(
+            {"_id": rid, "state": "running", "locked_until": expired},
+            {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if record is None:
+            return False
+        logger.warning(f"Taking over idempotency key {rid[:12]} from a request that never finished")
+        self._done[rid] = asyncio.Event()
+        return True
+
+    @staticmethod
+    def _stored_response(stored: dict):
+        headers: List[tuple] = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in stored["headers"]]
+        headers.append((REPLAYED_HEADER, b"true"))
+
+        async def respond(scope, receive, send):
+            await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+            await send({"type": "http.response.body", "body": bytes(stored["body"])})
+        return respond
+
+    # ---- executing ----
+
+    async def _hold_lock(self, rid: str) -> None:
+        """Keep extending the lock while a slow handler (e.g. an LLM call) runs."""
+        while True:
+            await asyncio.sleep(IDEMPOTENCY_LOCK_SECONDS / 3)
+            try:
+                await db[IDEMPOTENCY_COLLECTION].update_one(
+                    {"_id": rid, "state": "running"},
+                    {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)}},
+                )
+            except PyMongoError as e:
+                logger.warning(f"Could not extend idempotency lock {rid[:12]}: {e}")
+
+    async def _execute(self, rid: str, scope: dict, receive, send) -> None:
+        status = 500
+        headers: List[tuple] = []
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message):
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if size <= MAX_STORED_BODY:
+                    chunks.append(chunk)
+            await send(message)
+
+        collection = db[IDEMPOTENCY_COLLECTION]
+        completed = False
+        lock = asyncio.create_task(self._hold_lock(rid))
+        try:
+            # errors raised by the handler propagate (a 500 from the outer middleware)
+            await self.app(scope, receive, capture)
+            lock.cancel()
+            if status < 500 and size <= MAX_STORED_BODY:
+                try:
+                    await collection.update_one({"_id": rid}, {"$set": {
+                        "state": "completed",
+                        "response": {
+                            "status": status,
+                            "headers": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in headers],
+                            "body": Binary(b"".join(chunks)),
+                        },
+                    }})
+                    completed = True
+                    IDEMPOTENT_REQUESTS.inc("executed")
+                except PyMongoError as e:
+                    logger.error(f"Could not store response for idempotency key {rid[:12]}: {e}")
+        finally:
+            lock.cancel()
+            if not completed:
+                try:
+                    await collection.delete_one({"_id": rid, "state": "running"})
+                except PyMongoError as e:
+                    logger.error(f"Could not release idempotency key {rid[:12]}: {e}")
+            event = self._done.pop(rid, None)
+            if event is not None:
+                event.set()
@@ -0,0 +1,244 @@
+"""Cross-worker cache invalidation driven by MongoDB change streams.
+
+Every worker runs an ``InvalidationBus`` that tails the watched collections and
+fans typed ``InvalidationEvent``s out to in-process subscribers (usually
+``LocalCache`` instances). Resume tokens are persisted in
+``change_stream_tokens`` so a restarted worker continues where it left off.
+When change streams are unavailable (standalone mongod) the bus falls back to
+polling: every ``poll_interval`` it reads a cheap change marker per collection
+(the estimated document count and the newest ``updated_at``, both served
+without a scan) and emits a collection-wide ``flush`` only when the marker
+moved. This relies on every write to a watched collection setting
+``updated_at``; deletes are caught by the count.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from database import db as default_db
+
+logger = logging.getLogger(__name__)
+
+WATCHED_COLLECTIONS = ("users", "mentors", "opportunities", "payments")
+TOKENS_COLLECTION = "change_stream_tokens"
+
+# Server error codes meaning "change streams can't be used here".
+_UNSUPPORTED_CODES = {
+    40573,  # The $changeStream stage is only supported on replica sets
+    40324,  # Unrecognized pipeline stage name (very old servers)
+}
+# Resume token no longer in the oplog: start fresh and flush.
+_HISTORY_LOST_CODES = {260, 280, 286}
+
+
+@dataclass(frozen=True)
+class InvalidationEvent:
+    collection: str
+    operation: str  # insert, update, replace, delete, flush
+    key: Optional[str] = None  # document "id"; None means the whole collection
+    updated_fields: FrozenSet[str] = field(default_factory=frozenset)
+
+    @property
+    def is_flush(self) -> bool:
+        return self.key is None
+
+
+Handler = Callable[[InvalidationEvent], None]
+
+# ==================== LOCAL CACHE ====================
+
+class LocalCache:
+    """Small in-process TTL cache that drops entries on invalidation events.
+
+    ``key_for`` maps an event to the cache key to drop; by default it is the
+    document id, and flush events (or events without an id) clear everything.
+    """
+
+    def __init__(self, name: str, ttl: float = 60.0, maxsize: int = 1024,
+                 key_for: Optional[Callable[[InvalidationEvent], Optional[str]]] = None,
+                 relevant: Optional[Callable[[InvalidationEvent], bool]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.key_for = key_for or (lambda event: event.key)
+        self.relevant = relevant or (lambda event: True)
+        self._data: Dict[Any, Tuple[float, Any]] = {}
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return default
+        return value
+
+    def set(self, key, value) -> None:
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._data.pop(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def on_invalidation(self, event: InvalidationEvent) -> None:
+        if not self.relevant(event):
+            return
+        key = None if event.is_flush else self.key_for(event)
+        if key is None:
+            self.clear()
+        else:
+            self.invalidate(key)
+
+# ==================== BUS ====================
+
+class InvalidationBus:
+    def __init__(self, collections: Iterable[str] = WATCHED_COLLECTIONS, consumer: str = "api",
+                 database=None, poll_interval: float = 5.0, token_flush_interval: float = 1.0):
+        self.collections = tuple(collections)
+        self.consumer = consumer
+        self.db = database if database is not None else default_db
+        self.poll_interval = poll_interval
+        self.token_flush_interval = token_flush_interval
+        self.mode: Dict[str, str] = {}  # collection -> "change_stream" | "polling"
+        self._handlers: Dict[str, List[Handler]] = {c: [] for c in self.collections}
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, collection: str, handler: Handler) -> None:
+        if collection not in self._handlers:
+            raise ValueError(f"{collection} is not watched by this bus")
+        self._handlers[collection].append(handler)
+
+    def register_cache(self, cache: LocalCache, collections: Iterable[str]) -> None:
+        for collection in collections:
+            self.subscribe(collection, cache.on_invalidation)
+
+    def publish(self, event: InvalidationEvent) -> None:
+        for handler in self._handlers.get(event.collection, ()):
+            try:
+                handler(event)
+            except Exception:
+                logger.exception(f"Invalidation handler failed for {event}")
+
+    async def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._run(c), name=f"invalidation:{c}") for c in self.collections]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---- resume tokens ----
+
+    def _token_id(self, collection: str) -> str:
+        return f"{self.consumer}:{collection}"
+
+    async def _load_token(self, collection: str) -> Optional[dict]:
+        doc = await self.db[TOKENS_COLLECTION].find_one({"_id": self._token_id(collection)})
+        return doc["token"] if doc else None
+
+    async def _save_token(self, collection: str, token: dict) -> None:
+        await self.db[TOKENS_COLLECTION].update_one(
+            {"_id": self._token_id(collection)},
+            {"$set": {"token": token, "updated_at": time.time()}},
+            upsert=True,
+        )
+
+    async def _clear_token(self, collection: str) -> None:
+        await self.db[TOKENS_COLLECTION].delete_one({"_id": self._token_id(collection)})
+
+    # ---- tailing ----
+
+    @staticmethod
+    def to_event(collection: str, change: dict) -> InvalidationEvent:
+        operation = change.get("operationType", "flush")
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+        updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+        removed = (change.get("updateDescription") or {}).get("removedFields") or []
+        if operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            return InvalidationEvent(collection, "flush")
+        return InvalidationEvent(
+            collection,
+            operation,
+            document.get("id"),
+            frozenset(k.split(".", 1)[0] for k in list(updated) + list(removed)),
+        )
+
+    async def _run(self, collection: str) -> None:
+        while True:
+            try:
+                await self._tail(collection)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    logger.info(f"Change streams unavailable for {collection} ({e}); polling instead")
+                    await self._poll(collection)
+                    return
+                if e.code in _HISTORY_LOST_CODES:
+                    logger.warning(f"Resume token for {collection} expired; restarting stream")
+                    await self._clear_token(collection)
+                else:
+                    logger.warning(f"Change stream on {collection} failed: {e}")
+                    await asyncio.sleep(1.0)
+            except PyMongoError as e:
+                logger.warning(f"Change stream on {collection} interrupted: {e}")
+                await asyncio.sleep(1.0)
+
+    async def _tail(self, collection: str) -> None:
+        token = await self._load_token(collection)
+        if token is None:
+            # Nothing to resume from, so whatever was cached may be stale.
+            self.publish(InvalidationEvent(collection, "flush"))
+        self.mode[collection] = "change_stream"
+        loop = asyncio.get_running_loop()
+        last_saved = loop.time()
+        pending_token = None
+        async with self.db[collection].watch(full_document="updateLookup", resume_after=token) as stream:
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    self.publish(self.to_event(collection, change))
+                    pending_token = stream.resume_token
+                elif stream.resume_token is not None and stream.resume_token != token:
+                    pending_token = stream.resume_token  # post-batch token on idle streams
+                if pending_token is not None and loop.time() - last_saved >= self.token_flush_interval:
+                    await self._save_token(collection, pending_token)
+                    token, pending_token = pending_token, None
+                    last_saved = loop.time()
+
+    # ---- polling fallback ----
+
+    async def _marker(self, collection: str) -> Tuple[int, Any]:
+        """Document count and newest ``updated_at``; changes whenever the collection is written."""
+        count = await self.db[collection].estimated_document_count()
+        latest = await self.db[collection].find_one(
+            {}, {"_id": 0, "updated_at": 1}, sort=[("updated_at", -1)]
+        )
+        return count, (latest or {}).get("updated_at")
+
+    async def _poll(self, collection: str) -> None:
+        self.mode[collection] = "polling"
+        marker = None
+        while True:
+            try:
+                current = await self._marker(collection)
+            except PyMongoError as e:
+                logger.warning(f"Polling {collection} failed: {e}")
+                current = None  # unknown, so flush to be safe
+            if current is None or current != marker:
+                self.publish(InvalidationEvent(collection, "flush"))
+            marker = current
+            await asyncio.sleep(self.poll_interval)
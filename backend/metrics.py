@@ -0,0 +1,333 @@
+"""Lightweight Prometheus-style metrics for the NEXOSR API.
+
+Metrics are kept in plain dicts guarded by a lock so they can be updated from
+the event loop as well as from pymongo's monitoring threads. Rendering follows
+the Prometheus text exposition format (version 0.0.4).
+"""
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Tuple[str, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return labels
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(tuple(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(tuple(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, *labels: str) -> int:
+        return sum(self._counts.get(tuple(labels), ()))
+
+    def mean(self, *labels: str) -> Optional[float]:
+        key = tuple(labels)
+        with self._lock:
+            count = sum(self._counts.get(key, ()))
+            return self._sums[key] / count if count else None
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "nexosr_http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route")))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "nexosr_http_requests_total", "HTTP requests by route template and status code.",
+    ("method", "route", "status")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "nexosr_http_requests_in_flight", "HTTP requests currently being served."))
+
+MONGO_COMMAND_DURATION = REGISTRY.register(Histogram(
+    "nexosr_mongo_command_duration_seconds", "MongoDB command latency by collection and operation.",
+    ("collection", "command"), buckets=MONGO_BUCKETS))
+MONGO_COMMAND_FAILURES = REGISTRY.register(Counter(
+    "nexosr_mongo_command_failures_total", "Failed MongoDB commands by collection and operation.",
+    ("collection", "command")))
+
+LLM_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "nexosr_llm_request_duration_seconds", "LLM call latency by operation and outcome.",
+    ("operation", "outcome"), buckets=LLM_BUCKETS))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "nexosr_llm_tokens_total", "LLM tokens consumed by operation and kind (prompt/completion).",
+    ("operation", "kind")))
+LLM_FALLBACKS = REGISTRY.register(Counter(
+    "nexosr_llm_fallbacks_total", "Responses served from the local fallback after an LLM failure.",
+    ("operation",)))
+
+EVENT_LOOP_LAG = REGISTRY.register(Histogram(
+    "nexosr_event_loop_lag_seconds", "Delay between scheduled and actual event loop wake-ups.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)))
+EVENT_LOOP_LAG_MAX = REGISTRY.register(Gauge(
+    "nexosr_event_loop_lag_max_seconds", "Largest event loop lag seen in the last sampling window."))
+
+# ==================== HTTP MIDDLEWARE ====================
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template.
+
+    Routes are labelled by their path template (``/api/assessments/{assessment_id}``)
+    rather than the raw URL so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method, route_path)
+            HTTP_REQUESTS.inc(method, route_path, str(status_code))
+
+# ==================== MONGO COMMAND MONITORING ====================
+
+# Commands whose first value is not a collection name.
+_NON_COLLECTION_COMMANDS = {"getMore", "killCursors"}
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records per-collection command latency from pymongo command monitoring.
+
+    Succeeded/failed events do not carry the command document, so the collection
+    name seen in the started event is remembered until the reply arrives.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _event_key(event) -> Tuple:
+        return (event.connection_id, event.request_id, event.operation_id)
+
+    def started(self, event):
+        command = event.command
+        if event.command_name in _NON_COLLECTION_COMMANDS:
+            collection = command.get("collection", "")
+        else:
+            collection = command.get(event.command_name, "")
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._pending[self._event_key(event)] = collection
+
+    def _pop(self, event) -> str:
+        with self._lock:
+            return self._pending.pop(self._event_key(event), "")
+
+    def succeeded(self, event):
+        collection = self._pop(event)
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, collection, event.command_name)
+
+    def failed(self, event):
+        collection = self._pop(event)
+        MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, collection, event.command_name)
+        MONGO_COMMAND_FAILURES.inc(collection, event.command_name)
+
+# ==================== LLM INSTRUMENTATION ====================
+
+def observe_llm_call(operation: str, started: float, response=None, error: Optional[BaseException] = None) -> None:
+    outcome = "error" if error is not None else "success"
+    LLM_REQUEST_DURATION.observe(time.perf_counter() - started, operation, outcome)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        LLM_TOKENS.inc(operation, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.inc(operation, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def record_llm_fallback(operation: str) -> None:
+    LLM_FALLBACKS.inc(operation)
+
+# ==================== EVENT LOOP LAG ====================
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Sample how late the loop wakes up from a fixed sleep; runs until cancelled."""
+    loop = asyncio.get_running_loop()
+    window_max = 0.0
+    window_start = loop.time()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        EVENT_LOOP_LAG.observe(lag)
+        window_max = max(window_max, lag)
+        if loop.time() - window_start >= 15.0:
+            EVENT_LOOP_LAG_MAX.set(window_max)
+            window_max = 0.0
+            window_start = loop.time()
+        elif lag > EVENT_LOOP_LAG_MAX.value():
+            EVENT_LOOP_LAG_MAX.set(lag)
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
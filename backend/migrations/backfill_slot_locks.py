@@ -0,0 +1,88 @@
+"""Create ``mentor_slot_locks`` for sessions booked before slot locking existed.
+
+Run from the backend directory once the locking code is deployed (new
+bookings already take locks):
+
+    python -m migrations.backfill_slot_locks [--dry-run]
+
+Every upcoming session that is not cancelled gets the granule locks
+``reserve`` would have taken, so new bookings can no longer overlap it. Locks
+already held by the same session are left alone, so an interrupted run can
+simply be restarted. Granules held by a different session (two bookings that
+already overlap) are reported and skipped; those need a human to reschedule.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from availability import LOCKS_COLLECTION, SESSION_MINUTES, granules
+from database import close_client, get_db
+
+DUPLICATE_KEY = 11000
+LONGEST_SESSION = max(SESSION_MINUTES.values())
+
+
+async def backfill_session(database, session: dict, dry_run: bool) -> int:
+    """Insert the session's missing locks; returns how many it needed."""
+    minutes = SESSION_MINUTES.get(session.get("session_type"), LONGEST_SESSION)
+    slots = granules(session["scheduled_at"], minutes)
+    held = {
+        lock["slot"]: lock["session_id"]
+        async for lock in database[LOCKS_COLLECTION].find(
+            {"mentor_id": session["mentor_id"], "slot": {"$in": slots}}, {"_id": 0, "slot": 1, "session_id": 1}
+        )
+    }
+    for slot, session_id in held.items():
+        if session_id != session["id"]:
+            print(f"conflict: session {session['id']} overlaps {session_id} at {slot.isoformat()}")
+    missing = [
+        {"mentor_id": session["mentor_id"], "slot": slot, "session_id": session["id"]}
+        for slot in slots if slot not in held
+    ]
+    if dry_run or not missing:
+        return len(missing)
+    try:
+        await database[LOCKS_COLLECTION].insert_many(missing, ordered=False)
+    except BulkWriteError as e:
+        # A booking made while we ran took the granule first; report it on the next run.
+        if any(err["code"] != DUPLICATE_KEY for err in e.details["writeErrors"]):
+            raise
+        print(f"conflict: session {session['id']} lost {len(e.details['writeErrors'])} granules to new bookings")
+    return len(missing)
+
+
+async def backfill(dry_run: bool) -> None:
+    database = get_db()
+    # sessions that started up to LONGEST_SESSION ago may still be running
+    since = datetime.utcnow() - timedelta(minutes=LONGEST_SESSION)
+    cursor = database.mentor_sessions.find(
+        {"scheduled_at": {"$gte": since}, "status": {"$ne": "cancelled"}},
+        {"_id": 0, "id": 1, "mentor_id": 1, "session_type": 1, "scheduled_at": 1},
+    ).sort("scheduled_at", 1)
+    sessions = locks = 0
+    async for session in cursor:
+        locks += await backfill_session(database, session, dry_run)
+        sessions += 1
+        if sessions % 1000 == 0:
+            print(f"{sessions} sessions, {locks} locks")
+    action = "would create" if dry_run else "created"
+    print(f"{action} {locks} locks for {sessions} upcoming sessions")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Lock the slots of sessions booked before slot locking")
+    parser.add_argument("--dry-run", action="store_true", help="count only, write nothing")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(backfill(args.dry_run))
+    finally:
+        close_client()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
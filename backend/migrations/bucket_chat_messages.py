@@ -0,0 +1,89 @@
+"""Move per-message ``chat_messages`` documents into ``chat_buckets``.
+
+Run from the backend directory once the bucketed code is deployed (new
+messages already go to buckets):
+
+    python -m migrations.bucket_chat_messages [--dry-run]
+
+Each user's messages are streamed in timestamp order, packed into buckets of
+``CHAT_BUCKET_SIZE`` and inserted with a deterministic ``_id`` so an
+interrupted run can simply be restarted; migrated source documents are
+deleted afterwards. Migrated buckets are all written closed, partial ones
+included: the user's open bucket is the one live appends already use (or
+the next append opens).
+"""
+import argparse
+import asyncio
+import sys
+from typing import Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from chat_store import BUCKETS_COLLECTION, CHAT_BUCKET_SIZE, _to_bucket_message
+from database import close_client, get_db
+
+DUPLICATE_KEY = 11000
+
+
+def build_bucket(user_id: str, messages: List[Dict]) -> Dict:
+    return {
+        "_id": f"{user_id}:{messages[0]['id']}",
+        "user_id": user_id,
+        "archived": False,
+        "count": len(messages),
+        "start": messages[0]["timestamp"],
+        "end": messages[-1]["timestamp"],
+        "messages": [_to_bucket_message(m) for m in messages],
+    }
+
+
+async def migrate_user(database, user_id: str, dry_run: bool) -> int:
+    buckets, chunk, source_ids = [], [], []
+    cursor = database.chat_messages.find({"user_id": user_id}).sort("timestamp", 1)
+    async for message in cursor:
+        chunk.append(message)
+        source_ids.append(message["_id"])
+        if len(chunk) == CHAT_BUCKET_SIZE:
+            buckets.append(build_bucket(user_id, chunk))
+            chunk = []
+    if chunk:
+        buckets.append(build_bucket(user_id, chunk))
+    if dry_run or not buckets:
+        return len(source_ids)
+
+    try:
+        await database[BUCKETS_COLLECTION].insert_many(buckets, ordered=False)
+    except BulkWriteError as e:
+        # Buckets already written by an interrupted earlier run are fine.
+        if any(err["code"] != DUPLICATE_KEY for err in e.details["writeErrors"]):
+            raise
+    await database.chat_messages.delete_many({"_id": {"$in": source_ids}})
+    return len(source_ids)
+
+
+async def migrate(dry_run: bool) -> None:
+    database = get_db()
+    users = database.chat_messages.aggregate([{"$group": {"_id": "$user_id"}}], allowDiskUse=True)
+    total_users = total_messages = 0
+    async for row in users:
+        total_messages += await migrate_user(database, row["_id"], dry_run)
+        total_users += 1
+        if total_users % 1000 == 0:
+            print(f"{total_users} users, {total_messages} messages")
+    action = "would migrate" if dry_run else "migrated"
+    print(f"{action} {total_messages} messages for {total_users} users")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pack chat_messages into chat_buckets")
+    parser.add_argument("--dry-run", action="store_true", help="count only, write nothing")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(migrate(args.dry_run))
+    finally:
+        close_client()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
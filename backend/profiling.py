@@ -0,0 +1,199 @@
+"""On-demand request profiling and event-loop stall detection.
+
+A request is profiled when it carries ``X-Profile: 1`` together with a valid
+``X-Admin-Token`` header, or when it is picked by ``PROFILE_SAMPLE_RATE``. The
+slowest ``PROFILE_KEEP`` profiles are kept in memory and can be listed and
+downloaded through the admin routes in ``server.py``.
+"""
+import asyncio
+import cProfile
+import heapq
+import hmac
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from metrics import REGISTRY, Counter
+
+logger = logging.getLogger(__name__)
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+LOOP_STALL_THRESHOLD = float(os.environ.get("LOOP_STALL_THRESHOLD_MS", "500")) / 1000
+
+LOOP_STALLS = REGISTRY.register(Counter(
+    "nexosr_event_loop_stalls_total", "Times the event loop was blocked longer than the stall threshold."))
+
+
+def is_admin_token(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+# ==================== PROFILE STORE ====================
+
+class ProfileStore:
+    """Keeps the N slowest request profiles (min-heap on duration)."""
+
+    def __init__(self, keep: int = PROFILE_KEEP):
+        self.keep = keep
+        self._heap: List[tuple] = []
+        self._by_id: Dict[str, dict] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, method: str, path: str, route: str, duration: float, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            if len(self._heap) >= self.keep and duration <= self._heap[0][0]:
+                return
+        profiler.create_stats()
+        record = {
+            "id": str(uuid.uuid4()),
+            "method": method,
+            "path": path,
+            "route": route,
+            "duration_ms": round(duration * 1000, 2),
+            "captured_at": datetime.utcnow(),
+            "stats": profiler.stats,
+        }
+        with self._lock:
+            entry = (duration, next(self._counter), record)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            else:
+                _, _, evicted = heapq.heappushpop(self._heap, entry)
+                self._by_id.pop(evicted["id"], None)
+                if evicted is record:
+                    return
+            self._by_id[record["id"]] = record
+
+    def list(self) -> List[dict]:
+        with self._lock:
+            records = sorted(self._by_id.values(), key=lambda r: r["duration_ms"], reverse=True)
+        return [{k: v for k, v in r.items() if k != "stats"} for r in records]
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._by_id.get(profile_id)
+
+    @staticmethod
+    def render_text(record: dict, limit: int = 60) -> str:
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(record["stats"]), stream=stream)
+        stream.write(f"{record['method']} {record['path']} ({record['route']}) "
+                     f"{record['duration_ms']} ms captured {record['captured_at'].isoformat()}\n\n")
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    @staticmethod
+    def render_pstats(record: dict) -> bytes:
+        """Raw stats in the format written by ``cProfile``/``pstats.dump_stats``."""
+        return marshal.dumps(record["stats"])
+
+
+class _StatsSource:
+    # pstats.Stats accepts any object exposing create_stats()/stats.
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+profile_store = ProfileStore()
+
+# ==================== PROFILING MIDDLEWARE ====================
+
+class ProfilingMiddleware:
+    """ASGI middleware that runs selected requests under cProfile.
+
+    cProfile hooks the whole thread, so coroutines of other requests that run
+    while a profiled request awaits also show up in its profile. Only one
+    profile is recorded at a time per worker; other candidates are skipped.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.store = store
+        self.sample_rate = sample_rate
+        self._active = threading.Lock()
+
+    def _wants_profile(self, scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile") == b"1":
+            token = headers.get(b"x-admin-token", b"").decode("latin-1")
+            if is_admin_token(token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._active.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self._active.release()
+            duration = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", "")
+            self.store.add(scope.get("method", ""), scope.get("path", ""), route, duration, profiler)
+
+# ==================== EVENT LOOP WATCHDOG ====================
+
+class LoopWatchdog:
+    """Logs the event loop thread's stack when it stops responding.
+
+    A coroutine on the loop stamps a heartbeat; a daemon thread checks it and,
+    once the heartbeat is older than ``threshold``, dumps the loop thread's
+    current stack (typically a synchronous bcrypt or OpenAI call). Each stall is
+    reported once.
+    """
+
+    def __init__(self, threshold: float = LOOP_STALL_THRESHOLD):
+        self.threshold = threshold
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def heartbeat(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                self._beat = time.monotonic()
+                await asyncio.sleep(self.threshold / 4)
+        finally:
+            self._stop.set()
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 4):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat
+            if blocked_for < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<no frame>"
+            logger.warning(f"Event loop blocked for {blocked_for * 1000:.0f} ms; loop thread stack:\n{stack}")
@@ -0,0 +1,285 @@
+"""Authenticated Socket.IO push channel for per-user events.
+
+Clients connect to ``/socket.io/`` with ``auth={"token": <JWT>}`` (or an
+``Authorization: Bearer`` header) and join the room of their user id; the
+API pushes typed events to that room instead of making clients poll.
+
+Workers share emits through a capped ``push_events`` collection that every
+worker tails, so an event raised on one worker reaches sockets held by any
+other. Delivery to a socket whose outgoing queue is backed up skips
+droppable events (leaderboard ranks), and a socket that stays backed up past
+``PUSH_MAX_QUEUE`` packets is disconnected; clients refetch over REST when
+they reconnect.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, ClassVar, List, Optional, Set, Tuple
+
+import socketio
+from bson import ObjectId
+from pydantic import BaseModel
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from database import db
+from metrics import REGISTRY, Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+PUSH_COLLECTION = "push_events"
+PUSH_COLLECTION_BYTES = int(os.environ.get("PUSH_COLLECTION_BYTES", str(16 * 2**20)))
+PUSH_MAX_QUEUE = int(os.environ.get("PUSH_MAX_QUEUE", "64"))
+PUSH_DROP_QUEUE = int(os.environ.get("PUSH_DROP_QUEUE", "16"))
+PUSH_TRANSPORTS = os.environ.get("PUSH_TRANSPORTS", "websocket").split(",")
+PUSH_PING_INTERVAL = int(os.environ.get("PUSH_PING_INTERVAL", "25"))
+LEADERBOARD_SIZE = 20
+SEEN_IDS = 1024
+
+PUSH_CONNECTIONS = REGISTRY.register(Gauge(
+    "nexosr_push_connections", "Socket.IO connections held by this worker."))
+PUSH_EVENTS = REGISTRY.register(Counter(
+    "nexosr_push_events_total", "Push events emitted by event name.", ("event",)))
+PUSH_SLOW_CONSUMERS = REGISTRY.register(Counter(
+    "nexosr_push_slow_consumers_total", "Push deliveries skipped or sockets dropped for backed-up queues.",
+    ("action",)))
+
+
+def user_room(user_id: str) -> str:
+    return f"user:{user_id}"
+
+# ==================== EVENTS ====================
+
+class PushEvent(BaseModel):
+    event: ClassVar[str]
+    droppable: ClassVar[bool] = False  # superseded by the next event of the same kind
+
+
+class ReportReady(PushEvent):
+    event: ClassVar[str] = "report_ready"
+    assessment_id: str
+    test_type: str
+    score: float
+    provisional: bool = False
+
+
+class ProgressAwarded(PushEvent):
+    event: ClassVar[str] = "progress_awarded"
+    xp_earned: int
+    xp_points: int
+    badges_earned: List[str] = []
+
+
+class SessionStatusChanged(PushEvent):
+    event: ClassVar[str] = "session_status_changed"
+    session_id: str
+    status: str
+    scheduled_at: datetime
+    role: str  # mentee or mentor
+
+
+class LeaderboardRankChanged(PushEvent):
+    event: ClassVar[str] = "leaderboard_rank_changed"
+    droppable: ClassVar[bool] = True
+    rank: Optional[int]  # None once outside the top LEADERBOARD_SIZE
+    previous_rank: Optional[int]
+    xp_points: int
+
+
+DROPPABLE_EVENTS = {cls.event for cls in PushEvent.__subclasses__() if cls.droppable}
+
+
+def rank_changes(user_id: str, old_xp: int, new_xp: int, board: List[dict],
+                 size: int = LEADERBOARD_SIZE) -> List[Tuple[str, LeaderboardRankChanged]]:
+    """Leaderboard moves caused by one user going from ``old_xp`` to ``new_xp``.
+
+    ``board`` is the top ``size + 1`` users by XP after the change. A rank is
+    1 + the number of users with strictly more XP, or None off the board;
+    users passed on the way move one place.
+    """
+    others = [(u["id"], u.get("xp_points", 0)) for u in board if u["id"] != user_id]
+
+    def rank(xp: int, self_xp: Optional[int] = None) -> Optional[int]:
+        above = sum(1 for _, x in others if x > xp) + (1 if self_xp is not None and self_xp > xp else 0)
+        return above + 1 if above < size else None
+
+    changes = []
+    before, after = rank(old_xp), rank(new_xp)
+    if before != after:
+        changes.append((user_id, LeaderboardRankChanged(rank=after, previous_rank=before, xp_points=new_xp)))
+    low, high = sorted((old_xp, new_xp))
+    for other_id, xp in others:
+        if low <= xp < high:
+            was, now = rank(xp, old_xp), rank(xp, new_xp)
+            if was != now:
+                changes.append((other_id, LeaderboardRankChanged(rank=now, previous_rank=was, xp_points=xp)))
+    return changes
+
+# ==================== DELIVERY ====================
+
+class BoundedQueueManager(socketio.AsyncManager):
+    """Skips or drops sockets whose engine.io send queue is backed up."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dropping: Set[str] = set()
+
+    def queue_depth(self, eio_sid: str) -> int:
+        socket = self.server.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket is not None else 0
+
+    async def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        room = to or room
+        skip = list(skip_sid) if isinstance(skip_sid, list) else [skip_sid]
+        for sid, eio_sid in self.get_participants(namespace, room):
+            depth = self.queue_depth(eio_sid)
+            if depth >= PUSH_MAX_QUEUE:
+                skip.append(sid)
+                if sid not in self._dropping:
+                    self._dropping.add(sid)
+                    PUSH_SLOW_CONSUMERS.inc("disconnected")
+                    logger.warning(f"Disconnecting slow push consumer {sid} ({depth} packets queued)")
+                    asyncio.create_task(self._drop(sid, namespace))
+            elif depth >= PUSH_DROP_QUEUE and event in DROPPABLE_EVENTS:
+                skip.append(sid)
+                PUSH_SLOW_CONSUMERS.inc("skipped")
+        await super().emit(event, data, namespace, room=room, skip_sid=skip, callback=callback, **kwargs)
+
+    async def _drop(self, sid: str, namespace: str) -> None:
+        try:
+            await self.server.disconnect(sid, namespace=namespace, ignore_queue=True)
+        finally:
+            self._dropping.discard(sid)
+
+
+class MongoPushManager(AsyncPubSubManager, BoundedQueueManager):
+    """Socket.IO pub/sub over a tailable cursor on a capped collection.
+
+    Tailable cursors work on a standalone mongod too, unlike change streams.
+    Local delivery goes through ``BoundedQueueManager`` (next in the MRO).
+    """
+    name = "mongo"
+
+    def __init__(self, collection: str = PUSH_COLLECTION, size: int = PUSH_COLLECTION_BYTES, **kwargs):
+        super().__init__(channel=collection, **kwargs)
+        self.size = size
+        self._seen: "OrderedDict[ObjectId, None]" = OrderedDict()
+
+    async def _ensure_collection(self) -> None:
+        try:
+            await db.create_collection(self.channel, capped=True, size=self.size)
+            # a tailable cursor on an empty capped collection dies immediately
+            await db[self.channel].insert_one({"message": None})
+        except CollectionInvalid:
+            pass
+
+    async def _publish(self, data):
+        try:
+            await db[self.channel].insert_one({"message": data})
+        except PyMongoError as e:
+            logger.error(f"Could not publish push {data.get('method')}: {e}")
+
+    def _is_new(self, doc_id: ObjectId) -> bool:
+        if doc_id in self._seen:
+            return False
+        self._seen[doc_id] = None
+        if len(self._seen) > SEEN_IDS:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _listen(self):
+        since = ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            try:
+                await self._ensure_collection()
+                # ObjectIds from different workers only order by second, so
+                # resume from the start of the last second and skip repeats
+                cursor = db[self.channel].find({"_id": {"$gte": since}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    try:
+                        doc = await cursor.next()
+                    except StopAsyncIteration:
+                        continue
+                    since = ObjectId.from_datetime(doc["_id"].generation_time)
+                    if self._is_new(doc["_id"]) and doc.get("message"):
+                        yield doc["message"]
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning(f"Push channel cursor interrupted: {e}")
+            await asyncio.sleep(1.0)
+
+# ==================== HUB ====================
+
+class PushHub:
+    """The Socket.IO server plus typed, per-user ``notify``.
+
+    ``authenticate`` maps a token to a user id, or None when it is invalid.
+    """
+
+    def __init__(self, authenticate: Callable[[str], Optional[str]],
+                 client_manager: Optional[socketio.AsyncManager] = None):
+        self.authenticate = authenticate
+        self.sio = socketio.AsyncServer(
+            async_mode="asgi",
+            client_manager=client_manager or MongoPushManager(),
+            cors_allowed_origins="*",
+            transports=PUSH_TRANSPORTS,
+            ping_interval=PUSH_PING_INTERVAL,
+            logger=False,
+            engineio_logger=False,
+        )
+        self.sio.on("connect", self._on_connect)
+        self.sio.on("disconnect", self._on_disconnect)
+
+    def asgi_app(self) -> socketio.ASGIApp:
+        return socketio.ASGIApp(self.sio, socketio_path="socket.io")
+
+    @staticmethod
+    def _token(environ: dict, auth: Optional[dict]) -> Optional[str]:
+        if isinstance(auth, dict) and auth.get("token"):
+            return auth["token"]
+        scheme, _, token = environ.get("HTTP_AUTHORIZATION", "").partition(" ")
+        return token if scheme.lower() == "bearer" and token else None
+
+    async def _on_connect(self, sid: str, environ: dict, auth: Optional[dict] = None):
+        token = self._token(environ, auth)
+        user_id = self.authenticate(token) if token else None
+        if user_id is None:
+            raise socketio.exceptions.ConnectionRefusedError("Not authenticated")
+        await self.sio.save_session(sid, {"user_id": user_id})
+        await self.sio.enter_room(sid, user_room(user_id))
+        PUSH_CONNECTIONS.inc()
+
+    async def _on_disconnect(self, sid: str, *args):
+        PUSH_CONNECTIONS.dec()
+
+    async def notify(self, user_id: str, event: PushEvent) -> None:
+        """Push ``event`` to every socket of ``user_id`` on any worker; never raises."""
+        try:
+            await self.sio.emit(event.event, event.model_dump(mode="json"), room=user_room(user_id))
+            PUSH_EVENTS.inc(event.event)
+        except Exception:
+            logger.exception(f"Could not push {event.event} to {user_id}")
+
+    async def notify_rank_changes(self, user_id: str, old_xp: int, new_xp: int) -> None:
+        if old_xp == new_xp:
+            return
+        try:
+            board = await db.users.find({}, {"_id": 0, "id": 1, "xp_points": 1}).sort(
+                "xp_points", -1).limit(LEADERBOARD_SIZE + 1).to_list(LEADERBOARD_SIZE + 1)
+        except PyMongoError as e:
+            logger.error(f"Could not load leaderboard for rank pushes: {e}")
+            return
+        for target, event in rank_changes(user_id, old_xp, new_xp, board):
+            await self.notify(target, event)
+
+    async def stop(self) -> None:
+        thread = getattr(self.sio.manager, "thread", None)
+        if thread is not None:
+            thread.cancel()
+            await asyncio.gather(thread, return_exceptions=True)
+        await self.sio.shutdown()
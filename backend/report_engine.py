@@ -0,0 +1,279 @@
+"""Deterministic, CPU-only assessment reports.
+
+Maps the per-dimension scores of an assessment (aptitude categories, Big
+Five traits, career-interest fields, self-rated skills) through a curated
+career and skill table to the same ``ai_report`` schema the LLM returns.
+It takes tens of microseconds and the same input always gives the same
+report, so it serves as the instant provisional report, as the free-tier
+report and as the fallback when the LLM fails.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+REPORT_SOURCE = "local"
+CAREER_PATHS = 5
+STRONG_SCORE = 60.0  # at or above: a strength; below: a weakness
+GAP_SCORE = 70.0  # a role's skill below this is a gap
+MIN_MATCH, MAX_MATCH = 35, 98
+INTEREST_BONUS = 6
+
+
+@dataclass(frozen=True)
+class Dimension:
+    label: str
+    strength: str  # phrase for a high score
+    growth: str  # phrase for a low score
+    subject: str  # subject that builds it
+
+
+@dataclass(frozen=True)
+class Career:
+    title: str
+    description: str
+    area: str  # one of the profile interest areas
+    mentor_category: str
+    subjects: Tuple[str, ...]  # also opportunity tags
+    skills: Tuple[str, ...]  # skill dimensions the role relies on
+    weights: Dict[str, float]  # dimension -> importance
+
+
+# Neuroticism is reported the other way round, as emotional stability.
+DERIVED_DIMENSIONS = {"neuroticism": "emotional_stability"}
+
+DIMENSIONS: Dict[str, Dimension] = {
+    # aptitude categories
+    "numerical": Dimension("Numerical reasoning", "Strong numerical reasoning", "Numerical reasoning", "Mathematics"),
+    "logical": Dimension("Logical reasoning", "Sharp logical reasoning", "Logical reasoning", "Logic and Puzzles"),
+    "verbal": Dimension("Verbal ability", "Clear verbal reasoning", "Vocabulary and verbal reasoning", "English"),
+    "spatial": Dimension("Spatial reasoning", "Good spatial visualisation", "Spatial visualisation", "Geometry"),
+    # personality traits
+    "openness": Dimension("Openness", "Curious and open to new ideas", "Openness to new approaches",
+                          "Creative Thinking"),
+    "conscientiousness": Dimension("Conscientiousness", "Organised and dependable", "Planning and follow-through",
+                                   "Time Management"),
+    "extroversion": Dimension("Extroversion", "Energised by working with people",
+                              "Confidence in group settings", "Public Speaking"),
+    "agreeableness": Dimension("Agreeableness", "Empathetic and cooperative", "Collaboration and empathy",
+                               "Teamwork"),
+    "emotional_stability": Dimension("Emotional stability", "Stays calm under pressure", "Managing stress",
+                                     "Mindfulness"),
+    # career-interest fields
+    "stem": Dimension("Science and maths", "Drawn to science and maths", "Exposure to science and maths", "Science"),
+    "social": Dimension("Helping others", "Motivated by helping others", "Exposure to people-focused work",
+                        "Psychology"),
+    "creative": Dimension("Creative work", "Strong creative drive", "Exposure to creative work", "Design"),
+    "business": Dimension("Business", "Drawn to leading and persuading", "Exposure to business and leadership",
+                          "Business Studies"),
+    "technical": Dimension("Technology", "Enjoys working with technology", "Exposure to technology", "Technology"),
+    "outdoor": Dimension("Hands-on work", "Enjoys hands-on, outdoor work", "Exposure to hands-on work",
+                         "Environmental Science"),
+    "analytical": Dimension("Analytical thinking", "Strong analytical thinking", "Analytical thinking", "Analytics"),
+    # self-rated skills
+    "office_tools": Dimension("Office tools", "Comfortable with office tools", "Office productivity tools", "Excel"),
+    "programming": Dimension("Programming", "Solid programming skills", "Programming", "Programming"),
+    "communication": Dimension("Public speaking", "Confident public speaker", "Public speaking", "Communication"),
+    "management": Dimension("Time management", "Manages time well", "Time management", "Time Management"),
+    "teamwork": Dimension("Teamwork", "Works well in teams", "Teamwork and collaboration", "Teamwork"),
+    "problem_solving": Dimension("Problem solving", "Effective problem solver", "Structured problem solving",
+                                 "Problem Solving"),
+    "creativity": Dimension("Creativity", "Creative and inventive", "Creativity and ideation", "Design"),
+    "leadership": Dimension("Leadership", "Natural leader", "Leadership", "Leadership"),
+    "writing": Dimension("Writing", "Writes clearly", "Written communication", "Writing"),
+    "networking": Dimension("Networking", "Builds networks easily", "Networking", "Networking"),
+    "adaptability": Dimension("Adaptability", "Adapts quickly to change", "Adaptability", "Adaptability"),
+    "critical_thinking": Dimension("Critical thinking", "Thinks critically", "Critical thinking", "Critical Thinking"),
+    "digital": Dimension("Digital literacy", "Digitally fluent", "Digital literacy", "Digital"),
+    "emotional_intelligence": Dimension("Emotional intelligence", "Emotionally intelligent",
+                                        "Emotional intelligence", "Psychology"),
+}
+
+CAREERS: List[Career] = [
+    Career("Software Developer", "Design, build and maintain software applications", "Technology", "Technology",
+           ("Programming", "Software", "Technology"), ("programming", "problem_solving", "teamwork"),
+           {"logical": 3, "numerical": 1, "technical": 3, "stem": 1, "programming": 3, "problem_solving": 2,
+            "openness": 1, "conscientiousness": 1, "digital": 1}),
+    Career("Data Scientist", "Build models that turn data into predictions and decisions", "Technology",
+           "Technology", ("Data Science", "AI/ML", "Analytics"), ("analytical", "programming", "critical_thinking"),
+           {"numerical": 3, "logical": 2, "analytical": 3, "stem": 2, "programming": 2, "openness": 1,
+            "critical_thinking": 1}),
+    Career("Data Analyst", "Analyse data and report insights that guide decisions", "Business", "Technology",
+           ("Analytics", "Data Science", "Excel"), ("analytical", "office_tools", "communication"),
+           {"numerical": 3, "analytical": 3, "office_tools": 2, "conscientiousness": 2, "critical_thinking": 1,
+            "business": 1}),
+    Career("Cybersecurity Analyst", "Protect systems and data from attacks", "Technology", "Technology",
+           ("Cybersecurity", "Technology", "Programming"), ("digital", "critical_thinking", "problem_solving"),
+           {"logical": 3, "technical": 3, "digital": 2, "programming": 1, "conscientiousness": 2,
+            "critical_thinking": 2}),
+    Career("Engineer", "Design and build machines, structures and systems", "Science", "Technology",
+           ("Engineering", "Physics", "Mathematics"), ("problem_solving", "analytical", "teamwork"),
+           {"spatial": 2, "numerical": 2, "stem": 2, "technical": 3, "problem_solving": 2, "conscientiousness": 1}),
+    Career("UX Designer", "Design products that are easy and pleasant to use", "Creative", "Creative",
+           ("UX/UI", "Design", "Creative"), ("creativity", "communication", "emotional_intelligence"),
+           {"spatial": 3, "creative": 3, "creativity": 3, "openness": 2, "agreeableness": 1,
+            "emotional_intelligence": 1, "technical": 1}),
+    Career("Graphic Designer", "Create visual identities, illustrations and layouts", "Arts", "Creative",
+           ("Design", "Creative", "Visual Arts"), ("creativity", "digital", "adaptability"),
+           {"spatial": 3, "creative": 3, "creativity": 3, "openness": 2, "digital": 1}),
+    Career("Content Writer", "Research and write articles, scripts and copy", "Creative", "Creative",
+           ("Writing", "Content", "Creative"), ("writing", "creativity", "adaptability"),
+           {"verbal": 3, "creative": 2, "writing": 3, "openness": 2, "analytical": 1}),
+    Career("Marketing Manager", "Plan campaigns that grow brands and customers", "Business", "Business",
+           ("Marketing", "Digital", "Business"), ("communication", "creativity", "networking"),
+           {"verbal": 2, "business": 3, "creative": 1, "extroversion": 2, "communication": 2, "creativity": 1,
+            "networking": 2}),
+    Career("Product Manager", "Decide what gets built and lead teams to ship it", "Technology", "Business",
+           ("Product Management", "Business", "Technology"), ("leadership", "communication", "problem_solving"),
+           {"logical": 2, "business": 2, "technical": 1, "leadership": 2, "communication": 2, "problem_solving": 2,
+            "conscientiousness": 1, "extroversion": 1}),
+    Career("Entrepreneur", "Start and grow your own venture", "Business", "Business",
+           ("Entrepreneurship", "Business", "Finance"), ("leadership", "networking", "adaptability"),
+           {"business": 3, "openness": 2, "extroversion": 2, "leadership": 3, "adaptability": 2, "networking": 2,
+            "emotional_stability": 1}),
+    Career("Project Manager", "Plan and deliver projects on time and on budget", "Business", "Business",
+           ("Project Management", "Business", "Communication"), ("management", "leadership", "teamwork"),
+           {"conscientiousness": 3, "management": 3, "leadership": 2, "teamwork": 2, "business": 1,
+            "emotional_stability": 1}),
+    Career("HR Manager", "Hire, develop and support people at work", "Business", "Business",
+           ("Human Resources", "Psychology", "Business"), ("communication", "emotional_intelligence", "teamwork"),
+           {"social": 2, "business": 2, "agreeableness": 2, "extroversion": 1, "communication": 2, "teamwork": 2,
+            "emotional_intelligence": 2}),
+    Career("Financial Analyst", "Evaluate investments and financial performance", "Finance", "Finance",
+           ("Finance", "Accounting", "Economics"), ("analytical", "office_tools", "critical_thinking"),
+           {"numerical": 3, "analytical": 2, "business": 2, "conscientiousness": 2, "office_tools": 2,
+            "critical_thinking": 2}),
+    Career("Teacher", "Help students learn and grow", "Education", "Education",
+           ("Education", "Communication", "Psychology"), ("communication", "emotional_intelligence", "management"),
+           {"verbal": 2, "social": 3, "agreeableness": 2, "extroversion": 1, "communication": 3,
+            "emotional_intelligence": 2}),
+    Career("Psychologist", "Understand behaviour and support mental health", "Healthcare", "Healthcare",
+           ("Psychology", "Biology", "Research"), ("emotional_intelligence", "communication", "critical_thinking"),
+           {"social": 3, "agreeableness": 3, "emotional_intelligence": 3, "verbal": 1, "openness": 1,
+            "emotional_stability": 1}),
+    Career("Doctor", "Diagnose and treat patients", "Healthcare", "Healthcare",
+           ("Medicine", "Biology", "Chemistry"), ("problem_solving", "communication", "emotional_intelligence"),
+           {"stem": 3, "social": 2, "numerical": 1, "conscientiousness": 2, "emotional_stability": 2,
+            "problem_solving": 1}),
+    Career("Research Scientist", "Run experiments that push knowledge forward", "Science", "Healthcare",
+           ("Research", "Science", "Mathematics"), ("analytical", "critical_thinking", "writing"),
+           {"stem": 3, "analytical": 3, "logical": 2, "openness": 2, "critical_thinking": 2, "writing": 1}),
+    Career("Environmental Scientist", "Study and protect the natural environment", "Science", "Healthcare",
+           ("Environmental Science", "Biology", "Research"), ("analytical", "writing", "adaptability"),
+           {"outdoor": 3, "stem": 2, "analytical": 1, "openness": 1, "conscientiousness": 1}),
+]
+
+TEST_LABELS = {
+    "aptitude": "aptitude",
+    "personality": "personality",
+    "career_interest": "career interest",
+    "skill_assessment": "skill",
+}
+
+SEGMENT_STEPS = {
+    "student": ("choose electives in", "join clubs and short courses to practise", "explore a first role as"),
+    "graduate": ("take certifications in", "use internships and projects to build", "aim for entry-level roles as"),
+    "professional": ("upskill in", "take on stretch projects at work to build", "plan a move towards"),
+}
+
+
+def profile(subscores: Optional[Dict[str, float]]) -> Dict[str, float]:
+    """Known dimensions only, with neuroticism flipped to emotional stability."""
+    scores = {}
+    for dimension, value in (subscores or {}).items():
+        if dimension in DERIVED_DIMENSIONS:
+            dimension, value = DERIVED_DIMENSIONS[dimension], 100.0 - value
+        if dimension in DIMENSIONS:
+            scores[dimension] = float(value)
+    return scores
+
+
+def match_careers(scores: Dict[str, float], score: float,
+                  interests: Sequence[str]) -> List[Tuple[int, Career]]:
+    """Careers by match score (best first); ties break on title."""
+    wanted = {i.lower() for i in interests}
+    ranked = []
+    for career in CAREERS:
+        overlap = [(w, scores[d]) for d, w in career.weights.items() if d in scores]
+        weight = sum(w for w, _ in overlap)
+        fit = sum(w * s for w, s in overlap) / weight if weight else score
+        # careers the test says little about are pulled towards the overall score
+        coverage = min(1.0, weight / 6)
+        fit = coverage * fit + (1 - coverage) * score
+        bonus = INTEREST_BONUS if career.area.lower() in wanted or career.mentor_category.lower() in wanted else 0
+        match = round(MIN_MATCH + fit * (MAX_MATCH - MIN_MATCH - INTEREST_BONUS) / 100 + bonus)
+        ranked.append((max(MIN_MATCH, min(MAX_MATCH, match)), career))
+    ranked.sort(key=lambda item: (-item[0], item[1].title))
+    return ranked
+
+
+def _unique(items, limit: int) -> List[str]:
+    seen: List[str] = []
+    for item in items:
+        if item not in seen:
+            seen.append(item)
+            if len(seen) == limit:
+                break
+    return seen
+
+
+def build_report(test_type: str, score: float, subscores: Optional[Dict[str, float]],
+                 user: dict) -> dict:
+    """The full ``ai_report`` for one assessment, without calling the LLM."""
+    scores = profile(subscores)
+    interests = list(user.get("interests") or [])
+    ranked = match_careers(scores, score, interests)
+    top = [career for _, career in ranked[:CAREER_PATHS]]
+
+    # only dimensions the assessment measured are reported as strengths, weaknesses or gaps
+    by_score = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    strong = [d for d, s in by_score if s >= STRONG_SCORE][:4]
+    weak = [d for d, s in reversed(by_score) if s < STRONG_SCORE][:3]
+    shortfalls = [s for s in top[0].skills if s in scores and scores[s] < STRONG_SCORE]
+    gap_skills = _unique([s for career in top[:3] for s in career.skills
+                          if s in scores and scores[s] < GAP_SCORE], 4)
+    label = TEST_LABELS.get(test_type, test_type)
+
+    strengths = [DIMENSIONS[d].strength for d in strong] or [f"Completed the {label} assessment"]
+    weaknesses = _unique([DIMENSIONS[d].growth for d in weak + shortfalls], 3)
+    if not weaknesses:
+        weaknesses = [f"No weak areas showed up in the {label} assessment" if scores
+                      else f"Retake the {label} assessment for a breakdown by area"]
+    if gap_skills:
+        gaps = [DIMENSIONS[s].growth for s in gap_skills]
+    elif any(s in scores for career in top[:3] for s in career.skills):
+        gaps = [f"No major skill gaps for {top[0].title}"]
+    else:
+        gaps = [f"Take the skill assessment to find your skill gaps for {top[0].title}"]
+    subjects = _unique([s for career in top[:3] for s in career.subjects]
+                       + [DIMENSIONS[d].subject for d in weak], 4)
+    fields = [DIMENSIONS[d].label for d in strong if d in ("stem", "social", "creative", "business",
+                                                           "technical", "outdoor", "analytical")]
+    report_interests = _unique(interests + fields + [career.area for career in top[:3]], 5)
+    mentor_categories = _unique([career.mentor_category for career in top] + ["Career Coaching"], 3)
+
+    # practise the biggest measured gap, else a core skill of the best match
+    focus = (gap_skills + weak + list(top[0].skills))[0]
+    choose, practise, aim = SEGMENT_STEPS.get(user.get("segment"), SEGMENT_STEPS["graduate"])
+    learning_path = (f"First {choose} {subjects[0]} and {subjects[1]}, then {practise} "
+                     f"{DIMENSIONS[focus].growth.lower()}, and {aim} {top[0].title}.")
+    name = (user.get("name") or "").split(" ")[0]
+    summary = f"{name + ', your' if name else 'Your'} {label} score is {score:.0f}%"
+    if strong:
+        areas = " and ".join(DIMENSIONS[d].label.lower() for d in strong[:2])
+        summary += f", with {areas} as your strongest area{'s' if len(strong) > 1 else ''}"
+    summary += f". {top[0].title} and {top[1].title} are your closest career matches."
+
+    return {
+        "strengths": strengths,
+        "weaknesses": weaknesses,
+        "interests": report_interests,
+        "predicted_learning_path": learning_path,
+        "subject_recommendations": subjects,
+        "skill_gaps": gaps,
+        "career_paths": [
+            {"title": career.title, "match_score": match, "description": career.description}
+            for match, career in ranked[:CAREER_PATHS]
+        ],
+        "mentor_categories": mentor_categories,
+        "summary": summary,
+        "source": REPORT_SOURCE,
+    }
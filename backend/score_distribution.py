@@ -0,0 +1,275 @@
+"""Score percentiles per test type and segment from precomputed histograms.
+
+Every completed assessment increments a fixed-width histogram per
+``(test_type, segment)`` (plus an ``all`` segment) and one per scoring
+dimension. The histograms live in ``score_histograms`` and each worker keeps
+a copy with prefix sums, so a percentile lookup is a couple of list reads.
+Workers reload the shared counts every ``PERCENTILE_REFRESH_INTERVAL``; one
+worker at a time (holding a lease) recounts everything exactly from a
+streamed cursor with pandas/NumPy every ``PERCENTILE_REBUILD_INTERVAL`` to
+repair drift, e.g. increments lost to a crash between the two writes.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAMS_COLLECTION = "score_histograms"
+LEASE_ID = "lease:rebuild"
+BIN_WIDTH = 0.5
+BINS = int(100 / BIN_WIDTH) + 1  # the last bin holds perfect scores
+ALL_SEGMENTS = "all"
+OVERALL = "overall"
+PERCENTILE_MIN_SAMPLES = int(os.environ.get("PERCENTILE_MIN_SAMPLES", "10"))
+PERCENTILE_REFRESH_INTERVAL = float(os.environ.get("PERCENTILE_REFRESH_INTERVAL", "60"))
+PERCENTILE_REBUILD_INTERVAL = float(os.environ.get("PERCENTILE_REBUILD_INTERVAL", "86400"))
+REBUILD_CHUNK_ROWS = 50_000
+
+Key = Tuple[str, str, str]  # (test_type, segment, dimension or OVERALL)
+
+
+def bin_index(score: float) -> int:
+    return max(0, min(BINS - 1, int(score // BIN_WIDTH)))
+
+
+def histogram_id(key: Key) -> str:
+    return "|".join(key)
+
+
+class Histogram:
+    def __init__(self, counts: Optional[List[int]] = None):
+        self.counts = counts if counts is not None else [0] * BINS
+        self.total = sum(self.counts)
+        self._below: Optional[List[int]] = None  # _below[i] = scores in bins < i
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "Histogram":
+        counts = [0] * BINS
+        for index, count in (doc.get("bins") or {}).items():
+            counts[int(index)] = count
+        return cls(counts)
+
+    def add(self, score: float, n: int = 1) -> None:
+        self.counts[bin_index(score)] += n
+        self.total += n
+        self._below = None
+
+    def percentile(self, score: float) -> Optional[float]:
+        """Mid-rank percentile of ``score``; None until there are enough samples."""
+        if self.total < PERCENTILE_MIN_SAMPLES:
+            return None
+        if self._below is None:
+            below, running = [], 0
+            for count in self.counts:
+                below.append(running)
+                running += count
+            self._below = below
+        i = bin_index(score)
+        return round((self._below[i] + self.counts[i] / 2) / self.total * 100, 1)
+
+
+def keys_for(test_type: str, segment: Optional[str], score: float,
+             subscores: Optional[Dict[str, float]]) -> List[Tuple[Key, float]]:
+    """Histogram keys a result counts towards, with the score for each."""
+    segments = [ALL_SEGMENTS] + ([segment] if segment and segment != ALL_SEGMENTS else [])
+    dimensions = [(OVERALL, score)] + sorted((subscores or {}).items())
+    return [((test_type, s, d), value) for s in segments for d, value in dimensions]
+
+
+class ScoreDistributions:
+    def __init__(self):
+        self.histograms: Dict[Key, Histogram] = {}
+
+    # ---- hot path ----
+
+    def lookup(self, test_type: str, segment: Optional[str], score: Optional[float],
+               subscores: Optional[Dict[str, float]] = None) -> Optional[dict]:
+        if score is None:
+            return None
+        overall = self.histograms.get((test_type, segment or ALL_SEGMENTS, OVERALL))
+        everyone = self.histograms.get((test_type, ALL_SEGMENTS, OVERALL))
+        dimensions = {}
+        for dimension, value in (subscores or {}).items():
+            histogram = self.histograms.get((test_type, segment or ALL_SEGMENTS, dimension))
+            dimensions[dimension] = histogram.percentile(value) if histogram else None
+        return {
+            "segment": segment,
+            "percentile": overall.percentile(score) if overall else None,
+            "overall_percentile": everyone.percentile(score) if everyone else None,
+            "sample_size": overall.total if overall else 0,
+            "dimensions": dimensions,
+        }
+
+    async def record(self, test_type: str, segment: Optional[str], score: float,
+                     subscores: Optional[Dict[str, float]] = None) -> None:
+        """Count a completed assessment here and in the shared histograms."""
+        updates = []
+        for key, value in keys_for(test_type, segment, score, subscores):
+            self.histograms.setdefault(key, Histogram()).add(value)
+            test, seg, dimension = key
+            updates.append(UpdateOne(
+                {"_id": histogram_id(key)},
+                {"$inc": {f"bins.{bin_index(value)}": 1, "total": 1},
+                 "$setOnInsert": {"test_type": test, "segment": seg, "dimension": dimension}},
+                upsert=True,
+            ))
+        try:
+            await db[HISTOGRAMS_COLLECTION].bulk_write(updates, ordered=False)
+        except PyMongoError as e:
+            # the next exact rebuild picks this result up again
+            logger.error(f"Could not record score for {test_type}: {e}")
+
+    # ---- background ----
+
+    async def refresh(self) -> None:
+        histograms = {}
+        async for doc in db[HISTOGRAMS_COLLECTION].find({"test_type": {"$exists": True}}):
+            histograms[(doc["test_type"], doc["segment"], doc["dimension"])] = Histogram.from_document(doc)
+        self.histograms = histograms
+
+    async def _acquire_lease(self, hold: float) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db[HISTOGRAMS_COLLECTION].update_one(
+                {"_id": LEASE_ID, "until": {"$lt": now}},
+                {"$set": {"until": now + timedelta(seconds=hold), "owner": os.getpid()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False  # someone else holds an unexpired lease
+        return True
+
+    async def rebuild(self) -> int:
+        """Recount every histogram from the assessments; returns assessments counted.
+
+        The recount covers results completed before it started and is applied
+        as ``$inc`` deltas against the counts stored at that moment, so results
+        recorded while it runs are kept. A result still being submitted when it
+        starts may be counted twice until the next rebuild.
+        """
+        stored: Dict[Key, np.ndarray] = {}
+        async for doc in db[HISTOGRAMS_COLLECTION].find({"test_type": {"$exists": True}}):
+            key = (doc["test_type"], doc["segment"], doc["dimension"])
+            stored[key] = np.array(Histogram.from_document(doc).counts, dtype=np.int64)
+        cutoff = datetime.utcnow()  # after the read: anything completed later is not in ``stored``
+        counts: Dict[Key, np.ndarray] = {}
+        seen = 0
+        async for frame in _stream_results(cutoff):
+            seen += len(frame)
+            _count_frame(frame, counts)
+        requests = delta_updates(counts, stored)
+        if requests:
+            await db[HISTOGRAMS_COLLECTION].bulk_write(requests, ordered=False)
+        await self.refresh()
+        return seen
+
+    async def run(self, refresh_interval: float = PERCENTILE_REFRESH_INTERVAL,
+                  rebuild_interval: float = PERCENTILE_REBUILD_INTERVAL) -> None:
+        loop = asyncio.get_running_loop()
+        next_rebuild = loop.time() + rebuild_interval
+        while True:
+            await asyncio.sleep(refresh_interval)
+            try:
+                if loop.time() >= next_rebuild:
+                    next_rebuild = loop.time() + rebuild_interval
+                    if await self._acquire_lease(rebuild_interval / 2):
+                        counted = await self.rebuild()
+                        logger.info(f"Rebuilt score histograms from {counted} assessments")
+                        continue
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Score histogram refresh failed: {e}")
+
+# ==================== EXACT REBUILD ====================
+
+async def _stream_results(cutoff: datetime, chunk_rows: int = REBUILD_CHUNK_ROWS):
+    """Assessments completed before ``cutoff`` as DataFrames of test_type,
+    segment, score, subscores.
+
+    Results submitted before the segment was stored on the assessment get it
+    from the user document.
+    """
+    match = {"completed": True, "score": {"$ne": None}, "completed_at": {"$not": {"$gt": cutoff}}}
+    fields = {"_id": 0, "test_type": 1, "segment": 1, "score": 1, "subscores": 1}
+    stored = db.assessments.find({**match, "segment": {"$exists": True}}, fields, batch_size=10_000)
+    legacy = db.assessments.aggregate([
+        {"$match": {**match, "segment": {"$exists": False}}},
+        {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "id", "as": "user",
+                     "pipeline": [{"$project": {"_id": 0, "segment": 1}}]}},
+        {"$project": {**fields, "segment": {"$first": "$user.segment"}}},
+    ], batchSize=10_000)
+    for cursor in (stored, legacy):
+        rows = []
+        async for doc in cursor:
+            rows.append(doc)
+            if len(rows) >= chunk_rows:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+
+
+def _accumulate(counts: Dict[Key, np.ndarray], frame: pd.DataFrame, dimension_column: Optional[str]) -> None:
+    bins = np.clip(np.floor_divide(frame["score"].to_numpy(dtype=float), BIN_WIDTH).astype(int), 0, BINS - 1)
+    frame = frame.assign(bin=bins)
+    for segment_column in ("all", "segment"):
+        group_columns = ["test_type", segment_column] + ([dimension_column] if dimension_column else [])
+        for group, part in frame.groupby(group_columns, dropna=True):
+            test_type, segment = group[0], group[1]
+            dimension = group[2] if dimension_column else OVERALL
+            key = (test_type, segment, dimension)
+            if key not in counts:
+                counts[key] = np.zeros(BINS, dtype=np.int64)
+            counts[key] += np.bincount(part["bin"].to_numpy(), minlength=BINS)
+
+
+def _count_frame(frame: pd.DataFrame, counts: Dict[Key, np.ndarray]) -> None:
+    if "segment" not in frame:
+        frame["segment"] = None
+    frame = frame.assign(all=ALL_SEGMENTS)
+    _accumulate(counts, frame[["test_type", "all", "segment", "score"]], None)
+    if "subscores" in frame:
+        dims = frame[["test_type", "all", "segment", "subscores"]].dropna(subset=["subscores"])
+        dims = dims[dims["subscores"].map(bool)]
+        if len(dims):
+            dims = dims.assign(subscores=dims["subscores"].map(lambda s: list(s.items()))).explode("subscores")
+            dims = dims.assign(dimension=dims["subscores"].str[0], score=dims["subscores"].str[1])
+            _accumulate(counts, dims[["test_type", "all", "segment", "dimension", "score"]], "dimension")
+
+
+def delta_updates(counts: Dict[Key, np.ndarray], stored: Dict[Key, np.ndarray]) -> List[UpdateOne]:
+    """``$inc`` updates that turn the ``stored`` histograms into ``counts``."""
+    requests = []
+    for key in sorted(counts.keys() | stored.keys()):
+        delta = counts.get(key, np.zeros(BINS, dtype=np.int64)) - stored.get(key, np.zeros(BINS, dtype=np.int64))
+        if not delta.any():
+            continue
+        inc = {f"bins.{i}": int(c) for i, c in enumerate(delta) if c}
+        inc["total"] = int(delta.sum())
+        requests.append(UpdateOne(
+            {"_id": histogram_id(key)},
+            {"$inc": inc, "$setOnInsert": {"test_type": key[0], "segment": key[1], "dimension": key[2]}},
+            upsert=True,
+        ))
+    return requests
+
+
+def count_results(results: Iterable[dict]) -> Dict[Key, np.ndarray]:
+    """Exact histograms for an in-memory list of results (used by checks and tools)."""
+    counts: Dict[Key, np.ndarray] = {}
+    frame = pd.DataFrame(list(results))
+    if len(frame):
+        _count_frame(frame, counts)
+    return counts
@@ -1,44 +1,90 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, Header
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set, TYPE_CHECKING
 import uuid
 from datetime import datetime, timedelta
 import jwt
 import bcrypt
 import random
 import json
-from openai import OpenAI
+import asyncio
+import time
+from availability import (
+    MAX_SEARCH_DAYS, SESSION_MINUTES, AvailabilityWindow, SlotConflict, parse_minutes,
+    prepare_candidates, release, reserve, search_free_slots, within_windows,
+)
+from badges import PRIVATE_USER_FIELDS, apply_progress, badge_catalog
+from batch import BATCH_MAX_ITEMS, BatchDispatcher, BatchRequest, memoized
+from chat_store import append_messages, recent_messages, run_archiver
+from database import close_client, db, ensure_indexes, wait_until_connected, warm_pool
+from exports import EXPORTS, FORMATS, export_stream
+from faq import FaqIndex, record_chat_answer
+from idempotency import IdempotencyMiddleware
+from invalidation import InvalidationBus, InvalidationEvent, LocalCache
+from metrics import (
+    CONTENT_TYPE_LATEST, MetricsMiddleware,
+    monitor_event_loop_lag, observe_llm_call, record_llm_fallback, render_latest,
+)
+from profiling import LoopWatchdog, ProfilingMiddleware, is_admin_token, profile_store
+from push import ProgressAwarded, PushHub, ReportReady, SessionStatusChanged
+from report_engine import build_report
+from score_distribution import ScoreDistributions
+from suggest import SuggestService
+from sync import InvalidVersion, sync_changes
+from timeutil import to_utc_naive
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'nexosr_db')]
+# MongoDB connection is created lazily per worker process, see database.py
 
 # OpenAI Client (Emergent LLM Key)
-EMERGENT_LLM_KEY = "sk-emergent-09538C92b582341C2B"
-openai_client = OpenAI(
-    api_key=EMERGENT_LLM_KEY,
-    base_url="https://emergentintegrations.ai/api/v1/llm",
-    timeout=30.0,
-    max_retries=2
-)
+EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', "sk-emergent-09538C92b582341C2B")
+LLM_BASE_URL = os.environ.get('LLM_BASE_URL', "https://emergentintegrations.ai/api/v1/llm")
+_llm_client: Optional["OpenAI"] = None
+_llm_client_pid: Optional[int] = None
+
+def get_llm_client() -> "OpenAI":
+    """OpenAI client owned by the current worker process"""
+    global _llm_client, _llm_client_pid
+    if _llm_client is None or _llm_client_pid != os.getpid():
+        from openai import OpenAI  # heavy import, deferred until the worker starts
+        _llm_client = OpenAI(
+            api_key=EMERGENT_LLM_KEY,
+            base_url=LLM_BASE_URL,
+            timeout=30.0,
+            max_retries=2
+        )
+        _llm_client_pid = os.getpid()
+    return _llm_client
+
+# Startup / shutdown tuning
+STARTUP_TIMEOUT = float(os.environ.get('STARTUP_TIMEOUT', '30'))
+WARM_POOL_CONNECTIONS = int(os.environ.get('WARM_POOL_CONNECTIONS', '4'))
+# Bounds the wait for fire-and-forget tasks (report enrichment) at shutdown
+DRAIN_TIMEOUT = float(os.environ.get('DRAIN_TIMEOUT', '20'))
+# Which users get the instant local report enriched by the LLM: all, premium or none
+REPORT_LLM_ENRICHMENT = os.environ.get('REPORT_LLM_ENRICHMENT', 'premium')
+# Provisional reports still pending after this long are made final as they are
+REPORT_PENDING_TIMEOUT = float(os.environ.get('REPORT_PENDING_TIMEOUT', '300'))
+REPORT_SWEEP_INTERVAL = float(os.environ.get('REPORT_SWEEP_INTERVAL', '60'))
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'nexosr-secret-key-2024')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24 * 7  # 1 week
 
-app = FastAPI(title="NEXOSR API", version="1.0.0")
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer(auto_error=False)
 
@@ -56,6 +102,7 @@ class UserCreate(BaseModel):
     interests: List[str] = []
     goals: str = ""
     language: str = "en"
+    referral_code: Optional[str] = None  # referrer's user id
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -77,6 +124,9 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     tests_taken: int = 0
     mentor_sessions: int = 0
+    referrals: int = 0
+    referred_by: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # set on every write, see sync.py
 
 class Assessment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -85,10 +135,14 @@ class Assessment(BaseModel):
     questions: List[Dict[str, Any]]
     answers: List[Dict[str, Any]] = []
     score: Optional[float] = None
+    subscores: Optional[Dict[str, float]] = None  # per dimension, see score_dimensions
+    segment: Optional[str] = None  # user's segment when submitted
     ai_report: Optional[Dict[str, Any]] = None
+    report_pending: bool = False  # local report shown until the LLM one replaces it
     completed: bool = False
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class AssessmentSubmit(BaseModel):
     assessment_id: str
@@ -109,7 +163,9 @@ class Mentor(BaseModel):
     rating: float = 5.0
     total_sessions: int = 0
     approved: bool = False
+    availability: List[Dict[str, Any]] = []  # weekly UTC windows, see availability.py
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)  # set on every write, see invalidation.py
 
 class MentorCreate(BaseModel):
     name: str
@@ -130,10 +186,12 @@ class MentorSession(BaseModel):
     mentee_name: str
     session_type: str  # 30min, 1hr
     scheduled_at: datetime
+    ends_at: Optional[datetime] = None
     status: str = "pending"  # pending, confirmed, completed, cancelled
     price: float
     notes: str = ""
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class BookSession(BaseModel):
     mentor_id: str
@@ -141,6 +199,9 @@ class BookSession(BaseModel):
     scheduled_at: datetime
     notes: str = ""
 
+class AvailabilityUpdate(BaseModel):
+    windows: List[AvailabilityWindow]
+
 class ChatMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -162,6 +223,7 @@ class Opportunity(BaseModel):
     deadline: Optional[datetime] = None
     tags: List[str] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class Payment(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -172,10 +234,18 @@ class Payment(BaseModel):
     status: str = "pending"  # pending, completed, failed
     description: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 # ==================== HELPER FUNCTIONS ====================
 
 TRIAL_DAYS = 15  # 15-day free premium trial
+FREE_TEST_LIMIT = 2
+PREMIUM_PLANS = {"monthly": 299, "quarterly": 799, "annual": 1999}  # INR
+
+# XP rewards
+ASSESSMENT_XP = 50
+MENTOR_SESSION_XP = 25
+REFERRAL_XP = 30
 
 def get_user_segment(age: int) -> str:
     if age < 19:
@@ -220,6 +290,14 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
+def strip_id(doc: dict) -> dict:
+    """Copy of a Mongo document without its ObjectId"""
+    return {k: v for k, v in doc.items() if k != "_id"}
+
+def public_user(user: dict) -> dict:
+    """User document safe to return to clients"""
+    return {k: v for k, v in user.items() if k not in PRIVATE_USER_FIELDS}
+
 def create_token(user_id: str, email: str) -> str:
     payload = {
         "user_id": user_id,
@@ -228,11 +306,21 @@ def create_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def decode_token(token: str) -> dict:
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+def user_id_from_token(token: str) -> Optional[str]:
+    """User id of a valid token, without a database lookup"""
+    try:
+        return decode_token(token).get("user_id")
+    except jwt.InvalidTokenError:
+        return None
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_token(credentials.credentials)
         user = await db.users.find_one({"id": payload["user_id"]})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
@@ -242,6 +330,101 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_latest_assessment(user_id: str) -> Optional[dict]:
+    """Latest completed assessment, loaded once per /api/batch call"""
+    return await memoized(("latest_assessment", user_id), lambda: db.assessments.find_one(
+        {"user_id": user_id, "completed": True},
+        sort=[("completed_at", -1)]
+    ))
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+# ==================== CACHES ====================
+
+# Per-worker caches kept coherent across workers by the change-stream bus
+invalidation_bus = InvalidationBus(poll_interval=float(os.environ.get('INVALIDATION_POLL_INTERVAL', '5')))
+
+LEADERBOARD_FIELDS = {"xp_points", "name", "badges", "segment"}
+leaderboard_cache = LocalCache(
+    "leaderboard", ttl=30.0, maxsize=1,
+    key_for=lambda event: None,
+    relevant=lambda event: event.operation != "update" or bool(event.updated_fields & LEADERBOARD_FIELDS)
+)
+mentor_list_cache = LocalCache("mentors", ttl=60.0, maxsize=256, key_for=lambda event: None)
+# Slot search candidates: mentors with pre-parsed availability windows, per (category, expertise)
+mentor_availability_cache = LocalCache("mentor_availability", ttl=60.0, maxsize=256, key_for=lambda event: None)
+
+invalidation_bus.register_cache(leaderboard_cache, ["users"])
+invalidation_bus.register_cache(mentor_list_cache, ["mentors"])
+invalidation_bus.register_cache(mentor_availability_cache, ["mentors"])
+
+# Score percentile histograms, refreshed from MongoDB in the background
+score_distributions = ScoreDistributions()
+
+# Autocomplete index, updated per document from the same bus
+suggest_service = SuggestService()
+suggest_service.attach(invalidation_bus)
+
+# Local answers for common product questions, tried before the LLM in /chat
+# How FAQ answers describe LLM report enrichment under REPORT_LLM_ENRICHMENT
+ENRICHED_REPORT_NOTE = "An AI-enriched version replaces it within a minute."
+REPORT_FACTS = {
+    "all": {
+        "report_note": ENRICHED_REPORT_NOTE,
+        "premium_report_note": ENRICHED_REPORT_NOTE,
+        "premium_features": "unlimited assessments and AI-matched mentor recommendations",
+    },
+    "premium": {
+        "report_note": "Premium users also get an AI-enriched version of every report.",
+        "premium_report_note": "As a premium user, you also get an AI-enriched version that replaces it "
+                               "within a minute.",
+        "premium_features": "unlimited assessments, AI-enriched reports and AI-matched mentor recommendations",
+    },
+    "none": {
+        "report_note": "",
+        "premium_report_note": "",
+        "premium_features": "unlimited assessments and AI-matched mentor recommendations",
+    },
+}
+
+faq_index = FaqIndex(facts={
+    "free_tests": FREE_TEST_LIMIT,
+    "trial_days": TRIAL_DAYS,
+    **{f"{plan}_price": f"₹{price}" for plan, price in PREMIUM_PLANS.items()},
+    "assessment_xp": ASSESSMENT_XP,
+    "mentor_session_xp": MENTOR_SESSION_XP,
+    "referral_xp": REFERRAL_XP,
+    "badges": "; ".join(f"{b['name']} ({b['description']})" for b in badge_catalog()),
+    **REPORT_FACTS.get(REPORT_LLM_ENRICHMENT, REPORT_FACTS["none"]),
+})
+
+# Socket.IO push channel, mounted at /socket.io
+push_hub = PushHub(user_id_from_token)
+
+async def push_progress(user_id: str, updated: Optional[dict], xp: int, badges_earned: List[str]):
+    """Push an XP/badge award and any leaderboard moves it caused"""
+    if updated is None:
+        return
+    xp_points = updated.get("xp_points", 0)
+    await push_hub.notify(user_id, ProgressAwarded(xp_earned=xp, xp_points=xp_points, badges_earned=badges_earned))
+    await push_hub.notify_rank_changes(user_id, xp_points - xp, xp_points)
+
+# Work that outlives its request (e.g. LLM report enrichment); awaited on shutdown
+background_tasks: Set[asyncio.Task] = set()
+
+def run_in_background(coro) -> asyncio.Task:
+    """Start coro without awaiting it, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def notify_local_write(collection: str, operation: str, key: Optional[str] = None, fields: List[str] = ()):
+    """Invalidate this worker's caches right away; other workers hear it from the change stream"""
+    invalidation_bus.publish(InvalidationEvent(collection, operation, key, frozenset(fields)))
+
 # ==================== PSYCHOMETRIC TEST QUESTIONS ====================
 
 APTITUDE_QUESTIONS = [
@@ -324,6 +507,10 @@ async def register(user_data: UserCreate):
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    referrer = None
+    if user_data.referral_code:
+        referrer = await db.users.find_one({"id": user_data.referral_code}, {"id": 1})
+    
     user = User(
         email=user_data.email,
         name=user_data.name,
@@ -331,13 +518,20 @@ async def register(user_data: UserCreate):
         segment=get_user_segment(user_data.age),
         interests=user_data.interests,
         goals=user_data.goals,
-        language=user_data.language
+        language=user_data.language,
+        referred_by=referrer["id"] if referrer else None
     )
     
     user_dict = user.dict()
     user_dict["password_hash"] = hash_password(user_data.password)
     
     await db.users.insert_one(user_dict)
+    notify_local_write("users", "insert", user.id)
+    
+    if referrer:
+        updated, badges_earned = await apply_progress(referrer["id"], xp=REFERRAL_XP, inc={"referrals": 1})
+        notify_local_write("users", "update", referrer["id"], ["xp_points", "referrals", "badges"])
+        await push_progress(referrer["id"], updated, REFERRAL_XP, badges_earned)
     token = create_token(user.id, user.email)
     
     return {"token": token, "user": user.dict()}
@@ -349,13 +543,13 @@ async def login(credentials: UserLogin):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     token = create_token(user["id"], user["email"])
-    user_data = {k: v for k, v in user.items() if k != "password_hash" and k != "_id"}
+    user_data = public_user(user)
     
     return {"token": token, "user": user_data}
 
 @api_router.get("/auth/me")
 async def get_me(user: dict = Depends(get_current_user)):
-    user_data = {k: v for k, v in user.items() if k != "password_hash" and k != "_id"}
+    user_data = public_user(user)
     return user_data
 
 # ==================== ASSESSMENT ROUTES ====================
@@ -365,8 +559,10 @@ async def start_assessment(test_type: str = Query(...), user: dict = Depends(get
     # Check limits for free users (premium users and trial users get unlimited)
     if not has_premium_access(user):
         user_tests = await db.assessments.count_documents({"user_id": user["id"], "completed": True})
-        if user_tests >= 2:
-            raise HTTPException(status_code=403, detail="Free users can only take 2 tests. Upgrade to Premium!")
+        if user_tests >= FREE_TEST_LIMIT:
+            raise HTTPException(
+                status_code=403, detail=f"Free users can only take {FREE_TEST_LIMIT} tests. Upgrade to Premium!"
+            )
     
     # Select questions based on test type
     if test_type == "aptitude":
@@ -389,6 +585,42 @@ async def start_assessment(test_type: str = Query(...), user: dict = Depends(get
     await db.assessments.insert_one(assessment.dict())
     return assessment.dict()
 
+def score_assessment(test_type: str, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> float:
+    # Calculate score for aptitude test
+    score = 0
+    if test_type == "aptitude":
+        for answer in answers:
+            question = next((q for q in questions if q["id"] == answer["question_id"]), None)
+            if question and answer.get("selected") == question.get("correct"):
+                score += 1
+        return (score / len(questions)) * 100
+    # For the other tests, average the answers with the first option as 0 and the last as 100
+    by_id = {q["id"]: q for q in questions}
+    values = [
+        a.get("selected", 0) / max(len(by_id[a["question_id"]]["options"]) - 1, 1) * 100
+        for a in answers if a.get("question_id") in by_id
+    ]
+    return sum(values) / len(values) if values else 0.0
+
+# Question field naming the dimension each test type measures
+DIMENSION_FIELDS = {"aptitude": "category", "personality": "trait", "career_interest": "field", "skill_assessment": "skill"}
+
+def score_dimensions(test_type: str, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]]) -> Dict[str, float]:
+    """0-100 score per dimension (aptitude category, personality trait, interest field, skill)"""
+    field = DIMENSION_FIELDS.get(test_type)
+    by_id = {q["id"]: q for q in questions}
+    totals: Dict[str, List[float]] = {}
+    for answer in answers:
+        question = by_id.get(answer.get("question_id"))
+        if not question or not field or field not in question:
+            continue
+        if test_type == "aptitude":
+            value = 100.0 if answer.get("selected") == question.get("correct") else 0.0
+        else:
+            value = answer.get("selected", 0) / max(len(question["options"]) - 1, 1) * 100
+        totals.setdefault(question[field], []).append(value)
+    return {dimension: round(sum(v) / len(v), 1) for dimension, v in totals.items()}
+
 @api_router.post("/assessments/submit")
 async def submit_assessment(submission: AssessmentSubmit, user: dict = Depends(get_current_user)):
     assessment = await db.assessments.find_one({"id": submission.assessment_id, "user_id": user["id"]})
@@ -398,55 +630,111 @@ async def submit_assessment(submission: AssessmentSubmit, user: dict = Depends(g
     if assessment.get("completed"):
         raise HTTPException(status_code=400, detail="Assessment already completed")
     
-    # Calculate score for aptitude test
-    score = 0
-    if assessment["test_type"] == "aptitude":
-        for answer in submission.answers:
-            question = next((q for q in assessment["questions"] if q["id"] == answer["question_id"]), None)
-            if question and answer.get("selected") == question.get("correct"):
-                score += 1
-        score = (score / len(assessment["questions"])) * 100
-    else:
-        # For personality/interest tests, calculate average score
-        total = sum(a.get("selected", 0) for a in submission.answers)
-        score = (total / (len(submission.answers) * 4)) * 100  # Assuming 5-point scale (0-4)
+    score = score_assessment(assessment["test_type"], assessment["questions"], submission.answers)
+    subscores = score_dimensions(assessment["test_type"], assessment["questions"], submission.answers)
     
-    # Generate AI Report
-    ai_report = await generate_ai_report(user, assessment, submission.answers, score)
+    # Instant local report; the LLM version replaces it in the background when enabled
+    ai_report = build_report(assessment["test_type"], score, subscores, user)
+    report_pending = REPORT_LLM_ENRICHMENT == "all" or (
+        REPORT_LLM_ENRICHMENT == "premium" and has_premium_access(user)
+    )
     
     # Update assessment
+    completed_at = datetime.utcnow()
     await db.assessments.update_one(
         {"id": submission.assessment_id},
         {"$set": {
             "answers": submission.answers,
             "score": score,
+            "subscores": subscores,
+            "segment": user.get("segment"),
             "ai_report": ai_report,
+            "report_pending": report_pending,
             "completed": True,
-            "completed_at": datetime.utcnow()
+            "completed_at": completed_at,
+            "updated_at": completed_at
         }}
     )
+    if report_pending:
+        run_in_background(enrich_report(user, assessment, submission.answers, score, subscores))
     
-    # Update user XP
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$inc": {"xp_points": 50, "tests_taken": 1}}
+    # Update user XP and award badges in one atomic update
+    best_scores = {"best_skill_score": score} if assessment["test_type"] == "skill_assessment" else None
+    updated, badges_earned = await apply_progress(
+        user["id"], xp=ASSESSMENT_XP, inc={"tests_taken": 1}, maximum=best_scores
     )
+    notify_local_write("users", "update", user["id"], ["xp_points", "tests_taken", "badges"])
+    await push_hub.notify(user["id"], ReportReady(
+        assessment_id=submission.assessment_id, test_type=assessment["test_type"], score=score,
+        provisional=report_pending
+    ))
+    await push_progress(user["id"], updated, ASSESSMENT_XP, badges_earned)
     
-    # Check for badge
-    updated_user = await db.users.find_one({"id": user["id"]})
-    if updated_user["tests_taken"] == 1:
-        await db.users.update_one(
-            {"id": user["id"]},
-            {"$push": {"badges": "Career Explorer"}}
-        )
+    await score_distributions.record(assessment["test_type"], user.get("segment"), score, subscores)
     
     return {
         "score": score,
+        "subscores": subscores,
+        "percentiles": score_distributions.lookup(assessment["test_type"], user.get("segment"), score, subscores),
         "ai_report": ai_report,
-        "xp_earned": 50
+        "report_pending": report_pending,
+        "xp_earned": ASSESSMENT_XP,
+        "badges_earned": badges_earned
     }
 
-async def generate_ai_report(user: dict, assessment: dict, answers: list, score: float) -> dict:
+async def enrich_report(user: dict, assessment: dict, answers: list, score: float, subscores: Dict[str, float]):
+    """Replace the provisional local report with the LLM's and tell the user's clients"""
+    try:
+        ai_report = await generate_ai_report(user, assessment, answers, score, subscores)
+        if ai_report.get("source") != "llm":
+            # keep the provisional report pending; finalize_stale_reports settles it
+            logger.warning(f"Report enrichment for {assessment['id']} fell back to the local report")
+            return
+        await db.assessments.update_one(
+            {"id": assessment["id"], "report_pending": True},
+            {"$set": {"ai_report": ai_report, "report_pending": False, "updated_at": datetime.utcnow()}}
+        )
+        await push_hub.notify(user["id"], ReportReady(
+            assessment_id=assessment["id"], test_type=assessment["test_type"], score=score
+        ))
+    except Exception as e:
+        logger.error(f"Report enrichment failed for {assessment['id']}: {e}")
+
+async def finalize_stale_reports() -> int:
+    """Make provisional reports final when their enrichment failed or its worker died"""
+    cutoff = datetime.utcnow() - timedelta(seconds=REPORT_PENDING_TIMEOUT)
+    stale = await db.assessments.find(
+        {"report_pending": True, "completed_at": {"$lt": cutoff}},
+        {"_id": 0, "id": 1, "user_id": 1, "test_type": 1, "score": 1}
+    ).to_list(1000)
+    finalized = 0
+    for a in stale:
+        # conditional, so only one worker notifies when several sweep at once
+        result = await db.assessments.update_one(
+            {"id": a["id"], "report_pending": True},
+            {"$set": {"report_pending": False, "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            finalized += 1
+            await push_hub.notify(a["user_id"], ReportReady(
+                assessment_id=a["id"], test_type=a["test_type"], score=a["score"]
+            ))
+    return finalized
+
+async def run_report_sweeper(interval: float = REPORT_SWEEP_INTERVAL) -> None:
+    while True:
+        try:
+            finalized = await finalize_stale_reports()
+            if finalized:
+                logger.info(f"Finalized {finalized} provisional reports that were never enriched")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Report sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+async def generate_ai_report(user: dict, assessment: dict, answers: list, score: float,
+                             subscores: Dict[str, float]) -> dict:
     try:
         prompt = f"""
         You are Nexosr AI, a career guidance expert. Analyze this assessment and provide a detailed report.
@@ -460,6 +748,7 @@ async def generate_ai_report(user: dict, assessment: dict, answers: list, score:
         
         Assessment Type: {assessment['test_type']}
         Score: {score}%
+        Dimension scores (0-100): {json.dumps(subscores)}
         
         Questions and Answers:
         {json.dumps(list(zip(assessment['questions'], answers))[:5], indent=2)}
@@ -484,52 +773,83 @@ async def generate_ai_report(user: dict, assessment: dict, answers: list, score:
         }}
         """
         
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
+        started = time.perf_counter()
+        try:
+            # in a thread so the background enrichment doesn't stall the event loop
+            response = await asyncio.to_thread(
+                get_llm_client().chat.completions.create,
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"}
+            )
+        except Exception as e:
+            observe_llm_call("report", started, error=e)
+            raise
+        observe_llm_call("report", started, response)
         
-        return json.loads(response.choices[0].message.content)
+        return {**json.loads(response.choices[0].message.content), "source": "llm"}
     except Exception as e:
         logger.error(f"AI Report generation failed: {e}")
-        return {
-            "strengths": ["Analytical thinking", "Problem-solving", "Attention to detail"],
-            "weaknesses": ["Time management", "Public speaking"],
-            "interests": ["Technology", "Innovation"],
-            "predicted_learning_path": "Focus on building technical and soft skills",
-            "subject_recommendations": ["Mathematics", "Computer Science", "Communication"],
-            "skill_gaps": ["Leadership", "Networking"],
-            "career_paths": [
-                {"title": "Software Developer", "match_score": 85, "description": "Build software applications"},
-                {"title": "Data Analyst", "match_score": 80, "description": "Analyze data for insights"},
-                {"title": "Product Manager", "match_score": 75, "description": "Lead product development"},
-                {"title": "UX Designer", "match_score": 70, "description": "Design user experiences"},
-                {"title": "Business Analyst", "match_score": 65, "description": "Bridge business and tech"}
-            ],
-            "mentor_categories": ["Technology", "Career Coaching"],
-            "summary": f"Based on your assessment score of {score}%, you show strong potential in analytical fields."
-        }
+        record_llm_fallback("report")
+        return build_report(assessment["test_type"], score, subscores, user)
 
 @api_router.get("/assessments/history")
 async def get_assessment_history(user: dict = Depends(get_current_user)):
     assessments = await db.assessments.find({"user_id": user["id"], "completed": True}).sort("completed_at", -1).to_list(100)
-    return [{k: v for k, v in a.items() if k != "_id"} for a in assessments]
+    return [strip_id(a) for a in assessments]
 
 @api_router.get("/assessments/{assessment_id}")
 async def get_assessment(assessment_id: str, user: dict = Depends(get_current_user)):
     assessment = await db.assessments.find_one({"id": assessment_id, "user_id": user["id"]})
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
-    return {k: v for k, v in assessment.items() if k != "_id"}
+    result = strip_id(assessment)
+    if assessment.get("completed"):
+        result["percentiles"] = score_distributions.lookup(
+            assessment["test_type"], assessment.get("segment") or user.get("segment"),
+            assessment.get("score"), assessment.get("subscores")
+        )
+    return result
 
 # ==================== CHATBOT ROUTES ====================
 
+def fallback_chat_response(user: dict, message: str) -> str:
+    # Provide intelligent fallback responses based on user context
+    interests = user.get('interests', [])
+    segment = user.get('segment', 'student')
+    user_message_lower = message.lower()
+    
+    if 'career' in user_message_lower or 'job' in user_message_lower:
+        if 'Technology' in interests:
+            return f"Based on your interest in Technology, I'd recommend exploring careers in Software Development, Data Science, or Product Management. As a {segment}, you might want to start with online courses on platforms like Coursera or take assessments to identify your specific strengths. Would you like to take our Aptitude Test to get personalized career recommendations?"
+        elif 'Business' in interests:
+            return f"With your interest in Business, careers in Marketing, Consulting, or Entrepreneurship could be great fits! As a {segment}, consider building real-world experience through internships. Take our Career Interest Test to discover which business path aligns with your personality."
+        else:
+            return f"Great question! Based on your profile, I recommend taking our AI-powered assessments to discover careers that match your unique strengths. Our tests analyze aptitude, personality, and interests to provide personalized recommendations. Would you like to start with an assessment?"
+    elif 'mentor' in user_message_lower:
+        return f"Finding the right mentor can accelerate your career growth! Based on your interests in {', '.join(interests) if interests else 'various fields'}, I recommend connecting with mentors in those domains. Check out our Mentors section to find experts who can guide you. Premium users get AI-matched mentor recommendations!"
+    elif 'skill' in user_message_lower or 'learn' in user_message_lower:
+        return f"Continuous learning is key to career success! For {segment}s interested in {', '.join(interests) if interests else 'growing their careers'}, I recommend: 1) Taking our Skill Assessment to identify gaps, 2) Checking our Opportunities section for relevant courses, 3) Booking mentor sessions for personalized guidance."
+    elif 'test' in user_message_lower or 'assessment' in user_message_lower:
+        return "We offer 4 types of AI-powered assessments: 1) Aptitude Test - measures logical, numerical & verbal skills, 2) Personality Assessment - discovers your work style, 3) Career Interest Test - finds careers matching your passions, 4) Skill Assessment - evaluates your current abilities. Each takes about 10-15 minutes and provides detailed AI reports!"
+    else:
+        return f"Hi {user['name']}! I'm Nexosr AI, your future companion. I can help you with: career guidance, skill development advice, finding mentors, and discovering opportunities. As a {segment} interested in {', '.join(interests) if interests else 'exploring career options'}, what specific aspect of your career journey can I help with today?"
+
+async def save_chat_turn(user_id: str, message: str, reply: str):
+    user_msg = ChatMessage(user_id=user_id, role="user", content=message)
+    assistant_msg = ChatMessage(user_id=user_id, role="assistant", content=reply)
+    await append_messages(user_id, [user_msg.dict(), assistant_msg.dict()])
+
 @api_router.post("/chat")
 async def chat(request: ChatRequest, user: dict = Depends(get_current_user)):
+    # Common product questions are answered locally, without history lookups or an LLM call
+    faq = faq_index.answer(request.message, user, has_premium_access(user))
+    if faq is not None:
+        await save_chat_turn(user["id"], request.message, faq.message)
+        return {"message": faq.message, "source": "faq"}
+    
     # Get chat history
-    history = await db.chat_messages.find({"user_id": user["id"]}).sort("timestamp", -1).limit(10).to_list(10)
-    history.reverse()
+    history = await recent_messages(user["id"], 10)
     
     # Get user's assessment data for context
     assessments = await db.assessments.find({"user_id": user["id"], "completed": True}).to_list(5)
@@ -565,49 +885,32 @@ async def chat(request: ChatRequest, user: dict = Depends(get_current_user)):
     # Check premium status for advanced features
     is_premium = user.get("is_premium", False)
     
+    started = time.perf_counter()
     try:
-        response = openai_client.chat.completions.create(
+        response = get_llm_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             max_tokens=500 if is_premium else 200
         )
+        observe_llm_call("chat", started, response)
         
         assistant_message = response.choices[0].message.content
+        source = "llm"
     except Exception as e:
+        observe_llm_call("chat", started, error=e)
         logger.error(f"Chat error: {e}")
-        # Provide intelligent fallback responses based on user context
-        interests = user.get('interests', [])
-        segment = user.get('segment', 'student')
-        user_message_lower = request.message.lower()
-        
-        if 'career' in user_message_lower or 'job' in user_message_lower:
-            if 'Technology' in interests:
-                assistant_message = f"Based on your interest in Technology, I'd recommend exploring careers in Software Development, Data Science, or Product Management. As a {segment}, you might want to start with online courses on platforms like Coursera or take assessments to identify your specific strengths. Would you like to take our Aptitude Test to get personalized career recommendations?"
-            elif 'Business' in interests:
-                assistant_message = f"With your interest in Business, careers in Marketing, Consulting, or Entrepreneurship could be great fits! As a {segment}, consider building real-world experience through internships. Take our Career Interest Test to discover which business path aligns with your personality."
-            else:
-                assistant_message = f"Great question! Based on your profile, I recommend taking our AI-powered assessments to discover careers that match your unique strengths. Our tests analyze aptitude, personality, and interests to provide personalized recommendations. Would you like to start with an assessment?"
-        elif 'mentor' in user_message_lower:
-            assistant_message = f"Finding the right mentor can accelerate your career growth! Based on your interests in {', '.join(interests) if interests else 'various fields'}, I recommend connecting with mentors in those domains. Check out our Mentors section to find experts who can guide you. Premium users get AI-matched mentor recommendations!"
-        elif 'skill' in user_message_lower or 'learn' in user_message_lower:
-            assistant_message = f"Continuous learning is key to career success! For {segment}s interested in {', '.join(interests) if interests else 'growing their careers'}, I recommend: 1) Taking our Skill Assessment to identify gaps, 2) Checking our Opportunities section for relevant courses, 3) Booking mentor sessions for personalized guidance."
-        elif 'test' in user_message_lower or 'assessment' in user_message_lower:
-            assistant_message = "We offer 4 types of AI-powered assessments: 1) Aptitude Test - measures logical, numerical & verbal skills, 2) Personality Assessment - discovers your work style, 3) Career Interest Test - finds careers matching your passions, 4) Skill Assessment - evaluates your current abilities. Each takes about 10-15 minutes and provides detailed AI reports!"
-        else:
-            assistant_message = f"Hi {user['name']}! I'm Nexosr AI, your future companion. I can help you with: career guidance, skill development advice, finding mentors, and discovering opportunities. As a {segment} interested in {', '.join(interests) if interests else 'exploring career options'}, what specific aspect of your career journey can I help with today?"
+        record_llm_fallback("chat")
+        assistant_message = fallback_chat_response(user, request.message)
+        source = "fallback"
+    record_chat_answer(source)
     
-    # Save messages
-    user_msg = ChatMessage(user_id=user["id"], role="user", content=request.message)
-    assistant_msg = ChatMessage(user_id=user["id"], role="assistant", content=assistant_message)
+    await save_chat_turn(user["id"], request.message, assistant_message)
     
-    await db.chat_messages.insert_many([user_msg.dict(), assistant_msg.dict()])
-    
-    return {"message": assistant_message}
+    return {"message": assistant_message, "source": source}
 
 @api_router.get("/chat/history")
 async def get_chat_history(user: dict = Depends(get_current_user)):
-    messages = await db.chat_messages.find({"user_id": user["id"]}).sort("timestamp", 1).to_list(100)
-    return [{k: v for k, v in m.items() if k != "_id"} for m in messages]
+    return await recent_messages(user["id"], 100)
 
 # ==================== MENTOR ROUTES ====================
 
@@ -639,6 +942,10 @@ async def get_mentors(
     expertise: Optional[str] = None,
     user: dict = Depends(get_current_user)
 ):
+    cached = mentor_list_cache.get((category, expertise))
+    if cached is not None:
+        return cached
+    
     query = {"approved": True}
     if category:
         query["category"] = category
@@ -646,15 +953,14 @@ async def get_mentors(
         query["expertise"] = {"$in": [expertise]}
     
     mentors = await db.mentors.find(query).to_list(100)
-    return [{k: v for k, v in m.items() if k != "_id"} for m in mentors]
+    result = [strip_id(m) for m in mentors]
+    mentor_list_cache.set((category, expertise), result)
+    return result
 
 @api_router.get("/mentors/recommended")
 async def get_recommended_mentors(user: dict = Depends(get_current_user)):
     # Get user's latest assessment
-    assessment = await db.assessments.find_one(
-        {"user_id": user["id"], "completed": True},
-        sort=[("completed_at", -1)]
-    )
+    assessment = await get_latest_assessment(user["id"])
     
     mentor_categories = []
     if assessment and assessment.get("ai_report"):
@@ -675,14 +981,74 @@ async def get_recommended_mentors(user: dict = Depends(get_current_user)):
     else:
         mentors = await db.mentors.find({"approved": True}).limit(10).to_list(10)
     
-    return [{k: v for k, v in m.items() if k != "_id"} for m in mentors]
+    return [strip_id(m) for m in mentors]
+
+@api_router.put("/mentors/availability")
+async def set_mentor_availability(update: AvailabilityUpdate, user: dict = Depends(get_current_user)):
+    windows = [w.dict() for w in update.windows]
+    for w in windows:
+        if parse_minutes(w["start"]) >= parse_minutes(w["end"]):
+            raise HTTPException(status_code=400, detail="Availability window must end after it starts")
+    mentor = await db.mentors.find_one_and_update(
+        {"user_id": user["id"]},
+        {"$set": {"availability": windows, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0, "id": 1},
+    )
+    if not mentor:
+        raise HTTPException(status_code=404, detail="Mentor profile not found")
+    notify_local_write("mentors", "update", mentor["id"], ["availability"])
+    return {"mentor_id": mentor["id"], "availability": windows}
+
+@api_router.get("/mentors/slots")
+async def search_mentor_slots(
+    start: datetime,
+    end: datetime,
+    session_type: str = "30min",
+    category: Optional[str] = None,
+    expertise: Optional[str] = None,
+    per_mentor: int = Query(5, ge=1, le=50),
+    limit: int = Query(50, ge=1, le=500),
+    user: dict = Depends(get_current_user)
+):
+    """Free slots across all matching mentors, earliest first"""
+    if session_type not in SESSION_MINUTES:
+        raise HTTPException(status_code=400, detail="Invalid session type")
+    start, end = to_utc_naive(start), to_utc_naive(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=MAX_SEARCH_DAYS):
+        raise HTTPException(status_code=400, detail=f"Search range is limited to {MAX_SEARCH_DAYS} days")
+    
+    mentors = mentor_availability_cache.get((category, expertise))
+    if mentors is None:
+        query = {"approved": True}
+        if category:
+            query["category"] = category
+        if expertise:
+            query["expertise"] = {"$in": [expertise]}
+        projection = {"_id": 0, "id": 1, "name": 1, "category": 1, "availability": 1,
+                      "session_30min_rate": 1, "session_1hr_rate": 1}
+        mentors = prepare_candidates(await db.mentors.find(query, projection).to_list(None))
+        mentor_availability_cache.set((category, expertise), mentors)
+    
+    results = await search_free_slots(mentors, start, end, session_type, per_mentor=per_mentor)
+    return results[:limit]
 
 @api_router.post("/mentors/book")
 async def book_mentor_session(booking: BookSession, user: dict = Depends(get_current_user)):
+    if booking.session_type not in SESSION_MINUTES:
+        raise HTTPException(status_code=400, detail="Invalid session type")
     mentor = await db.mentors.find_one({"id": booking.mentor_id, "approved": True})
     if not mentor:
         raise HTTPException(status_code=404, detail="Mentor not found")
     
+    minutes = SESSION_MINUTES[booking.session_type]
+    scheduled_at = to_utc_naive(booking.scheduled_at)
+    if scheduled_at < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Cannot book a session in the past")
+    if not within_windows(mentor.get("availability", []), scheduled_at, minutes):
+        raise HTTPException(status_code=400, detail="Mentor is not available at that time")
+    
     price = mentor["session_30min_rate"] if booking.session_type == "30min" else mentor["session_1hr_rate"]
     
     session = MentorSession(
@@ -691,35 +1057,41 @@ async def book_mentor_session(booking: BookSession, user: dict = Depends(get_cur
         mentor_name=mentor["name"],
         mentee_name=user["name"],
         session_type=booking.session_type,
-        scheduled_at=booking.scheduled_at,
+        scheduled_at=scheduled_at,
+        ends_at=scheduled_at + timedelta(minutes=minutes),
         price=price,
         notes=booking.notes
     )
     
-    await db.mentor_sessions.insert_one(session.dict())
+    # Claim the time first; the unique slot index rejects overlapping bookings
+    try:
+        await reserve(mentor["id"], session.id, scheduled_at, minutes)
+    except SlotConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await db.mentor_sessions.insert_one(session.dict())
+    except Exception:
+        await release(session.id)
+        raise
     
-    # Update user stats
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$inc": {"xp_points": 25, "mentor_sessions": 1}}
-    )
+    # Update user stats and award badges in one atomic update
+    updated, badges_earned = await apply_progress(user["id"], xp=MENTOR_SESSION_XP, inc={"mentor_sessions": 1})
+    notify_local_write("users", "update", user["id"], ["xp_points", "mentor_sessions", "badges"])
     
-    # Check for mentorship badge
-    updated_user = await db.users.find_one({"id": user["id"]})
-    if updated_user["mentor_sessions"] >= 3 and "Mentorship Pro" not in updated_user.get("badges", []):
-        await db.users.update_one(
-            {"id": user["id"]},
-            {"$push": {"badges": "Mentorship Pro"}}
-        )
+    for target, role in ((user["id"], "mentee"), (mentor["user_id"], "mentor")):
+        await push_hub.notify(target, SessionStatusChanged(
+            session_id=session.id, status=session.status, scheduled_at=session.scheduled_at, role=role
+        ))
+    await push_progress(user["id"], updated, MENTOR_SESSION_XP, badges_earned)
     
-    return session.dict()
+    return {**session.dict(), "badges_earned": badges_earned}
 
 @api_router.get("/mentors/sessions")
 async def get_my_sessions(user: dict = Depends(get_current_user)):
     sessions = await db.mentor_sessions.find(
         {"$or": [{"mentee_id": user["id"]}, {"mentor_id": user["id"]}]}
     ).sort("scheduled_at", -1).to_list(100)
-    return [{k: v for k, v in s.items() if k != "_id"} for s in sessions]
+    return [strip_id(s) for s in sessions]
 
 # ==================== OPPORTUNITY ROUTES ====================
 
@@ -733,17 +1105,14 @@ async def get_opportunities(
         query["type"] = type
     
     opportunities = await db.opportunities.find(query).sort("created_at", -1).to_list(50)
-    return [{k: v for k, v in o.items() if k != "_id"} for o in opportunities]
+    return [strip_id(o) for o in opportunities]
 
 @api_router.get("/opportunities/recommended")
 async def get_recommended_opportunities(user: dict = Depends(get_current_user)):
     # Get user interests and assessment data
     interests = user.get("interests", [])
     
-    assessment = await db.assessments.find_one(
-        {"user_id": user["id"], "completed": True},
-        sort=[("completed_at", -1)]
-    )
+    assessment = await get_latest_assessment(user["id"])
     
     tags = interests[:]
     if assessment and assessment.get("ai_report"):
@@ -756,14 +1125,31 @@ async def get_recommended_opportunities(user: dict = Depends(get_current_user)):
     else:
         opportunities = await db.opportunities.find().limit(20).to_list(20)
     
-    return [{k: v for k, v in o.items() if k != "_id"} for o in opportunities]
+    return [strip_id(o) for o in opportunities]
+
+# ==================== SEARCH ROUTES ====================
+
+@api_router.get("/search/suggest")
+async def search_suggest(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    kinds: Optional[str] = None,
+    user: dict = Depends(get_current_user)
+):
+    """Prefix autocomplete; kinds is a comma-separated subset of the suggestion kinds"""
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+    return {"query": q, "suggestions": suggest_service.index.suggest(q, limit, kind_list)}
 
 # ==================== GAMIFICATION ROUTES ====================
 
 @api_router.get("/leaderboard")
 async def get_leaderboard():
+    cached = leaderboard_cache.get("top")
+    if cached is not None:
+        return cached
+    
     users = await db.users.find().sort("xp_points", -1).limit(20).to_list(20)
-    return [
+    leaderboard = [
         {
             "rank": i + 1,
             "name": u["name"],
@@ -773,34 +1159,23 @@ async def get_leaderboard():
         }
         for i, u in enumerate(users)
     ]
+    leaderboard_cache.set("top", leaderboard)
+    return leaderboard
 
 @api_router.get("/badges")
 async def get_all_badges():
-    return [
-        {"id": "career_explorer", "name": "Career Explorer", "description": "Complete your first assessment", "icon": "compass"},
-        {"id": "top_learner", "name": "Top Learner", "description": "Complete 5 assessments", "icon": "star"},
-        {"id": "mentorship_pro", "name": "Mentorship Pro", "description": "Book 3 mentor sessions", "icon": "users"},
-        {"id": "skill_master", "name": "Skill Master", "description": "Score 90%+ on skill assessment", "icon": "award"},
-        {"id": "goal_getter", "name": "Goal Getter", "description": "Reach 500 XP points", "icon": "target"},
-        {"id": "community_star", "name": "Community Star", "description": "Refer 3 friends", "icon": "heart"}
-    ]
+    return badge_catalog()
 
 # ==================== PAYMENT ROUTES (MOCK) ====================
 
 @api_router.post("/payments/subscribe")
 async def subscribe_premium(plan: str = Query(...), user: dict = Depends(get_current_user)):
-    prices = {
-        "monthly": 299,
-        "quarterly": 799,
-        "annual": 1999
-    }
-    
-    if plan not in prices:
+    if plan not in PREMIUM_PLANS:
         raise HTTPException(status_code=400, detail="Invalid plan")
     
     payment = Payment(
         user_id=user["id"],
-        amount=prices[plan],
+        amount=PREMIUM_PLANS[plan],
         type="subscription",
         status="completed",  # Mock - auto complete
         description=f"Premium {plan} subscription"
@@ -811,7 +1186,7 @@ async def subscribe_premium(plan: str = Query(...), user: dict = Depends(get_cur
     # Upgrade user to premium
     await db.users.update_one(
         {"id": user["id"]},
-        {"$set": {"is_premium": True}}
+        {"$set": {"is_premium": True, "updated_at": datetime.utcnow()}}
     )
     
     return {"success": True, "payment_id": payment.id, "message": "Welcome to Nexosr Premium!"}
@@ -819,14 +1194,17 @@ async def subscribe_premium(plan: str = Query(...), user: dict = Depends(get_cur
 @api_router.get("/payments/history")
 async def get_payment_history(user: dict = Depends(get_current_user)):
     payments = await db.payments.find({"user_id": user["id"]}).sort("created_at", -1).to_list(50)
-    return [{k: v for k, v in p.items() if k != "_id"} for p in payments]
+    return [strip_id(p) for p in payments]
 
 # ==================== DASHBOARD ROUTES ====================
 
 @api_router.get("/dashboard")
 async def get_dashboard(user: dict = Depends(get_current_user)):
-    # Get assessments
-    assessments = await db.assessments.find({"user_id": user["id"], "completed": True}).to_list(100)
+    # Get the latest 100 assessments, oldest first so later ones win below
+    assessments = await db.assessments.find(
+        {"user_id": user["id"], "completed": True}
+    ).sort("completed_at", -1).to_list(100)
+    assessments.reverse()
     
     # Get sessions
     sessions = await db.mentor_sessions.find({"mentee_id": user["id"]}).to_list(100)
@@ -849,12 +1227,19 @@ async def get_dashboard(user: dict = Depends(get_current_user)):
             skill_gaps.extend(a["ai_report"].get("skill_gaps", []))
     skill_gaps = list(set(skill_gaps))[:5]
     
+    # Percentile of the latest result per test type
+    latest_by_type = {a["test_type"]: a for a in assessments}
+    percentiles = {
+        test_type: score_distributions.lookup(test_type, user.get("segment"), a.get("score"))
+        for test_type, a in latest_by_type.items()
+    }
+    
     # Calculate trial info
     trial_days_remaining = get_trial_days_remaining(user)
     has_premium = has_premium_access(user)
     
     return {
-        "user": {k: v for k, v in user.items() if k not in ["password_hash", "_id"]},
+        "user": public_user(user),
         "stats": {
             "tests_completed": total_tests,
             "average_score": round(avg_score, 1),
@@ -862,12 +1247,13 @@ async def get_dashboard(user: dict = Depends(get_current_user)):
             "xp_points": user.get("xp_points", 0),
             "badges_earned": len(user.get("badges", []))
         },
+        "percentiles": percentiles,
         "career_paths": career_paths,
         "skill_gaps": skill_gaps,
         "badges": user.get("badges", []),
-        "recent_assessments": [{k: v for k, v in a.items() if k != "_id"} for a in assessments[-3:]],
+        "recent_assessments": [strip_id(a) for a in assessments[-3:]],
         "upcoming_sessions": [
-            {k: v for k, v in s.items() if k != "_id"}
+            strip_id(s)
             for s in sessions
             if s.get("status") in ["pending", "confirmed"]
         ][:3],
@@ -879,6 +1265,16 @@ async def get_dashboard(user: dict = Depends(get_current_user)):
         }
     }
 
+# ==================== SYNC ROUTES ====================
+
+@api_router.get("/sync")
+async def sync(since: Optional[str] = None, user: dict = Depends(get_current_user)):
+    """Profile, assessments, chat, sessions and payments changed since a previous sync's version"""
+    try:
+        return await sync_changes(user["id"], since)
+    except InvalidVersion as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ==================== ADMIN ROUTES ====================
 
 @api_router.get("/admin/stats")
@@ -904,15 +1300,69 @@ async def get_admin_stats(user: dict = Depends(get_current_user)):
 @api_router.get("/admin/mentors/pending")
 async def get_pending_mentors(user: dict = Depends(get_current_user)):
     mentors = await db.mentors.find({"approved": False}).to_list(100)
-    return [{k: v for k, v in m.items() if k != "_id"} for m in mentors]
+    return [strip_id(m) for m in mentors]
 
 @api_router.post("/admin/mentors/{mentor_id}/approve")
 async def approve_mentor(mentor_id: str, user: dict = Depends(get_current_user)):
-    result = await db.mentors.update_one({"id": mentor_id}, {"$set": {"approved": True}})
+    result = await db.mentors.update_one(
+        {"id": mentor_id}, {"$set": {"approved": True, "updated_at": datetime.utcnow()}}
+    )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Mentor not found")
+    notify_local_write("mentors", "update", mentor_id)
     return {"success": True}
 
+@api_router.get("/admin/profiles", dependencies=[Depends(require_admin)])
+async def list_request_profiles():
+    return profile_store.list()
+
+@api_router.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def download_request_profile(profile_id: str, format: str = Query("text")):
+    record = profile_store.get(profile_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            content=profile_store.render_pstats(record),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+    return Response(content=profile_store.render_text(record), media_type="text/plain")
+
+@api_router.get("/admin/exports/{dataset}", dependencies=[Depends(require_admin)])
+async def export_dataset(
+    dataset: str,
+    format: str = Query("ndjson"),
+    fields: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream users, payments, assessments or sessions; fields is a comma-separated projection"""
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    try:
+        chunks = export_stream(dataset, format, fields.split(",") if fields else None, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    media_type, extension = FORMATS[format]
+    filename = f"{dataset}-{datetime.utcnow():%Y%m%d%H%M%S}.{extension}"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# ==================== BATCH ====================
+
+batch_dispatcher = BatchDispatcher(api_router, get_current_user)
+
+@api_router.post("/batch")
+async def run_batch(batch: BatchRequest, user: dict = Depends(get_current_user)):
+    """Run several GET sub-requests with one authentication and one round trip"""
+    if len(batch.requests) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} requests per batch")
+    return {"responses": await batch_dispatcher.run(batch.requests, user)}
+
 # ==================== SEED DATA ====================
 
 @api_router.post("/seed")
@@ -1055,6 +1505,9 @@ async def seed_data():
     for opp in sample_opportunities:
         await db.opportunities.insert_one(opp.dict())
     
+    notify_local_write("mentors", "flush")
+    notify_local_write("opportunities", "flush")
+    
     return {"success": True, "mentors_added": len(sample_mentors), "opportunities_added": len(sample_opportunities)}
 
 # ==================== HEALTH CHECK ====================
@@ -1067,17 +1520,67 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
-# Include router
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@api_router.get("/health/ready")
+async def readiness_check(request: Request):
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Not ready")
+    return {"status": "ready", "worker_pid": os.getpid()}
+
+# ==================== APP FACTORY ====================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process, after any pre-fork
+    app.state.ready = False
+    await wait_until_connected(STARTUP_TIMEOUT)
+    await asyncio.gather(warm_pool(WARM_POOL_CONNECTIONS), ensure_indexes(), score_distributions.refresh())
+    get_llm_client()
+    await suggest_service.start()
+    await invalidation_bus.start()
+    monitors = [
+        asyncio.create_task(monitor_event_loop_lag()),
+        asyncio.create_task(LoopWatchdog().heartbeat()),
+        asyncio.create_task(run_archiver()),
+        asyncio.create_task(score_distributions.run()),
+        asyncio.create_task(run_report_sweeper()),
+    ]
+    app.state.ready = True
+    logger.info(f"Worker {os.getpid()} ready")
+    try:
+        yield
+    finally:
+        # The server has already stopped accepting and waited for open requests
+        # (gunicorn graceful_timeout, uvicorn --timeout-graceful-shutdown);
+        # what is left is work scheduled past the response.
+        if background_tasks:
+            await asyncio.wait(list(background_tasks), timeout=DRAIN_TIMEOUT)
+        await invalidation_bus.stop()
+        await suggest_service.stop()
+        await push_hub.stop()
+        for task in monitors:
+            task.cancel()
+        close_client()
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="NEXOSR API", version="1.0.0", lifespan=lifespan)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=render_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    app.include_router(api_router)
+    app.mount("/socket.io", push_hub.asgi_app())
+
+    app.add_middleware(IdempotencyMiddleware, identify=user_id_from_token)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    return app
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+app = create_app()
@@ -0,0 +1,351 @@
+"""In-memory prefix autocomplete over the opportunity and mentor catalog.
+
+``SuggestIndex`` keeps a sorted array of distinct words and, per word, a
+posting list of entries ordered by popularity. A lookup bisects to the words
+starting with the typed prefix and lazily merges their posting lists, so it
+stops after ``limit`` hits instead of ranking every match. Earlier words of a
+multi-word query must appear in full, so "data sci" finds "Data Science
+Intern". Results are memoised per query until the next catalog change.
+
+Entries come from opportunities (title, company, tags), approved mentors
+(name, expertise) and the interest vocabulary. Vocabulary entries are
+reference counted across the documents that mention them, so a single
+document can be added or removed without rebuilding the rest.
+``SuggestService`` keeps the index current from invalidation events and
+rebuilds it from scratch periodically to pick up changed user interests.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from database import db
+from invalidation import InvalidationBus, InvalidationEvent
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_REBUILD_INTERVAL = float(os.environ.get("SUGGEST_REBUILD_INTERVAL", "600"))
+SUGGEST_CACHE_SIZE = 4096
+
+# Same list the registration screen offers
+INTEREST_VOCABULARY = ["Technology", "Business", "Creative", "Healthcare", "Finance",
+                       "Education", "Science", "Arts", "Sports", "Law"]
+
+OPPORTUNITY_FIELDS = {"_id": 0, "id": 1, "title": 1, "company": 1, "tags": 1}
+MENTOR_FIELDS = {"_id": 0, "id": 1, "name": 1, "expertise": 1, "total_sessions": 1, "rating": 1, "approved": 1}
+
+EntryKey = Tuple[str, str]  # (kind, document id or normalised term)
+Posting = Tuple[float, int, str, str, str]  # (-score, len(text), text, kind, key): best first
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_NON_WORD.sub(" ", text.casefold()).split())
+
+
+@dataclass
+class Suggestion:
+    kind: str  # opportunity, mentor, company, tag, expertise, interest
+    key: str
+    text: str
+    id: Optional[str] = None  # set for opportunity and mentor entries
+    score: float = 0.0
+    words: FrozenSet[str] = field(default=frozenset(), compare=False)
+
+    def __post_init__(self):
+        self.words = frozenset(normalize(self.text).split())
+
+    @property
+    def posting(self) -> Posting:
+        return (-self.score, len(self.text), self.text, self.kind, self.key)
+
+    def to_dict(self) -> dict:
+        result = {"kind": self.kind, "text": self.text, "score": self.score}
+        if self.id is not None:
+            result["id"] = self.id
+        return result
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._entries: Dict[EntryKey, Suggestion] = {}
+        self._words: List[str] = []  # sorted distinct words
+        self._postings: Dict[str, List[Posting]] = {}
+        self._refs: Counter = Counter()  # vocabulary entry -> number of mentions
+        self._sources: Dict[Tuple[str, str], List[EntryKey]] = {}  # (collection, doc id) -> entries
+        self._interest_counts: Dict[str, int] = {}  # normalised interest -> users holding it
+        self._cache: Dict[Tuple[str, int, Optional[Tuple[str, ...]]], List[dict]] = {}
+        self._bulk = False  # while rebuilding, postings are appended and sorted once at the end
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---- postings ----
+
+    def _post(self, suggestion: Suggestion) -> None:
+        posting = suggestion.posting
+        for word in suggestion.words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = []
+                if not self._bulk:
+                    bisect.insort(self._words, word)
+            if self._bulk:
+                postings.append(posting)
+            else:
+                bisect.insort(postings, posting)
+
+    def _unpost(self, suggestion: Suggestion) -> None:
+        posting = suggestion.posting
+        for word in suggestion.words:
+            postings = self._postings[word]
+            del postings[bisect.bisect_left(postings, posting)]
+            if not postings:
+                del self._postings[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+
+    def _rescore(self, key: EntryKey, score: float) -> None:
+        suggestion = self._entries[key]
+        if suggestion.score == score:
+            return
+        if self._bulk:
+            suggestion.score = score  # postings are built from final scores
+            return
+        self._unpost(suggestion)
+        suggestion.score = score
+        self._post(suggestion)
+
+    # ---- entries ----
+
+    def _insert(self, suggestion: Suggestion) -> None:
+        self._entries[(suggestion.kind, suggestion.key)] = suggestion
+        if not self._bulk:
+            self._post(suggestion)
+
+    def _delete(self, key: EntryKey) -> None:
+        suggestion = self._entries.pop(key, None)
+        if suggestion is not None:
+            self._unpost(suggestion)
+
+    def _vocabulary_score(self, key: EntryKey) -> float:
+        return self._refs[key] + self._interest_counts.get(key[1], 0)
+
+    def _mention(self, kind: str, text: str) -> Optional[EntryKey]:
+        term = normalize(text)
+        if not term:
+            return None
+        key = (kind, term)
+        self._refs[key] += 1
+        if key not in self._entries:
+            self._insert(Suggestion(kind, term, text.strip(), score=self._vocabulary_score(key)))
+        else:
+            self._rescore(key, self._vocabulary_score(key))
+        return key
+
+    def _unmention(self, key: EntryKey) -> None:
+        if key not in self._refs:
+            return
+        self._refs[key] -= 1
+        if self._refs[key] <= 0:
+            del self._refs[key]
+            self._delete(key)
+        else:
+            self._rescore(key, self._vocabulary_score(key))
+
+    # ---- documents ----
+
+    def add_document(self, collection: str, doc: dict) -> None:
+        """Index (or re-index) one opportunity or mentor document."""
+        self.remove_document(collection, doc["id"])
+        if collection == "opportunities":
+            tags = doc.get("tags") or []
+            score = sum(self._interest_counts.get(normalize(t), 0) for t in tags)
+            own = Suggestion("opportunity", doc["id"], doc["title"], doc["id"], score)
+            mentions = [("company", doc.get("company") or "")] + [("tag", t) for t in tags]
+        elif collection == "mentors":
+            if not doc.get("approved"):
+                return
+            # rating (at most 5) only breaks ties between equal session counts
+            score = doc.get("total_sessions", 0) + doc.get("rating", 0) / 10
+            own = Suggestion("mentor", doc["id"], doc["name"], doc["id"], score)
+            mentions = [("expertise", e) for e in doc.get("expertise") or []]
+        else:
+            raise ValueError(f"{collection} is not indexed for suggestions")
+        self._insert(own)
+        keys = [(own.kind, own.key)]
+        for kind, text in mentions:
+            key = self._mention(kind, text)
+            if key is not None:
+                keys.append(key)
+        self._sources[(collection, doc["id"])] = keys
+        self._cache.clear()
+
+    def remove_document(self, collection: str, doc_id: str) -> None:
+        keys = self._sources.pop((collection, doc_id), None)
+        if not keys:
+            return
+        self._delete(keys[0])
+        for key in keys[1:]:
+            self._unmention(key)
+        self._cache.clear()
+
+    def replace_collection(self, collection: str, docs: Iterable[dict]) -> None:
+        for source_collection, doc_id in [s for s in self._sources if s[0] == collection]:
+            self.remove_document(source_collection, doc_id)
+        for doc in docs:
+            self.add_document(collection, doc)
+
+    def rebuild(self, opportunities: Iterable[dict], mentors: Iterable[dict],
+                interest_counts: Dict[str, int]) -> None:
+        fresh = SuggestIndex()
+        fresh._bulk = True
+        fresh._interest_counts = {normalize(k): v for k, v in interest_counts.items()}
+        for interest in set(INTEREST_VOCABULARY) | set(interest_counts):
+            key = fresh._mention("interest", interest)
+            if key is not None:
+                fresh._sources.setdefault(("vocabulary", "interests"), []).append(key)
+        for doc in opportunities:
+            fresh.add_document("opportunities", doc)
+        for doc in mentors:
+            fresh.add_document("mentors", doc)
+        for suggestion in fresh._entries.values():
+            fresh._post(suggestion)
+        for postings in fresh._postings.values():
+            postings.sort()
+        fresh._words = sorted(fresh._postings)
+        fresh._bulk = False
+        # swap in one step so lookups never see a half-built index
+        self.__dict__.update(fresh.__dict__)
+
+    # ---- lookup ----
+
+    def suggest(self, prefix: str, limit: int = 8, kinds: Optional[Iterable[str]] = None) -> List[dict]:
+        query = normalize(prefix).split()
+        if not query:
+            return []
+        kind_filter = tuple(sorted(kinds)) if kinds else None
+        cache_key = (" ".join(query), limit, kind_filter)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        *required, last = query
+        words = self._words
+        lo = bisect.bisect_left(words, last)
+        hi = bisect.bisect_left(words, last + "\U0010ffff", lo)
+        result: List[dict] = []
+        seen = set()
+        for _, _, _, kind, key in heapq.merge(*(self._postings[w] for w in words[lo:hi])):
+            if (kind, key) in seen or (kind_filter is not None and kind not in kind_filter):
+                continue
+            seen.add((kind, key))
+            suggestion = self._entries[(kind, key)]
+            if required and not suggestion.words.issuperset(required):
+                continue
+            result.append(suggestion.to_dict())
+            if len(result) >= limit:
+                break
+
+        if len(self._cache) >= SUGGEST_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[cache_key] = result
+        return result
+
+# ==================== SERVICE ====================
+
+async def load_collection(collection: str) -> List[dict]:
+    if collection == "opportunities":
+        return await db.opportunities.find({}, OPPORTUNITY_FIELDS).to_list(None)
+    return await db.mentors.find({"approved": True}, MENTOR_FIELDS).to_list(None)
+
+
+async def load_interest_counts() -> Dict[str, int]:
+    pipeline = [
+        {"$unwind": "$interests"},
+        {"$group": {"_id": "$interests", "count": {"$sum": 1}}},
+    ]
+    return {row["_id"]: row["count"] async for row in db.users.aggregate(pipeline) if row["_id"]}
+
+
+class SuggestService:
+    """Keeps a ``SuggestIndex`` in step with catalog writes."""
+
+    collections = ("opportunities", "mentors")
+
+    def __init__(self, index: Optional[SuggestIndex] = None, rebuild_interval: float = SUGGEST_REBUILD_INTERVAL):
+        self.index = index or SuggestIndex()
+        self.rebuild_interval = rebuild_interval
+        self._pending: Dict[Tuple[str, Optional[str]], asyncio.Task] = {}
+        self._dirty: Dict[Tuple[str, Optional[str]], InvalidationEvent] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def attach(self, bus: InvalidationBus) -> None:
+        for collection in self.collections:
+            bus.subscribe(collection, self.on_invalidation)
+
+    def on_invalidation(self, event: InvalidationEvent) -> None:
+        # a flush reloads the collection; otherwise only the touched document
+        job = (event.collection, event.key)
+        if job in self._pending:
+            self._dirty[job] = event  # re-run once the in-flight load finishes
+            return
+        self._pending[job] = asyncio.get_running_loop().create_task(self._run_job(job, event))
+
+    async def _run_job(self, job: Tuple[str, Optional[str]], event: InvalidationEvent) -> None:
+        try:
+            while event is not None:
+                await self._apply(event)
+                event = self._dirty.pop(job, None)
+        finally:
+            self._pending.pop(job, None)
+
+    async def _apply(self, event: InvalidationEvent) -> None:
+        try:
+            if event.is_flush:
+                self.index.replace_collection(event.collection, await load_collection(event.collection))
+                return
+            if event.operation == "delete":
+                self.index.remove_document(event.collection, event.key)
+                return
+            fields = OPPORTUNITY_FIELDS if event.collection == "opportunities" else MENTOR_FIELDS
+            doc = await db[event.collection].find_one({"id": event.key}, fields)
+            if doc is None:
+                self.index.remove_document(event.collection, event.key)
+            else:
+                self.index.add_document(event.collection, doc)
+        except Exception as e:
+            logger.error(f"Suggest index update failed for {event}: {e}")
+
+    async def rebuild(self) -> None:
+        opportunities, mentors, interest_counts = await asyncio.gather(
+            load_collection("opportunities"), load_collection("mentors"), load_interest_counts()
+        )
+        self.index.rebuild(opportunities, mentors, interest_counts)
+        logger.info(f"Suggest index rebuilt with {len(self.index)} entries")
+
+    async def start(self) -> None:
+        await self.rebuild()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = list(self._pending.values()) + ([self._task] if self._task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Suggest index rebuild failed: {e}")
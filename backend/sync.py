@@ -0,0 +1,208 @@
+"""Delta sync of a user's data for the mobile client.
+
+``GET /api/sync`` covers the profile, completed assessments, chat messages,
+mentor sessions and payments. Without ``since`` it returns the same snapshot
+as the individual list endpoints. With the ``version`` from the previous
+response it returns only documents written after that version, plus the ids
+of deleted documents, so a refresh where nothing changed costs a few index
+lookups and a tiny response.
+
+Synced collections carry an ``updated_at`` that every write sets (chat
+messages are append-only and use their ``timestamp``). Deletions must go
+through ``delete_synced``, which leaves tombstones in ``sync_tombstones`` for
+``SYNC_TOMBSTONE_DAYS``; a client whose version is older than that gets a
+full snapshot with ``reset: true``.
+
+The version is an opaque token with one timestamp per collection. It lags the
+server clock by ``SYNC_OVERLAP_SECONDS``, so a write still in flight on
+another worker is picked up by the next sync instead of being skipped. A few
+documents may be sent twice; clients upsert by ``id``. A collection with more
+than ``SYNC_PAGE_SIZE`` changes is paged: ``has_more`` is set and the version
+points at the last document sent.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from badges import PRIVATE_USER_FIELDS
+from chat_store import BUCKETS_COLLECTION, bucket_messages, recent_messages
+from database import db
+
+TOMBSTONES_COLLECTION = "sync_tombstones"
+SYNC_OVERLAP_SECONDS = float(os.environ.get("SYNC_OVERLAP_SECONDS", "5"))
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", "500"))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+CHAT_SNAPSHOT_SIZE = 100  # same as /api/chat/history
+
+PROFILE_PROJECTION = {f: 0 for f in PRIVATE_USER_FIELDS}
+EPOCH = datetime(1970, 1, 1)  # versions are naive UTC, like every stored datetime
+
+
+class InvalidVersion(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class SyncedCollection:
+    collection: str
+    owner_fields: Tuple[str, ...]  # any of these equal to the user id makes the document theirs
+    snapshot_sort: str
+    snapshot_limit: int
+    query: Dict[str, Any] = field(default_factory=dict)  # e.g. only completed assessments
+
+    def owned_by(self, user_id: str) -> Dict[str, Any]:
+        if len(self.owner_fields) == 1:
+            return {self.owner_fields[0]: user_id, **self.query}
+        return {"$or": [{f: user_id} for f in self.owner_fields], **self.query}
+
+
+# Snapshots match the list endpoints: /assessments/history, /mentors/sessions, /payments/history
+SYNCED = {
+    "assessments": SyncedCollection("assessments", ("user_id",), "completed_at", 100, {"completed": True}),
+    "mentor_sessions": SyncedCollection("mentor_sessions", ("mentee_id", "mentor_id"), "scheduled_at", 100),
+    "payments": SyncedCollection("payments", ("user_id",), "created_at", 50),
+}
+SECTIONS = ("profile", *SYNCED, "chat_messages")
+
+# ==================== VERSIONS ====================
+
+def encode_version(version: Dict[str, datetime]) -> str:
+    millis = {name: (ts - EPOCH) // timedelta(milliseconds=1) for name, ts in version.items()}
+    return base64.urlsafe_b64encode(json.dumps(millis, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_version(token: str) -> Dict[str, datetime]:
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        version = {name: EPOCH + timedelta(milliseconds=int(raw[name])) for name in SECTIONS}
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError) as e:
+        raise InvalidVersion(f"Invalid sync version: {e}") from e
+    return version
+
+
+def next_version(since: datetime, horizon: datetime, docs: List[dict], field_name: str,
+                 more: bool) -> datetime:
+    """Version to resume from after sending ``docs`` (sorted by ``field_name``)."""
+    # a page never splits a timestamp (see _cut), so the next one starts right after it
+    return docs[-1][field_name] if more else max(since, horizon)
+
+
+def _cut(docs: List[dict], field_name: str) -> Tuple[List[dict], bool]:
+    """The first page of ``docs`` (sorted by ``field_name``) and whether more follow.
+
+    Documents sharing the timestamp at the page boundary all go to the next
+    page; if a whole page shares one timestamp, all of those that are in
+    ``docs`` are sent together.
+    """
+    if len(docs) <= SYNC_PAGE_SIZE:
+        return docs, False
+    boundary = docs[SYNC_PAGE_SIZE][field_name]
+    page = [d for d in docs[:SYNC_PAGE_SIZE] if d[field_name] < boundary]
+    return page or [d for d in docs if d[field_name] == boundary], True
+
+# ==================== WRITES ====================
+
+async def delete_synced(collection: str, query: Dict[str, Any]) -> int:
+    """Delete documents of a synced collection and leave tombstones for clients."""
+    spec = SYNCED[collection]
+    projection = {"_id": 0, "id": 1, **{f: 1 for f in spec.owner_fields}}
+    docs = await db[spec.collection].find(query, projection).to_list(None)
+    if not docs:
+        return 0
+    now = datetime.utcnow()
+    # tombstones first: a sync between the two writes reports a deletion early rather than never
+    await db[TOMBSTONES_COLLECTION].insert_many([{
+        "collection": collection,
+        "id": doc["id"],
+        "user_ids": sorted({doc[f] for f in spec.owner_fields if doc.get(f)}),
+        "deleted_at": now,
+        "expires_at": now + timedelta(days=SYNC_TOMBSTONE_DAYS),
+    } for doc in docs])
+    result = await db[spec.collection].delete_many({"id": {"$in": [doc["id"] for doc in docs]}})
+    return result.deleted_count
+
+# ==================== READS ====================
+
+async def _snapshot(user_id: str) -> Dict[str, Any]:
+    async def collection(spec: SyncedCollection) -> List[dict]:
+        return await db[spec.collection].find(spec.owned_by(user_id), {"_id": 0}).sort(
+            spec.snapshot_sort, -1).to_list(spec.snapshot_limit)
+
+    profile, chat, *lists = await asyncio.gather(
+        db.users.find_one({"id": user_id}, PROFILE_PROJECTION),
+        recent_messages(user_id, CHAT_SNAPSHOT_SIZE),
+        *(collection(spec) for spec in SYNCED.values()),
+    )
+    return {"profile": profile, **dict(zip(SYNCED, lists)), "chat_messages": chat}
+
+
+async def _changed(spec: SyncedCollection, user_id: str, since: datetime) -> Tuple[List[dict], bool]:
+    docs = await db[spec.collection].find(
+        {**spec.owned_by(user_id), "updated_at": {"$gt": since}}, {"_id": 0}
+    ).sort("updated_at", 1).limit(SYNC_PAGE_SIZE + 1).to_list(SYNC_PAGE_SIZE + 1)
+    page, more = _cut(docs, "updated_at")
+    if more and len(page) > SYNC_PAGE_SIZE:
+        # a whole page written in one millisecond: fetch every document of it
+        page = await db[spec.collection].find(
+            {**spec.owned_by(user_id), "updated_at": page[0]["updated_at"]}, {"_id": 0}
+        ).to_list(None)
+    return page, more
+
+
+async def _changed_chat(user_id: str, since: datetime) -> Tuple[List[dict], bool]:
+    # a bucket's end is its newest message, so older buckets are skipped by the index
+    messages: List[dict] = []
+    async for bucket in db[BUCKETS_COLLECTION].find({"user_id": user_id, "end": {"$gt": since}}):
+        messages.extend(m for m in bucket_messages(bucket) if m["timestamp"] > since)
+    messages.sort(key=lambda m: m["timestamp"])
+    return _cut(messages, "timestamp")
+
+
+async def _deleted(user_id: str, since: Dict[str, datetime]) -> Dict[str, List[str]]:
+    deleted: Dict[str, List[str]] = {name: [] for name in SYNCED}
+    oldest = min(since[name] for name in SYNCED)
+    async for tombstone in db[TOMBSTONES_COLLECTION].find({"user_ids": user_id, "deleted_at": {"$gt": oldest}}):
+        name = tombstone["collection"]
+        if name in deleted and tombstone["deleted_at"] > since[name]:
+            deleted[name].append(tombstone["id"])
+    return deleted
+
+
+async def sync_changes(user_id: str, since_token: Optional[str]) -> Dict[str, Any]:
+    """The sync response for ``user_id``; raises InvalidVersion for a bad token."""
+    now = datetime.utcnow()
+    horizon = now - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    since = decode_version(since_token) if since_token else None
+    if since is None or min(since.values()) < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        return {
+            "version": encode_version({name: horizon for name in SECTIONS}),
+            "reset": True,
+            "has_more": False,
+            **await _snapshot(user_id),
+            "deleted": {name: [] for name in SYNCED},
+        }
+
+    profile, chat, deleted, *changed = await asyncio.gather(
+        db.users.find_one({"id": user_id, "updated_at": {"$gt": since["profile"]}}, PROFILE_PROJECTION),
+        _changed_chat(user_id, since["chat_messages"]),
+        _deleted(user_id, since),
+        *(_changed(spec, user_id, since[name]) for name, spec in SYNCED.items()),
+    )
+    pages = {**dict(zip(SYNCED, changed)), "chat_messages": chat}
+    version = {"profile": max(since["profile"], horizon)}
+    for name, (docs, more) in pages.items():
+        field_name = "timestamp" if name == "chat_messages" else "updated_at"
+        version[name] = next_version(since[name], horizon, docs, field_name, more)
+    return {
+        "version": encode_version(version),
+        "reset": False,
+        "has_more": any(more for _, more in pages.values()),
+        "profile": profile,
+        **{name: docs for name, (docs, _) in pages.items()},
+        "deleted": deleted,
+    }
@@ -0,0 +1,14 @@
+"""Datetime helpers shared by the API modules.
+
+Stored datetimes are naive UTC, like ``datetime.utcnow()``; values coming in
+from clients may carry a timezone and are normalised here before they reach
+a query.
+"""
+from datetime import datetime, timezone
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Stored datetimes are naive UTC, like datetime.utcnow()"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,61 @@
+"""Shared test setup.
+
+Backend modules import each other by bare name (``from database import db``),
+as they do when the API runs from ``backend/``, so that directory goes on the
+path. Tests that need MongoDB take the ``mongo`` fixture: it uses ``MONGO_URL``
+with a throwaway database and skips the test when no server answers. Tests
+marked ``slow`` only run with ``--run-slow``.
+"""
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+MONGO_URL = os.environ.get("MONGO_URL")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")  # read at import; nothing connects until used
+os.environ["DB_NAME"] = f"nexosr_test_{uuid.uuid4().hex[:8]}"  # never a real database
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-slow", action="store_true", help="also run tests marked slow")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "slow: long-running test, skipped unless --run-slow is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-slow"):
+        return
+    skip = pytest.mark.skip(reason="slow; run with --run-slow")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def mongo():
+    """Name of an empty test database on ``MONGO_URL``; dropped afterwards."""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    from database import close_client
+
+    if not MONGO_URL:
+        pytest.skip("MONGO_URL not set")
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        pytest.skip(f"MongoDB not reachable: {e}")
+    try:
+        yield os.environ["DB_NAME"]
+    finally:
+        close_client()
+        client.drop_database(os.environ["DB_NAME"])
+        client.close()
@@ -0,0 +1,94 @@
+"""Mentor availability windows and the slot-lock backfill."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import availability
+from availability import LOCKS_COLLECTION, AvailabilityWindow, granules, within_windows
+from server import AvailabilityUpdate, mentor_availability_cache, search_mentor_slots, set_mentor_availability
+
+
+def test_window_times_are_zero_padded():
+    window = AvailabilityWindow(weekday=0, start="9:00", end="10:30")
+    assert (window.start, window.end) == ("09:00", "10:30")
+
+
+def test_single_digit_hour_window_is_accepted(monkeypatch):
+    class Mentors:
+        async def find_one_and_update(self, query, update, projection):
+            self.update = update
+            return {"id": "m1"}
+
+    class Db:
+        mentors = Mentors()
+
+    monkeypatch.setattr("server.db", Db())
+    update = AvailabilityUpdate(windows=[{"weekday": 2, "start": "9:00", "end": "10:00"}])
+    result = asyncio.run(set_mentor_availability(update, {"id": "u1"}))
+    assert result["availability"] == [{"weekday": 2, "start": "09:00", "end": "10:00"}]
+
+
+def test_window_must_end_after_start(monkeypatch):
+    update = AvailabilityUpdate(windows=[{"weekday": 2, "start": "10:00", "end": "9:00"}])
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(set_mentor_availability(update, {"id": "u1"}))
+    assert e.value.status_code == 400
+
+
+def test_mentors_without_windows_are_open_in_search_and_booking(monkeypatch):
+    class Cursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        async def to_list(self, length):
+            return self.docs
+
+    class Mentors:
+        def find(self, query, projection):
+            self.query = query
+            return Cursor([{"id": "m1", "name": "Ada", "category": "tech", "availability": [],
+                            "session_30min_rate": 499.0, "session_1hr_rate": 899.0}])
+
+    class Db:
+        mentors = Mentors()
+
+    async def no_bookings(mentor_ids, start, end):
+        return {mentor_id: set() for mentor_id in mentor_ids}
+
+    monkeypatch.setattr("server.db", Db())
+    monkeypatch.setattr(availability, "busy_granules", no_bookings)
+    mentor_availability_cache.clear()
+    start = (datetime.utcnow() + timedelta(days=3)).replace(hour=2, minute=0, second=0, microsecond=0)
+    results = asyncio.run(search_mentor_slots(start, start + timedelta(hours=2), "1hr", None, None,
+                                              per_mentor=5, limit=50, user={"id": "u1"}))
+    mentor_availability_cache.clear()
+    assert [r["mentor_id"] for r in results] == ["m1"]
+    assert results[0]["slots"][0] == start
+    assert all(within_windows([], slot, 60) for slot in results[0]["slots"])
+
+
+def test_backfill_locks_upcoming_sessions(mongo):
+    from database import get_db
+    from migrations.backfill_slot_locks import backfill
+
+    start = (datetime.utcnow() + timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+    sessions = [
+        {"id": str(uuid.uuid4()), "mentor_id": "m1", "session_type": "1hr", "scheduled_at": start, "status": "pending"},
+        {"id": str(uuid.uuid4()), "mentor_id": "m1", "session_type": "30min", "scheduled_at": start,
+         "status": "cancelled"},
+        {"id": str(uuid.uuid4()), "mentor_id": "m1", "session_type": "30min",
+         "scheduled_at": start - timedelta(days=7), "status": "completed"},
+    ]
+
+    async def run():
+        await get_db().mentor_sessions.insert_many([dict(s) for s in sessions])
+        await backfill(dry_run=False)
+        await backfill(dry_run=False)  # restartable
+        return await get_db()[LOCKS_COLLECTION].find({}, {"_id": 0}).to_list(None)
+
+    locks = asyncio.run(run())
+    assert sorted(lock["slot"] for lock in locks) == granules(start, 60)
+    assert {lock["session_id"] for lock in locks} == {sessions[0]["id"]}
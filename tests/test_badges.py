@@ -0,0 +1,83 @@
+"""XP and badge awards: scoring feeds the rules, awards are atomic and private."""
+import asyncio
+import uuid
+from collections import Counter
+
+from badges import BADGE_RULES, LAST_AWARDED_FIELD, apply_progress, build_progress_pipeline
+from server import SKILL_ASSESSMENT_QUESTIONS, public_user, score_assessment
+from sync import PROFILE_PROJECTION
+
+CONCURRENCY = 200
+
+
+def skill_master():
+    return next(rule for rule in BADGE_RULES if rule.id == "skill_master")
+
+
+def perfect_skill_answers():
+    return [{"question_id": q["id"], "selected": len(q["options"]) - 1} for q in SKILL_ASSESSMENT_QUESTIONS]
+
+
+def test_perfect_skill_assessment_scores_100():
+    assert score_assessment("skill_assessment", SKILL_ASSESSMENT_QUESTIONS, perfect_skill_answers()) == 100
+
+
+def test_skill_score_is_normalised_per_question():
+    questions = [{"id": 1, "options": ["a", "b"]}, {"id": 2, "options": ["a", "b", "c", "d", "e"]}]
+    answers = [{"question_id": 1, "selected": 1}, {"question_id": 2, "selected": 2}]
+    assert score_assessment("skill_assessment", questions, answers) == 75
+
+
+def test_skill_master_threshold_is_reachable():
+    threshold = skill_master().condition["$gte"][1]
+    assert score_assessment("skill_assessment", SKILL_ASSESSMENT_QUESTIONS, perfect_skill_answers()) >= threshold
+
+
+def test_awarded_badges_field_is_private():
+    pipeline = build_progress_pipeline(xp=50)
+    assert any(LAST_AWARDED_FIELD in stage["$set"] for stage in pipeline)
+    user = {"id": "u1", "password_hash": "x", "_id": 1, LAST_AWARDED_FIELD: ["Career Explorer"]}
+    assert public_user(user) == {"id": "u1"}
+    assert PROFILE_PROJECTION[LAST_AWARDED_FIELD] == 0
+
+
+def test_perfect_skill_assessment_earns_skill_master(mongo):
+    async def run():
+        from database import get_db
+        user_id = str(uuid.uuid4())
+        await get_db().users.insert_one({"id": user_id, "xp_points": 0, "badges": [], "tests_taken": 0})
+        score = score_assessment("skill_assessment", SKILL_ASSESSMENT_QUESTIONS, perfect_skill_answers())
+        return await apply_progress(user_id, xp=50, inc={"tests_taken": 1}, maximum={"best_skill_score": score})
+
+    user, earned = asyncio.run(run())
+    assert skill_master().name in earned
+    assert skill_master().name in user["badges"]
+    assert LAST_AWARDED_FIELD not in user
+
+
+def test_concurrent_updates_award_each_badge_once(mongo):
+    xp_for = {0: 50, 1: 25, 2: 30, 3: 5}
+
+    def call(i):
+        kind = i % 4
+        if kind == 0:
+            return apply_progress(user_id, xp=50, inc={"tests_taken": 1}, maximum={"best_skill_score": i % 100})
+        if kind == 1:
+            return apply_progress(user_id, xp=25, inc={"mentor_sessions": 1})
+        if kind == 2:
+            return apply_progress(user_id, xp=30, inc={"referrals": 1})
+        return apply_progress(user_id, xp=5)
+
+    async def run():
+        from database import get_db
+        await get_db().users.insert_one({"id": user_id, "xp_points": 0, "badges": [], "tests_taken": 0,
+                                         "mentor_sessions": 0, "referrals": 0})
+        results = await asyncio.gather(*(call(i) for i in range(CONCURRENCY)))
+        return results, await get_db().users.find_one({"id": user_id})
+
+    user_id = str(uuid.uuid4())
+    results, user = asyncio.run(run())
+    awarded = Counter(badge for _, earned in results for badge in earned)
+    assert user["xp_points"] == sum(xp_for[i % 4] for i in range(CONCURRENCY))
+    assert sorted(user["badges"]) == sorted(rule.name for rule in BADGE_RULES)
+    assert all(awarded[rule.name] == 1 for rule in BADGE_RULES), awarded
@@ -0,0 +1,132 @@
+"""``POST /api/batch``: what can be batched, per-item statuses and shared loads."""
+import asyncio
+
+import httpx
+import pytest
+
+import server
+from server import app, get_current_user
+
+USER = {"id": "u1", "name": "Asha", "segment": "college", "interests": ["coding"]}
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, n):
+        return self
+
+    async def to_list(self, length):
+        return [dict(d) for d in self.docs]
+
+
+class Collection:
+    def __init__(self, docs=(), fail=False):
+        self.docs = list(docs)
+        self.fail = fail
+        self.find_one_calls = 0
+
+    def find(self, *args, **kwargs):
+        if self.fail:
+            raise RuntimeError("database down")
+        return Cursor(self.docs)
+
+    async def find_one(self, *args, **kwargs):
+        self.find_one_calls += 1
+        await asyncio.sleep(0.01)  # concurrent sub-requests overlap here
+        return dict(self.docs[0]) if self.docs else None
+
+
+class Db:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, Collection())
+
+    __getitem__ = __getattr__
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = Db(
+        assessments=Collection([{"id": "a1", "user_id": "u1", "completed": False,
+                                 "ai_report": {"mentor_categories": ["tech"], "subject_recommendations": ["cs"]}}]),
+        mentors=Collection([{"id": "m1", "name": "Ada", "approved": True}]),
+        opportunities=Collection(fail=True),
+    )
+    monkeypatch.setattr(server, "db", database)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    server.mentor_list_cache.clear()
+    yield database
+    app.dependency_overrides.clear()
+    server.mentor_list_cache.clear()
+
+
+def batch(*requests):
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/batch", json={"requests": list(requests)})
+
+    response = asyncio.run(post())
+    assert response.status_code == 200, response.text
+    return {item["id"]: item for item in response.json()["responses"]}
+
+
+def test_admin_routes_cannot_be_batched(fake_db):
+    items = batch({"id": "profiles", "path": "/api/admin/profiles"},
+                  {"id": "export", "path": "/api/admin/exports/payments?format=csv"})
+    for item in items.values():
+        assert item["status"] == 400
+        assert "cannot be batched" in item["body"]["detail"]
+
+
+def test_only_get_is_batched(fake_db):
+    items = batch({"id": "book", "method": "POST", "path": "/api/mentors/book"},
+                  {"id": "put", "method": "PUT", "path": "/api/mentors/availability"})
+    assert {item["status"] for item in items.values()} == {405}
+
+
+def test_bad_query_parameter_is_422(fake_db):
+    items = batch({"id": "suggest", "path": "/api/search/suggest?q=py&limit=500"},
+                  {"id": "missing", "path": "/api/search/suggest"})
+    assert items["suggest"]["status"] == 422
+    assert items["suggest"]["body"]["detail"][0]["loc"] == ["query", "limit"]
+    assert items["missing"]["status"] == 422
+
+
+def test_each_item_gets_its_own_status(fake_db):
+    items = batch(
+        {"id": "ok", "path": "/api/mentors"},
+        {"id": "assessment", "path": "/api/assessments/a1"},
+        {"id": "no_route", "path": "/api/nothing-here"},
+        {"id": "broken", "path": "/api/opportunities"},
+    )
+    assert items["ok"]["status"] == 200
+    assert items["ok"]["body"] == [{"id": "m1", "name": "Ada", "approved": True}]
+    assert items["assessment"]["status"] == 200
+    assert items["assessment"]["body"]["id"] == "a1"
+    assert items["no_route"]["status"] == 404
+    assert items["broken"] == {"id": "broken", "status": 500, "body": {"detail": "Internal Server Error"}}
+
+
+def test_handler_http_errors_stay_in_their_item(fake_db):
+    fake_db.collections["assessments"] = Collection()
+    items = batch({"id": "missing", "path": "/api/assessments/nope"}, {"id": "ok", "path": "/api/mentors"})
+    assert items["missing"] == {"id": "missing", "status": 404, "body": {"detail": "Assessment not found"}}
+    assert items["ok"]["status"] == 200
+
+
+def test_latest_assessment_is_loaded_once_per_batch(fake_db):
+    fake_db.collections["opportunities"] = Collection([{"id": "o1", "tags": ["cs"]}])
+    items = batch({"id": "mentors", "path": "/api/mentors/recommended"},
+                  {"id": "opportunities", "path": "/api/opportunities/recommended"})
+    assert [item["status"] for item in items.values()] == [200, 200]
+    assert fake_db.collections["assessments"].find_one_calls == 1
+    batch({"id": "mentors", "path": "/api/mentors/recommended"})
+    assert fake_db.collections["assessments"].find_one_calls == 2  # not shared across batches
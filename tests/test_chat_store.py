@@ -0,0 +1,116 @@
+"""Chat buckets: rollover, a single open bucket per user, and reading the last turns."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import chat_store
+from chat_store import BUCKETS_COLLECTION, append_messages, recent_messages
+from migrations.bucket_chat_messages import build_bucket
+
+T0 = datetime(2026, 3, 1, 12, 0)
+
+
+def message(user_id: str, minute: int) -> dict:
+    return {"id": str(uuid.uuid4()), "user_id": user_id, "role": "user",
+            "content": f"m{minute}", "timestamp": T0 + timedelta(minutes=minute)}
+
+
+class Buckets:
+    """Just enough of a collection for ``recent_messages``: find, sort by end, $slice."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.read = 0
+
+    def find(self, query, projection):
+        self.limit = projection["messages"]["$slice"] if projection else None
+        return self
+
+    def sort(self, key, direction):
+        self.buckets.sort(key=lambda b: b[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def __aiter__(self):
+        for bucket in self.buckets:
+            self.read += 1
+            yield {**bucket, "messages": bucket["messages"][self.limit:] if self.limit else bucket["messages"]}
+
+
+def read_recent(monkeypatch, buckets, limit):
+    collection = Buckets(buckets)
+    monkeypatch.setattr(chat_store, "db", {BUCKETS_COLLECTION: collection})
+    return asyncio.run(recent_messages("u1", limit)), collection.read
+
+
+def test_recent_messages_merge_overlapping_buckets(monkeypatch):
+    # A migrated bucket that ends last but whose messages interleave with the live one.
+    migrated = build_bucket("u1", [message("u1", m) for m in (0, 2, 4, 9)])
+    live = build_bucket("u1", [message("u1", m) for m in (5, 6, 7, 8)])
+    recent, _ = read_recent(monkeypatch, [live, migrated], 3)
+    assert [m["content"] for m in recent] == ["m7", "m8", "m9"]
+
+
+def test_recent_messages_stop_at_older_buckets(monkeypatch):
+    buckets = [build_bucket("u1", [message("u1", m) for m in range(start, start + 4)]) for start in (0, 4, 8)]
+    recent, read = read_recent(monkeypatch, buckets, 3)
+    assert [m["content"] for m in recent] == ["m9", "m10", "m11"]
+    assert read == 2  # the newest bucket covers it; the next one ends earlier
+
+
+def test_migrated_buckets_are_closed():
+    bucket = build_bucket("u1", [message("u1", 0)])
+    assert "open" not in bucket and not bucket["archived"]
+
+
+def test_appends_roll_over_at_bucket_size(mongo, monkeypatch):
+    monkeypatch.setattr(chat_store, "CHAT_BUCKET_SIZE", 4)
+
+    async def run():
+        from database import ensure_indexes, get_db
+        await ensure_indexes()
+        for turn in range(5):
+            await append_messages("u1", [message("u1", 2 * turn), message("u1", 2 * turn + 1)])
+        buckets = await get_db()[BUCKETS_COLLECTION].find({"user_id": "u1"}).sort("start", 1).to_list(None)
+        return buckets, await recent_messages("u1", 5)
+
+    buckets, recent = asyncio.run(run())
+    assert [b["count"] for b in buckets] == [4, 4, 2]
+    assert [b.get("open", False) for b in buckets] == [False, False, True]
+    assert [m["content"] for m in recent] == ["m5", "m6", "m7", "m8", "m9"]
+
+
+def test_concurrent_turns_share_one_open_bucket(mongo, monkeypatch):
+    monkeypatch.setattr(chat_store, "CHAT_BUCKET_SIZE", 10)
+
+    async def run():
+        from database import ensure_indexes, get_db
+        await ensure_indexes()
+        await asyncio.gather(*(append_messages("u1", [message("u1", 2 * t), message("u1", 2 * t + 1)])
+                               for t in range(25)))
+        return await get_db()[BUCKETS_COLLECTION].find({"user_id": "u1"}).to_list(None)
+
+    buckets = asyncio.run(run())
+    assert sum(b["count"] for b in buckets) == 50
+    assert all(b["count"] <= 10 for b in buckets)
+    assert sum(1 for b in buckets if b.get("open")) == 1
+
+
+def test_recent_messages_after_migration(mongo):
+    async def run():
+        from database import ensure_indexes, get_db
+        from migrations.bucket_chat_messages import migrate_user
+        await ensure_indexes()
+        database = get_db()
+        await append_messages("u1", [message("u1", 10), message("u1", 11)])  # live before the migration ran
+        await database.chat_messages.insert_many([message("u1", m) for m in (0, 1, 2, 12)])
+        await migrate_user(database, "u1", dry_run=False)
+        await append_messages("u1", [message("u1", 13)])
+        buckets = await database[BUCKETS_COLLECTION].find({"user_id": "u1"}).to_list(None)
+        return buckets, await recent_messages("u1", 3)
+
+    buckets, recent = asyncio.run(run())
+    assert sum(1 for b in buckets if b.get("open")) == 1
+    assert [m["content"] for m in recent] == ["m11", "m12", "m13"]
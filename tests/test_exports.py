@@ -0,0 +1,143 @@
+"""Admin exports: correct output, streamed in bounded memory.
+
+The memory test compares the peak of a small and a 10x larger export. Peaks
+stop growing once a run spans a few batches and Parquet row groups, so 50k
+rows already shows whether anything accumulates; the million-row run is the
+request's real target and is marked slow:
+
+    python -m pytest tests/test_exports.py --run-slow
+"""
+import asyncio
+import csv
+import io
+import json
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterator, List
+
+import pytest
+
+import exports
+from timeutil import to_utc_naive
+
+START = datetime(2025, 1, 1)
+SMALL_ROWS = 5_000
+LARGE_ROWS = 50_000
+MILLION_ROWS = 1_000_000
+TOLERANCE = 1.5  # allowed peak growth from the small to the large run
+ROW_GROUP_ROWS = 2_000  # both runs span several Parquet row groups
+FORMATS = ["ndjson", "csv", pytest.param("parquet", marks=pytest.mark.skipif(
+    not exports.parquet_available(), reason="pyarrow not installed"))]
+
+
+def synthetic_payment(i: int) -> dict:
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "user_id": str(uuid.UUID(int=i // 3)),
+        "amount": 299.0 if i % 4 else 999.0,
+        "currency": "INR",
+        "type": "subscription" if i % 4 else "session",
+        "status": ("completed", "pending", "failed")[i % 3],
+        "description": f"Synthetic payment {i}",
+        "created_at": START + timedelta(seconds=i),
+    }
+
+
+async def synthetic_batches(rows: int, batch_size: int) -> AsyncIterator[List[dict]]:
+    for start in range(0, rows, batch_size):
+        yield [synthetic_payment(i) for i in range(start, min(start + batch_size, rows))]
+
+
+def encode(format: str, rows: int) -> bytes:
+    spec = exports.EXPORTS["payments"]
+    fields = exports.resolve_fields(spec, None)
+
+    async def collect():
+        batches = synthetic_batches(rows, exports.EXPORT_BATCH_SIZE)
+        return b"".join([chunk async for chunk in exports.ENCODERS[format](batches, spec, fields)])
+
+    return asyncio.run(collect())
+
+
+@contextmanager
+def arrow_pool(format: str) -> Iterator:
+    """A fresh Arrow pool for one run, so its peak excludes earlier allocations."""
+    if format != "parquet":
+        yield None
+        return
+    import pyarrow
+    default = pyarrow.default_memory_pool()
+    pool = pyarrow.proxy_memory_pool(default)
+    pyarrow.set_memory_pool(pool)
+    try:
+        yield pool
+    finally:
+        pyarrow.set_memory_pool(default)
+
+
+def peak_memory(format: str, rows: int) -> int:
+    """Peak Python heap plus peak Arrow buffers while encoding ``rows`` rows."""
+    spec = exports.EXPORTS["payments"]
+    fields = exports.resolve_fields(spec, None)
+
+    async def drain():
+        async for _ in exports.ENCODERS[format](synthetic_batches(rows, exports.EXPORT_BATCH_SIZE), spec, fields):
+            pass
+
+    with arrow_pool(format) as pool:
+        tracemalloc.start()
+        try:
+            asyncio.run(drain())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return peak + (pool.max_memory() if pool else 0)
+
+
+def test_to_utc_naive():
+    aware = datetime(2025, 1, 1, 5, 30, tzinfo=timezone(timedelta(hours=5, minutes=30)))
+    assert to_utc_naive(aware) == datetime(2025, 1, 1)
+    assert to_utc_naive(datetime(2025, 1, 1)) == datetime(2025, 1, 1)
+
+
+def test_ndjson_rows():
+    lines = encode("ndjson", 10).decode().splitlines()
+    assert len(lines) == 10
+    assert json.loads(lines[3])["id"] == synthetic_payment(3)["id"]
+
+
+def test_csv_rows():
+    rows = list(csv.reader(io.StringIO(encode("csv", 10).decode())))
+    fields = exports.resolve_fields(exports.EXPORTS["payments"], None)
+    assert rows[0] == fields
+    assert len(rows) == 11
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_export_memory_is_bounded(format, monkeypatch):
+    monkeypatch.setattr(exports, "PARQUET_ROW_GROUP_SIZE", ROW_GROUP_ROWS)
+    small = peak_memory(format, SMALL_ROWS)
+    large = peak_memory(format, LARGE_ROWS)
+    assert large <= small * TOLERANCE, f"{format}: peak {large} bytes vs {small} at {SMALL_ROWS} rows"
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("format", FORMATS)
+def test_export_memory_is_flat_at_a_million_rows(format):
+    small = peak_memory(format, LARGE_ROWS)
+    large = peak_memory(format, MILLION_ROWS)
+    assert large <= small * TOLERANCE, f"{format}: peak {large} bytes vs {small} at {LARGE_ROWS} rows"
+
+
+def test_export_stream_reads_from_mongo(mongo):
+    from database import get_db
+
+    async def run():
+        await get_db().payments.insert_many([synthetic_payment(i) for i in range(2500)])
+        stream = exports.export_stream("payments", "ndjson", until=START + timedelta(seconds=2000))
+        return b"".join([chunk async for chunk in stream])
+
+    lines = asyncio.run(run()).decode().splitlines()
+    assert len(lines) == 2000
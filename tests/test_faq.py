@@ -0,0 +1,40 @@
+"""FAQ answers follow the configured report enrichment."""
+import pytest
+
+import server
+from faq import FaqIndex
+
+USER = {"name": "Asha Rao", "segment": "student", "interests": ["Technology"]}
+
+
+def index_for(mode: str) -> FaqIndex:
+    return FaqIndex({**server.faq_index.facts, **server.REPORT_FACTS[mode]})
+
+
+@pytest.mark.parametrize("premium", [False, True])
+def test_no_enrichment_is_promised_when_disabled(premium):
+    index = index_for("none")
+    for intent in ("report", "premium"):
+        assert "AI-enriched" not in index.render(intent, USER, premium)
+
+
+@pytest.mark.parametrize("premium", [False, True])
+def test_everyone_is_told_about_enrichment_when_enabled_for_all(premium):
+    reply = index_for("all").render("report", USER, premium)
+    assert "AI-enriched version replaces it" in reply
+    assert "Premium users" not in reply
+
+
+def test_premium_enrichment_is_a_premium_perk():
+    index = index_for("premium")
+    assert "Premium users also get" in index.render("report", USER, False)
+    assert "As a premium user" in index.render("report", USER, True)
+    assert "AI-enriched reports" in index.render("premium", USER, False)
+
+
+def test_every_mode_fills_every_template():
+    for mode in server.REPORT_FACTS:
+        index = index_for(mode)
+        for name in index.intents:
+            for premium in (False, True):
+                assert "{" not in index.render(name, USER, premium)
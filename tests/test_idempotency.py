@@ -0,0 +1,185 @@
+"""Idempotency-Key middleware: replays, waiting duplicates, mismatches and handler errors.
+
+Every test runs against an in-memory key store and, when ``MONGO_URL``
+answers, against MongoDB.
+"""
+import asyncio
+import copy
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+import idempotency
+from idempotency import IDEMPOTENCY_COLLECTION, IdempotencyMiddleware
+
+
+class MemoryKeys:
+    """The handful of collection calls the middleware makes, keyed by ``_id``."""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail_updates = False
+
+    @staticmethod
+    def _matches(doc, query):
+        return doc is not None and all(doc.get(k) == v for k, v in query.items())
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return copy.deepcopy(doc) if self._matches(doc, query) else None
+
+    async def update_one(self, query, update):
+        if self.fail_updates:
+            raise PyMongoError("not primary")
+        doc = self.docs.get(query["_id"])
+        if self._matches(doc, query):
+            doc.update(copy.deepcopy(update["$set"]))
+
+    async def find_one_and_update(self, query, update, return_document):
+        await self.update_one(query, update)
+        return await self.find_one({"_id": query["_id"]})
+
+    async def delete_one(self, query):
+        if self._matches(self.docs.get(query["_id"]), query):
+            del self.docs[query["_id"]]
+
+    async def count(self):
+        return len(self.docs)
+
+
+class MongoKeys:
+    def __init__(self):
+        from database import get_db
+        self.collection = get_db()[IDEMPOTENCY_COLLECTION]
+
+    async def count(self):
+        return await self.collection.count_documents({})
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def keys(request, monkeypatch):
+    if request.param == "mongo":
+        request.getfixturevalue("mongo")
+        return MongoKeys
+    store = MemoryKeys()
+    monkeypatch.setattr(idempotency, "db", {IDEMPOTENCY_COLLECTION: store})
+    return lambda: store
+
+
+def create_app(calls: list, gate: asyncio.Event = None) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/orders")
+    async def place_order(order: dict):
+        calls.append(order)
+        if gate is not None:
+            await gate.wait()
+        return {"order": len(calls), **order}
+
+    @app.post("/fail")
+    async def fail():
+        calls.append("fail")
+        raise DuplicateKeyError("E11000 duplicate key error collection: mentor_sessions")
+
+    app.add_middleware(IdempotencyMiddleware, identify=lambda token: token)
+    return app
+
+
+def client(app: FastAPI) -> httpx.AsyncClient:
+    # a handler exception reaches ServerErrorMiddleware, which answers 500 and re-raises
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://test",
+                             headers={"Authorization": "Bearer u1"})
+
+
+def test_completed_key_is_replayed(keys):
+    calls = []
+
+    async def run():
+        async with client(create_app(calls)) as c:
+            first = await c.post("/orders", json={"item": "book"}, headers={"Idempotency-Key": "k1"})
+            second = await c.post("/orders", json={"item": "book"}, headers={"Idempotency-Key": "k1"})
+            other = await c.post("/orders", json={"item": "book"}, headers={"Idempotency-Key": "k2"})
+            return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert len(calls) == 2
+    assert second.status_code == first.status_code == 200
+    assert second.json() == first.json() == {"order": 1, "item": "book"}
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert other.json()["order"] == 2
+
+
+def test_duplicate_waits_for_the_running_request(keys):
+    calls = []
+
+    async def run():
+        gate = asyncio.Event()
+        async with client(create_app(calls, gate)) as c:
+            first = asyncio.create_task(c.post("/orders", json={"item": "pen"}, headers={"Idempotency-Key": "k1"}))
+            while not calls:
+                await asyncio.sleep(0.01)
+            second = asyncio.create_task(c.post("/orders", json={"item": "pen"}, headers={"Idempotency-Key": "k1"}))
+            await asyncio.sleep(0.3)
+            waiting = not second.done()
+            gate.set()
+            return waiting, await first, await second
+
+    waiting, first, second = asyncio.run(run())
+    assert waiting
+    assert len(calls) == 1
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+
+
+def test_key_reused_for_a_different_request_is_422(keys):
+    calls = []
+
+    async def run():
+        async with client(create_app(calls)) as c:
+            await c.post("/orders", json={"item": "book"}, headers={"Idempotency-Key": "k1"})
+            return await c.post("/orders", json={"item": "lamp"}, headers={"Idempotency-Key": "k1"})
+
+    response = asyncio.run(run())
+    assert response.status_code == 422
+    assert len(calls) == 1
+
+
+def test_handler_error_is_a_500_and_releases_the_key(keys):
+    calls = []
+
+    async def run():
+        async with client(create_app(calls)) as c:
+            first = await c.post("/fail", headers={"Idempotency-Key": "k1"})
+            remaining = await keys().count()
+            retry = await c.post("/fail", headers={"Idempotency-Key": "k1"})
+            return first, remaining, retry
+
+    first, remaining, retry = asyncio.run(run())
+    assert first.status_code == 500
+    assert remaining == 0
+    assert retry.status_code == 500
+    assert calls == ["fail", "fail"]  # the retry ran the handler again
+
+
+def test_response_is_sent_when_it_cannot_be_stored(monkeypatch):
+    store = MemoryKeys()
+    store.fail_updates = True
+    monkeypatch.setattr(idempotency, "db", {IDEMPOTENCY_COLLECTION: store})
+    calls = []
+
+    async def run():
+        async with client(create_app(calls)) as c:
+            return await c.post("/orders", json={"item": "book"}, headers={"Idempotency-Key": "k1"})
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert store.docs == {}  # released, so a retry runs again
@@ -0,0 +1,181 @@
+"""Cache invalidation: local caches, change events, the polling fallback and resume tokens.
+
+The change-stream test needs a replica set (a single node is enough):
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 &
+    mongosh --eval 'rs.initiate()'
+    MONGO_URL='mongodb://localhost:27017/?directConnection=true' python -m pytest tests/test_invalidation.py
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from pymongo.errors import PyMongoError
+
+from invalidation import TOKENS_COLLECTION, InvalidationBus, InvalidationEvent, LocalCache
+
+
+def test_cache_drops_the_invalidated_key():
+    cache = LocalCache("mentors")
+    cache.set("m1", {"name": "Ada"})
+    cache.set("m2", {"name": "Grace"})
+    cache.on_invalidation(InvalidationEvent("mentors", "update", "m1"))
+    assert cache.get("m1") is None
+    assert cache.get("m2") == {"name": "Grace"}
+
+
+def test_cache_clears_on_collection_flush():
+    cache = LocalCache("mentors")
+    cache.set("m1", 1)
+    cache.set("m2", 2)
+    cache.on_invalidation(InvalidationEvent("mentors", "flush"))
+    assert len(cache) == 0
+
+
+def test_cache_ignores_irrelevant_events():
+    cache = LocalCache("leaderboard", key_for=lambda event: None,
+                       relevant=lambda event: "xp_points" in event.updated_fields)
+    cache.set("top", [1, 2, 3])
+    cache.on_invalidation(InvalidationEvent("users", "update", "u1", frozenset({"last_login"})))
+    assert cache.get("top") == [1, 2, 3]
+    cache.on_invalidation(InvalidationEvent("users", "update", "u1", frozenset({"xp_points"})))
+    assert cache.get("top") is None
+
+
+def test_insert_event_carries_the_document_id():
+    change = {"operationType": "insert", "fullDocument": {"_id": 1, "id": "m1", "name": "Ada"}}
+    assert InvalidationBus.to_event("mentors", change) == InvalidationEvent("mentors", "insert", "m1")
+
+
+def test_update_event_lists_top_level_fields():
+    change = {
+        "operationType": "update",
+        "fullDocument": {"id": "u1"},
+        "updateDescription": {"updatedFields": {"xp_points": 10, "profile.city": "Pune"},
+                              "removedFields": ["last_badges_awarded"]},
+    }
+    event = InvalidationBus.to_event("users", change)
+    assert (event.operation, event.key) == ("update", "u1")
+    assert event.updated_fields == {"xp_points", "profile", "last_badges_awarded"}
+
+
+def test_delete_event_without_pre_image_flushes():
+    change = {"operationType": "delete", "documentKey": {"_id": 1}}
+    event = InvalidationBus.to_event("mentors", change)
+    assert event.operation == "delete"
+    assert event.is_flush
+
+
+def test_drop_event_flushes():
+    assert InvalidationBus.to_event("mentors", {"operationType": "drop"}).operation == "flush"
+
+
+class MarkersExhausted(Exception):
+    pass
+
+
+def poll_flushes(monkeypatch, markers) -> int:
+    """Run the polling loop over ``markers`` (exceptions are raised) and count flushes."""
+    bus = InvalidationBus(["mentors"], database=object(), poll_interval=0)
+    flushes = []
+    bus.subscribe("mentors", flushes.append)
+    remaining = list(markers)
+
+    async def marker(collection):
+        if not remaining:
+            raise MarkersExhausted
+        current = remaining.pop(0)
+        if isinstance(current, Exception):
+            raise current
+        return current
+
+    monkeypatch.setattr(bus, "_marker", marker)
+    with pytest.raises(MarkersExhausted):
+        asyncio.run(bus._poll("mentors"))
+    assert bus.mode["mentors"] == "polling"
+    assert all(event.is_flush for event in flushes)
+    return len(flushes)
+
+
+def test_polling_flushes_only_when_the_marker_moves(monkeypatch):
+    markers = [(3, 100.0), (3, 100.0), (3, 105.0), (3, 105.0), (2, 105.0), (2, 105.0)]
+    assert poll_flushes(monkeypatch, markers) == 3
+
+
+def test_polling_flushes_when_the_marker_cannot_be_read(monkeypatch):
+    markers = [(3, 100.0), PyMongoError("not primary"), (3, 100.0), (3, 100.0)]
+    assert poll_flushes(monkeypatch, markers) == 3
+
+
+# ==================== CHANGE STREAMS ====================
+
+WRITER = """
+import os, sys
+from pymongo import MongoClient
+client = MongoClient(os.environ["MONGO_URL"])
+client[os.environ["DB_NAME"]].mentors.update_one(
+    {"id": sys.argv[1]}, {"$set": {"name": sys.argv[2]}}, upsert=True)
+"""
+
+
+def write_from_other_process(mentor_id: str, name: str) -> None:
+    subprocess.run([sys.executable, "-c", WRITER, mentor_id, name], env=os.environ, check=True, timeout=30)
+
+
+async def wait_for(predicate, timeout: float = 10.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def test_change_stream_invalidates_and_resumes(mongo):
+    from pymongo import MongoClient
+
+    with MongoClient(os.environ["MONGO_URL"]) as client:
+        if not client.admin.command("hello").get("setName"):
+            pytest.skip("change streams need a replica set")
+
+    async def run():
+        from database import get_db
+        database = get_db()
+        tokens = database[TOKENS_COLLECTION]
+
+        async def token_saved():
+            return await tokens.find_one({"_id": "worker-b:mentors"}) is not None
+
+        first = InvalidationBus(["mentors"], consumer="worker-b", database=database, token_flush_interval=0)
+        first_events = []
+        first.subscribe("mentors", first_events.append)
+        await first.start()
+        await wait_for(token_saved)  # the stream is open once its first token is stored
+        await asyncio.to_thread(write_from_other_process, "m1", "Ada")
+
+        async def got_m1():
+            return any(event.key == "m1" for event in first_events)
+
+        await wait_for(got_m1)
+        await first.stop()
+
+        await asyncio.to_thread(write_from_other_process, "m2", "Grace")  # while no bus runs
+        second = InvalidationBus(["mentors"], consumer="worker-b", database=database, token_flush_interval=0)
+        second_events = []
+        second.subscribe("mentors", second_events.append)
+        await second.start()
+
+        async def got_m2():
+            return any(event.key == "m2" for event in second_events)
+
+        try:
+            await wait_for(got_m2)
+        finally:
+            await second.stop()
+        return first_events, second_events
+
+    first_events, second_events = asyncio.run(run())
+    assert first_events[0].is_flush  # no token yet: cached data may be stale
+    assert [(e.operation, e.key) for e in first_events if not e.is_flush] == [("insert", "m1")]
+    assert not any(event.is_flush for event in second_events)  # resumed, nothing to flush
+    assert "m2" in [event.key for event in second_events]  # written while no bus was running
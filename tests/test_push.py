@@ -0,0 +1,298 @@
+"""Push channel: authentication, per-user delivery, slow consumers and idle memory.
+
+The first tests serve a ``PushHub`` with in-process delivery
+(``BoundedQueueManager``) under uvicorn on the test's event loop and talk to
+it with a minimal wsproto Socket.IO client. The idle-connection test starts
+the same app in a separate process so its memory can be measured; it holds
+``PUSH_IDLE_CONNECTIONS`` sockets (default 1000, the request's target is
+10000 per worker):
+
+    PUSH_IDLE_CONNECTIONS=10000 python -m pytest tests/test_push.py -k idle
+"""
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import jwt
+import pytest
+import uvicorn
+from wsproto import ConnectionType, WSConnection
+from wsproto.events import AcceptConnection, CloseConnection, Ping, Request, TextMessage
+
+import push
+from push import (
+    BoundedQueueManager, LeaderboardRankChanged, PushHub, ReportReady, SessionStatusChanged,
+)
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+JWT_SECRET = "push-test-secret-at-least-32-bytes"
+SOCKET_PATH = "/socket.io/?EIO=4&transport=websocket"
+IDLE_CONNECTIONS = int(os.environ.get("PUSH_IDLE_CONNECTIONS", "1000"))
+IDLE_HOLD_SECONDS = float(os.environ.get("PUSH_IDLE_HOLD", "5"))
+MAX_KB_PER_CONNECTION = 64.0
+
+
+def authenticate(token: str) -> Optional[str]:
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=["HS256"]).get("user_id")
+    except jwt.InvalidTokenError:
+        return None
+
+
+def token_for(user_id: str) -> str:
+    return jwt.encode({"user_id": user_id}, JWT_SECRET, algorithm="HS256")
+
+
+def create_standalone_app():
+    """The push channel alone, with in-process delivery (uvicorn --factory)."""
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    app.mount("/socket.io", PushHub(authenticate, client_manager=BoundedQueueManager()).asgi_app())
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Client:
+    """A Socket.IO client that connects, authenticates, answers pings and keeps events."""
+
+    def __init__(self, port: int, token: str):
+        self.port = port
+        self.token = token
+        self.connected = asyncio.Event()
+        self.finished = asyncio.Event()  # connected, refused or closed
+        self.refused = False
+        self.closed = False
+        self.events: List[tuple] = []
+        self.received = asyncio.Event()
+
+    async def run(self) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        ws = WSConnection(ConnectionType.CLIENT)
+        writer.write(ws.send(Request(host=f"127.0.0.1:{self.port}", target=SOCKET_PATH)))
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                ws.receive_data(data)
+                for event in ws.events():
+                    if isinstance(event, AcceptConnection):
+                        continue
+                    if isinstance(event, Ping):
+                        writer.write(ws.send(event.response()))
+                    elif isinstance(event, CloseConnection):
+                        return
+                    elif isinstance(event, TextMessage):
+                        self._on_packet(event.data, ws, writer)
+        finally:
+            self.closed = True
+            self.finished.set()
+            writer.close()
+
+    def _on_packet(self, packet: str, ws: WSConnection, writer: asyncio.StreamWriter) -> None:
+        if packet.startswith("0"):  # engine.io open -> socket.io connect with auth
+            writer.write(ws.send(TextMessage(data="40" + json.dumps({"token": self.token}))))
+        elif packet == "2":  # engine.io ping
+            writer.write(ws.send(TextMessage(data="3")))
+        elif packet.startswith("40"):
+            self.connected.set()
+            self.finished.set()
+        elif packet.startswith("44"):
+            self.refused = True
+            self.finished.set()
+        elif packet.startswith("42"):
+            self.events.append(tuple(json.loads(packet[2:])))
+            self.received.set()
+
+
+@asynccontextmanager
+async def serving(hub: PushHub):
+    port = free_port()
+    config = uvicorn.Config(hub.asgi_app(), host="127.0.0.1", port=port, ws="wsproto",
+                            log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    clients: List[asyncio.Task] = []
+
+    async def connect(token: str) -> Client:
+        client = Client(port, token)
+        clients.append(asyncio.create_task(client.run()))
+        await asyncio.wait_for(client.finished.wait(), timeout=10)
+        return client
+
+    try:
+        yield connect
+    finally:
+        for client in clients:
+            client.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        await hub.sio.shutdown()
+        server.should_exit = True
+        await task
+
+
+def run_with_hub(scenario):
+    async def main():
+        hub = PushHub(authenticate, client_manager=BoundedQueueManager())
+        async with serving(hub) as connect:
+            return await scenario(hub, connect)
+
+    return asyncio.run(main())
+
+
+async def next_event(client: Client, timeout: float = 5.0) -> tuple:
+    await asyncio.wait_for(client.received.wait(), timeout)
+    client.received.clear()
+    return client.events[-1]
+
+
+def test_unauthenticated_connections_are_refused():
+    async def scenario(hub, connect):
+        return await connect("not-a-jwt"), await connect(token_for("u1"))
+
+    refused, accepted = run_with_hub(scenario)
+    assert refused.refused and not refused.connected.is_set()
+    assert accepted.connected.is_set()
+
+
+def test_events_reach_only_their_user():
+    async def scenario(hub, connect):
+        alice, bob = await connect(token_for("alice")), await connect(token_for("bob"))
+        await hub.notify("alice", ReportReady(assessment_id="a1", test_type="aptitude", score=80.0))
+        event = await next_event(alice)
+        await asyncio.sleep(0.2)
+        return event, bob.events
+
+    (name, data), bob_events = run_with_hub(scenario)
+    assert name == "report_ready"
+    assert data == {"assessment_id": "a1", "test_type": "aptitude", "score": 80.0, "provisional": False}
+    assert bob_events == []
+
+
+def test_backed_up_sockets_skip_droppable_events(monkeypatch):
+    monkeypatch.setattr(BoundedQueueManager, "queue_depth", lambda self, eio_sid: push.PUSH_DROP_QUEUE)
+
+    async def scenario(hub, connect):
+        client = await connect(token_for("u1"))
+        await hub.notify("u1", LeaderboardRankChanged(rank=3, previous_rank=4, xp_points=120))
+        await hub.notify("u1", SessionStatusChanged(session_id="s1", status="confirmed",
+                                                    scheduled_at=datetime(2026, 1, 1), role="mentee"))
+        await next_event(client)
+        return client.events
+
+    events = run_with_hub(scenario)
+    assert [name for name, _ in events] == ["session_status_changed"]
+
+
+def test_stuck_sockets_are_disconnected(monkeypatch):
+    monkeypatch.setattr(BoundedQueueManager, "queue_depth", lambda self, eio_sid: push.PUSH_MAX_QUEUE)
+
+    async def scenario(hub, connect):
+        client = await connect(token_for("u1"))
+        await hub.notify("u1", ReportReady(assessment_id="a1", test_type="aptitude", score=80.0))
+        for _ in range(100):
+            if client.closed:
+                break
+            await asyncio.sleep(0.05)
+        return client
+
+    client = run_with_hub(scenario)
+    assert client.closed
+    assert client.events == []
+
+# ==================== IDLE CONNECTIONS ====================
+
+def rss_kb(pid: int) -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+    return 0
+
+
+async def open_clients(port: int, count: int, clients: List[Client], tasks: List[asyncio.Task]) -> None:
+    for start in range(0, count, 500):
+        batch = []
+        for i in range(len(clients), len(clients) + min(500, count - start)):
+            client = Client(port, token_for(f"idle-{i}"))
+            clients.append(client)
+            tasks.append(asyncio.create_task(client.run()))
+            batch.append(client)
+        await asyncio.wait_for(asyncio.gather(*(c.connected.wait() for c in batch)), timeout=60)
+
+
+async def hold_idle(pid: int, port: int) -> dict:
+    clients: List[Client] = []
+    tasks: List[asyncio.Task] = []
+    try:
+        small = max(1, IDLE_CONNECTIONS // 10)
+        await open_clients(port, small, clients, tasks)
+        await asyncio.sleep(1.0)
+        at_small = rss_kb(pid)
+        await open_clients(port, IDLE_CONNECTIONS - small, clients, tasks)
+        await asyncio.sleep(1.0)
+        at_full = rss_kb(pid)
+        await asyncio.sleep(IDLE_HOLD_SECONDS)
+        return {
+            "per_connection_kb": (at_full - at_small) / max(1, IDLE_CONNECTIONS - small),
+            "growth_kb": rss_kb(pid) - at_full,
+            "dropped": sum(c.closed for c in clients),
+        }
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_idle_connections_hold_bounded_memory():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard < IDLE_CONNECTIONS * 2 + 256:
+        pytest.skip(f"file descriptor limit {hard} is too low for {IDLE_CONNECTIONS} connections")
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))  # the server inherits it
+
+    port = free_port()
+    env = dict(os.environ, PUSH_PING_INTERVAL="1",
+               PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT_DIR / "backend"), os.environ.get("PYTHONPATH")])))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "tests.test_push:create_standalone_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--ws", "wsproto", "--log-level", "warning",
+         "--backlog", "4096"],
+        cwd=ROOT_DIR, env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            with socket.socket() as sock:
+                if sock.connect_ex(("127.0.0.1", port)) == 0:
+                    break
+            assert time.monotonic() < deadline, "push server did not start"
+            time.sleep(0.2)
+        result = asyncio.run(hold_idle(server.pid, port))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()  # graceful shutdown closes every socket one by one
+            server.wait()
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+    assert result["dropped"] == 0
+    assert result["per_connection_kb"] <= MAX_KB_PER_CONNECTION, result
+    assert result["growth_kb"] <= result["per_connection_kb"] * IDLE_CONNECTIONS * 0.1 + 4096, result
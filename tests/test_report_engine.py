@@ -0,0 +1,138 @@
+"""Golden and schema tests for the local report engine.
+
+Reports for fixed profiles of every test type are compared with
+``golden/reports.json``, so any change to the knowledge table or the
+templates shows up as a diff. After an intended change, accept the new
+output with:
+
+    UPDATE_GOLDEN=1 python -m pytest tests/test_report_engine.py
+"""
+import json
+import os
+import random
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from report_engine import DIMENSIONS as KNOWN_DIMENSIONS, STRONG_SCORE, build_report, profile
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "golden" / "reports.json"
+
+DIMENSIONS = {
+    "aptitude": ["numerical", "logical", "verbal", "spatial"],
+    "personality": ["openness", "conscientiousness", "extroversion", "agreeableness", "neuroticism"],
+    "career_interest": ["stem", "social", "creative", "business", "technical", "outdoor", "analytical"],
+    "skill_assessment": ["office_tools", "programming", "communication", "management", "teamwork",
+                         "problem_solving", "creativity", "leadership", "analytical", "writing", "networking",
+                         "adaptability", "critical_thinking", "digital", "emotional_intelligence"],
+}
+
+USERS = {
+    "student": {"name": "Asha Rao", "segment": "student", "interests": ["Technology", "Science"]},
+    "graduate": {"name": "Rahul Mehta", "segment": "graduate", "interests": ["Business"]},
+    "professional": {"name": "Meera Iyer", "segment": "professional", "interests": []},
+}
+
+CASES: Dict[str, dict] = {
+    "aptitude_quantitative": {"test_type": "aptitude", "score": 73.3, "user": "student",
+                              "subscores": {"numerical": 100.0, "logical": 80.0, "verbal": 50.0, "spatial": 50.0}},
+    "aptitude_verbal": {"test_type": "aptitude", "score": 46.7, "user": "graduate",
+                        "subscores": {"numerical": 25.0, "logical": 40.0, "verbal": 100.0, "spatial": 0.0}},
+    "personality_social": {"test_type": "personality", "score": 68.0, "user": "graduate",
+                           "subscores": {"openness": 58.3, "conscientiousness": 50.0, "extroversion": 91.7,
+                                         "agreeableness": 83.3, "neuroticism": 25.0}},
+    "personality_reserved": {"test_type": "personality", "score": 52.0, "user": "professional",
+                             "subscores": {"openness": 91.7, "conscientiousness": 83.3, "extroversion": 16.7,
+                                           "agreeableness": 41.7, "neuroticism": 66.7}},
+    "career_interest_creative": {"test_type": "career_interest", "score": 60.0, "user": "student",
+                                 "subscores": {"stem": 25.0, "social": 50.0, "creative": 91.7, "business": 33.3,
+                                               "technical": 62.5, "outdoor": 0.0, "analytical": 37.5}},
+    "career_interest_helping": {"test_type": "career_interest", "score": 55.0, "user": "professional",
+                                "subscores": {"stem": 62.5, "social": 100.0, "creative": 25.0, "business": 41.7,
+                                              "technical": 12.5, "outdoor": 75.0, "analytical": 50.0}},
+    "skill_assessment_builder": {"test_type": "skill_assessment", "score": 64.4, "user": "graduate",
+                                 "subscores": {"office_tools": 66.7, "programming": 100.0, "communication": 33.3,
+                                               "management": 66.7, "teamwork": 66.7, "problem_solving": 100.0,
+                                               "creativity": 66.7, "leadership": 33.3, "analytical": 100.0,
+                                               "writing": 33.3, "networking": 0.0, "adaptability": 66.7,
+                                               "critical_thinking": 66.7, "digital": 100.0,
+                                               "emotional_intelligence": 33.3}},
+    "skill_assessment_leader": {"test_type": "skill_assessment", "score": 71.1, "user": "professional",
+                                "subscores": {"office_tools": 100.0, "programming": 0.0, "communication": 100.0,
+                                              "management": 66.7, "teamwork": 100.0, "problem_solving": 66.7,
+                                              "creativity": 33.3, "leadership": 100.0, "analytical": 33.3,
+                                              "writing": 66.7, "networking": 100.0, "adaptability": 100.0,
+                                              "critical_thinking": 66.7, "digital": 33.3,
+                                              "emotional_intelligence": 100.0}},
+    "legacy_without_subscores": {"test_type": "aptitude", "score": 40.0, "user": "student", "subscores": None},
+}
+
+LIST_FIELDS = ["strengths", "weaknesses", "interests", "subject_recommendations", "skill_gaps", "mentor_categories"]
+
+
+def render(case: dict) -> dict:
+    return build_report(case["test_type"], case["score"], case["subscores"], USERS[case["user"]])
+
+
+def schema_errors(report: dict) -> List[str]:
+    errors = [f"{field} should be a non-empty list of strings" for field in LIST_FIELDS
+              if not report.get(field) or not all(isinstance(x, str) and x for x in report[field])]
+    for field in ("predicted_learning_path", "summary"):
+        if not isinstance(report.get(field), str) or not report[field]:
+            errors.append(f"{field} should be a non-empty string")
+    paths = report.get("career_paths") or []
+    if len(paths) != 5:
+        errors.append("career_paths should have 5 entries")
+    scores = [p.get("match_score") for p in paths]
+    if any(not isinstance(s, int) or not 0 <= s <= 100 for s in scores) or scores != sorted(scores, reverse=True):
+        errors.append(f"career_paths match scores should be descending integers in 0-100: {scores}")
+    return errors
+
+
+def random_profiles(count: int = 2000):
+    rng = random.Random(11)
+    for _ in range(count):
+        test_type = rng.choice(list(DIMENSIONS))
+        subscores = {d: round(rng.uniform(0, 100), 1) for d in DIMENSIONS[test_type] if rng.random() > 0.2}
+        yield test_type, rng.uniform(0, 100), subscores, rng.choice(list(USERS.values()))
+
+
+@pytest.fixture(scope="module")
+def golden() -> dict:
+    if os.environ.get("UPDATE_GOLDEN"):
+        reports = {name: render(case) for name, case in CASES.items()}
+        GOLDEN_PATH.write_text(json.dumps(reports, indent=2, ensure_ascii=False) + "\n")
+    return json.loads(GOLDEN_PATH.read_text())
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_matches_golden(name, golden):
+    assert render(CASES[name]) == golden[name]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_golden_schema(name):
+    assert schema_errors(render(CASES[name])) == []
+
+
+def test_random_profiles_schema():
+    for test_type, score, subscores, user in random_profiles():
+        assert schema_errors(build_report(test_type, score, subscores, user)) == [], (test_type, subscores)
+
+
+def test_only_measured_dimensions_are_judged():
+    phrases = {d: (dim.strength, dim.growth) for d, dim in KNOWN_DIMENSIONS.items()}
+    for test_type, score, subscores, user in random_profiles():
+        scores = profile(subscores)
+        report = build_report(test_type, score, subscores, user)
+        for d, (strength, growth) in phrases.items():
+            if strength in report["strengths"]:
+                assert scores.get(d, 0.0) >= STRONG_SCORE, (d, scores)
+            if growth in report["weaknesses"] or growth in report["skill_gaps"]:
+                assert d in scores and scores[d] < 70.0, (d, scores)
+
+
+def test_is_deterministic():
+    case = CASES["skill_assessment_builder"]
+    assert render(case) == render(dict(case))
@@ -0,0 +1,84 @@
+"""LLM enrichment of the provisional report, and the sweep for stale ones."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import server
+from report_engine import build_report
+
+USER = {"id": "u1", "name": "Asha Rao", "age": 19, "segment": "student", "interests": ["Technology"]}
+ASSESSMENT = {"id": "a1", "test_type": "aptitude", "questions": []}
+
+
+class Assessments:
+    def __init__(self):
+        self.updates = []
+
+    async def update_one(self, query, update):
+        self.updates.append((query, update))
+
+
+class Db:
+    def __init__(self):
+        self.assessments = Assessments()
+
+
+def enrich(monkeypatch, report: dict):
+    fake_db, pushed = Db(), []
+
+    async def generate(*args):
+        return report
+
+    async def notify(user_id, event):
+        pushed.append((user_id, event))
+
+    monkeypatch.setattr(server, "db", fake_db)
+    monkeypatch.setattr(server, "generate_ai_report", generate)
+    monkeypatch.setattr(server.push_hub, "notify", notify)
+    asyncio.run(server.enrich_report(USER, ASSESSMENT, [], 60.0, {"numerical": 60.0}))
+    return fake_db.assessments.updates, pushed
+
+
+def test_llm_report_replaces_the_provisional_one(monkeypatch):
+    updates, pushed = enrich(monkeypatch, {"summary": "from the LLM", "source": "llm"})
+    [(query, update)] = updates
+    assert query == {"id": "a1", "report_pending": True}
+    assert update["$set"]["report_pending"] is False
+    assert [(user_id, event.provisional) for user_id, event in pushed] == [("u1", False)]
+
+
+def test_fallback_leaves_the_report_pending(monkeypatch):
+    local = build_report("aptitude", 60.0, {"numerical": 60.0}, USER)
+    updates, pushed = enrich(monkeypatch, local)
+    assert updates == []
+    assert pushed == []
+
+
+def test_stale_pending_reports_are_finalized(mongo, monkeypatch):
+    from database import get_db
+
+    pushed = []
+
+    async def notify(user_id, event):
+        pushed.append((user_id, event.assessment_id))
+
+    monkeypatch.setattr(server.push_hub, "notify", notify)
+    now = datetime.utcnow()
+    docs = [
+        {"id": str(uuid.uuid4()), "user_id": "u1", "test_type": "aptitude", "score": 60.0, "report_pending": True,
+         "completed_at": now - timedelta(seconds=server.REPORT_PENDING_TIMEOUT + 60)},
+        {"id": str(uuid.uuid4()), "user_id": "u1", "test_type": "aptitude", "score": 70.0, "report_pending": True,
+         "completed_at": now},
+    ]
+
+    async def run():
+        await get_db().assessments.insert_many([dict(d) for d in docs])
+        finalized = await server.finalize_stale_reports()
+        again = await server.finalize_stale_reports()
+        pending = await get_db().assessments.find({"report_pending": True}, {"_id": 0, "id": 1}).to_list(None)
+        return finalized, again, pending
+
+    finalized, again, pending = asyncio.run(run())
+    assert (finalized, again) == (1, 0)
+    assert pending == [{"id": docs[1]["id"]}]
+    assert pushed == [("u1", docs[0]["id"])]
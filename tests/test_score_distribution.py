@@ -0,0 +1,44 @@
+"""Score histograms: the exact rebuild is applied as deltas."""
+import numpy as np
+
+import score_distribution as sd
+
+
+def apply(stored: dict, requests) -> dict:
+    """What the $inc updates do to ``stored`` bins, keyed by histogram id."""
+    result = {sd.histogram_id(k): v.copy() for k, v in stored.items()}
+    for request in requests:
+        doc = request._doc
+        bins = result.setdefault(request._filter["_id"], np.zeros(sd.BINS, dtype=np.int64))
+        for field, n in doc["$inc"].items():
+            if field.startswith("bins."):
+                bins[int(field.split(".")[1])] += n
+    return result
+
+
+def test_delta_updates_turn_stored_into_counts():
+    results = [{"test_type": "aptitude", "segment": "student", "score": s} for s in (40, 60, 60, 100)]
+    counts = sd.count_results(results)
+    stale = sd.count_results(results[:2] + [{"test_type": "personality", "segment": "student", "score": 10}])
+
+    applied = apply(stale, sd.delta_updates(counts, stale))
+    for key, array in counts.items():
+        assert (applied.pop(sd.histogram_id(key)) == array).all()
+    assert all(not bins.any() for bins in applied.values())  # gone from the recount: zeroed
+
+
+def test_increments_during_rebuild_survive():
+    counts = sd.count_results([{"test_type": "aptitude", "segment": "student", "score": 50}])
+    requests = sd.delta_updates(counts, {})
+    # a result recorded after the snapshot, while the recount ran
+    key = ("aptitude", sd.ALL_SEGMENTS, sd.OVERALL)
+    live = {key: np.zeros(sd.BINS, dtype=np.int64)}
+    live[key][sd.bin_index(90)] += 1
+    applied = apply(live, requests)[sd.histogram_id(key)]
+    assert applied[sd.bin_index(90)] == 1
+    assert applied[sd.bin_index(50)] == 1
+
+
+def test_unchanged_histograms_are_not_written():
+    counts = sd.count_results([{"test_type": "aptitude", "segment": "student", "score": 50}])
+    assert sd.delta_updates(counts, {k: v.copy() for k, v in counts.items()}) == []
@@ -0,0 +1,146 @@
+"""Delta sync: version tokens, paging on shared timestamps, deltas and tombstones."""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import sync
+from sync import (
+    EPOCH, SECTIONS, SYNC_TOMBSTONE_DAYS, SYNCED, InvalidVersion, _changed, _cut, decode_version,
+    delete_synced, encode_version, next_version, sync_changes,
+)
+
+T0 = datetime(2026, 2, 1, 9, 30, 15, 123000)  # stored datetimes have millisecond precision
+
+
+def test_version_round_trip():
+    version = {name: T0 + timedelta(seconds=i) for i, name in enumerate(SECTIONS)}
+    token = encode_version(version)
+    assert "=" not in token
+    assert decode_version(token) == version
+
+
+def test_version_keeps_milliseconds_only():
+    version = {name: T0 + timedelta(microseconds=999) for name in SECTIONS}
+    assert decode_version(encode_version(version)) == {name: T0 for name in SECTIONS}
+
+
+@pytest.mark.parametrize("token", [
+    "not base64!",
+    "e30",  # {}: no sections
+    encode_version({"profile": T0}),  # sections missing
+    "WyJsaXN0Il0",  # ["list"]
+    "eyJwcm9maWxlIjoiYWJjIn0",  # {"profile":"abc"}
+])
+def test_bad_version_is_rejected(token):
+    with pytest.raises(InvalidVersion):
+        decode_version(token)
+
+
+def test_cut_keeps_a_shared_boundary_timestamp_together(monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_PAGE_SIZE", 3)
+    docs = [{"id": str(i), "updated_at": T0 + timedelta(milliseconds=ms)} for i, ms in enumerate([1, 2, 3, 3])]
+    page, more = _cut(docs, "updated_at")
+    assert ([d["id"] for d in page], more) == (["0", "1"], True)
+    assert next_version(EPOCH, T0, page, "updated_at", more) == docs[1]["updated_at"]
+
+
+def test_cut_sends_a_page_of_one_timestamp_whole(monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_PAGE_SIZE", 3)
+    docs = [{"id": str(i), "updated_at": T0} for i in range(4)]
+    page, more = _cut(docs, "updated_at")
+    assert (len(page), more) == (4, True)
+    assert next_version(EPOCH, T0, page, "updated_at", more) == T0
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length] if length else self.docs
+
+
+class Payments:
+    """``find`` on ``updated_at`` ($gt or equality); every document belongs to the user."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection):
+        condition = query["updated_at"]
+        if isinstance(condition, dict):
+            return Cursor([dict(d) for d in self.docs if d["updated_at"] > condition["$gt"]])
+        return Cursor([dict(d) for d in self.docs if d["updated_at"] == condition])
+
+
+def test_paging_makes_progress_through_shared_timestamps(monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_PAGE_SIZE", 3)
+    stamps = [1, 2, 2, 2, 2, 2, 3, 3, 3, 3, 4]
+    docs = [{"id": str(i), "user_id": "u1", "updated_at": T0 + timedelta(milliseconds=ms)}
+            for i, ms in enumerate(stamps)]
+    monkeypatch.setattr(sync, "db", {"payments": Payments(docs)})
+    horizon = T0 + timedelta(seconds=10)
+
+    since, sent, pages = EPOCH, [], 0
+    while True:
+        page, more = asyncio.run(_changed(SYNCED["payments"], "u1", since))
+        sent.extend(d["id"] for d in page)
+        pages += 1
+        assert pages < len(docs), "paging stopped making progress"
+        version = next_version(since, horizon, page, "updated_at", more)
+        assert version > since
+        since = decode_version(encode_version({name: version for name in SECTIONS}))["payments"]
+        if not more:
+            break
+    assert sorted(sent, key=int) == [d["id"] for d in docs]  # each exactly once
+    assert since == horizon
+
+# ==================== MONGO ====================
+
+def test_sync_returns_deltas_tombstones_and_resets(mongo):
+    from database import get_db
+
+    now = datetime.utcnow()
+    old = now - timedelta(hours=1)
+
+    def payment(updated_at):
+        return {"id": str(uuid.uuid4()), "user_id": "u1", "amount": 299.0, "status": "completed",
+                "created_at": updated_at, "updated_at": updated_at}
+
+    kept, removed, added = payment(old), payment(old), payment(now)
+
+    async def run():
+        database = get_db()
+        await database.users.insert_one({"id": "u1", "name": "Asha", "password_hash": "x", "updated_at": old})
+        await database.payments.insert_many([dict(kept), dict(removed)])
+        first = await sync_changes("u1", None)
+        await database.payments.insert_one(dict(added))
+        assert await delete_synced("payments", {"id": removed["id"]}) == 1
+        second = await sync_changes("u1", first["version"])
+        stale = encode_version({name: now - timedelta(days=SYNC_TOMBSTONE_DAYS + 1) for name in SECTIONS})
+        third = await sync_changes("u1", stale)
+        return first, second, third
+
+    first, second, third = asyncio.run(run())
+    assert first["reset"] is True
+    assert {p["id"] for p in first["payments"]} == {kept["id"], removed["id"]}
+    assert "password_hash" not in first["profile"]
+
+    assert second["reset"] is False
+    assert [p["id"] for p in second["payments"]] == [added["id"]]
+    assert second["deleted"]["payments"] == [removed["id"]]
+    assert second["profile"] is None  # unchanged since the first sync
+    assert second["has_more"] is False
+
+    assert third["reset"] is True
+    assert {p["id"] for p in third["payments"]} == {kept["id"], added["id"]}